@@ -0,0 +1,321 @@
+import math
+import threading
+
+import numpy as np
+
+from metrics import count_rows, span
+from table import widen
+
+# ✅ Metrics understood by /aggregate; the engine can answer the first three without a table scan
+ENGINE_METRICS = ("count", "sum", "mean")
+METRICS = ENGINE_METRICS + ("min", "max", "median", "std")
+FILTER_OPS = ("eq", "ne", "gt", "gte", "lt", "lte")
+
+
+class GroupAggregate:
+    """Running count and sum of one value column per group key.
+
+    Rows can be added and removed (`sign=-1`), so the aggregate follows
+    appended or edited rows without rescanning the table. Each call groups
+    the given rows of a CustomerTable with one vectorized pass and then
+    touches every affected group once.
+    """
+
+    def __init__(self, by, value=None):
+        self.by = tuple(by)
+        self.value = value
+        self.groups = {}
+        self.missing = []
+
+    def bind(self, table):
+        columns = list(self.by) + ([self.value] if self.value else [])
+        self.missing = [col for col in columns if col not in table]
+        self.groups = {}
+
+    def add_rows(self, table, rows=None, sign=1):
+        if self.missing:
+            return
+        rows, groups, keys = table.group_index(self.by, rows)
+        if self.value is None:
+            totals = np.zeros(len(keys))
+        elif table.is_numeric(self.value):
+            values = table.numeric(self.value)[rows]
+            valid = ~np.isnan(values)  # same rows the old per-request loops skipped
+            groups = groups[valid]
+            totals = np.bincount(groups, weights=widen(values[valid]), minlength=len(keys))
+        else:
+            return  # text column: no row has a numeric value
+        counts = np.bincount(groups, minlength=len(keys))
+
+        for key, count, total in zip(keys, counts.tolist(), totals.tolist()):
+            if count == 0:
+                continue
+            entry = self.groups.get(key)
+            if entry is None:
+                entry = self.groups[key] = [0, 0.0]
+            entry[0] += sign * count
+            entry[1] += sign * total
+            if entry[0] <= 0:
+                del self.groups[key]
+
+    def snapshot(self):
+        return [(key, count, total) for key, (count, total) in self.groups.items()]
+
+
+class AggregateEngine:
+    """Keeps registered group-by aggregates in step with the dataset snapshot.
+
+    `sync(snapshot)` diffs the new customer table against the previous one
+    (vectorized, column by column): appended rows are added, changed rows are
+    removed and re-added, and only a shrinking table or a new header row
+    triggers a full rebuild. Queries then cost O(groups) instead of O(rows).
+    A snapshot fetched before the one already applied is ignored, so a slow
+    request never moves the engine back to older data.
+    """
+
+    def __init__(self):
+        self._aggregates = {}
+        self._lock = threading.Lock()
+        self._table = None
+        self.version = None
+        self.fetched_at = None
+        self.rows_applied = 0
+        self.full_rebuilds = 0
+
+    def register(self, by, value=None):
+        """Maintain count and sum of `value` per `by` key from now on."""
+        spec = (tuple(by), value)
+        with self._lock:
+            if spec not in self._aggregates:
+                aggregate = GroupAggregate(by, value)
+                if self._table is not None:
+                    aggregate.bind(self._table)
+                    aggregate.add_rows(self._table)
+                self._aggregates[spec] = aggregate
+        return spec
+
+    def sync(self, snapshot):
+        if snapshot is None or snapshot.version == self.version or self._is_older(snapshot):
+            return
+        with self._lock:
+            if snapshot.version == self.version or self._is_older(snapshot):
+                return
+            table = snapshot.table
+            applied = self.rows_applied
+            with span("aggregate.sync"):
+                changed = table.changed_rows(self._table) if self._table is not None else None
+                if changed is None:
+                    self._rebuild(table)
+                else:
+                    self._apply_changes(table, changed)
+            count_rows("aggregate.sync", self.rows_applied - applied)
+            self._table = table
+            self.version = snapshot.version
+            self.fetched_at = snapshot.fetched_at
+
+    def _is_older(self, snapshot):
+        return self.fetched_at is not None and snapshot.fetched_at < self.fetched_at
+
+    def register_query(self, by, metrics):
+        self.register(by)
+        for _, col in metrics:
+            if col:
+                self.register(by, col)
+
+    def group_by(self, by, metrics, version=None):
+        """Rows for count/sum/mean over registered group keys, or None when the query needs a table scan
+        (or the engine does not hold `version` of the data)."""
+        if any(fn not in ENGINE_METRICS for fn, _ in metrics):
+            return None
+        by = list(by)
+        count_spec = (tuple(by), None)
+        value_specs = {col: (tuple(by), col) for fn, col in metrics if col}
+
+        with self._lock:
+            if version is not None and version != self.version:
+                return None
+            specs = [count_spec] + list(value_specs.values())
+            if any(spec not in self._aggregates for spec in specs):
+                return None  # only pre-registered group-bys are maintained incrementally
+            missing = sorted({col for spec in specs for col in self._aggregates[spec].missing})
+            if missing:
+                raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+            rows = []
+            for key, (count, _) in self._aggregates[count_spec].groups.items():
+                row = dict(zip(by, key))
+                for fn, col in metrics:
+                    if fn == "count":
+                        row["count"] = count
+                        continue
+                    value_count, total = self._aggregates[value_specs[col]].groups.get(key, (0, 0.0))
+                    if fn == "sum":
+                        row[metric_name(fn, col)] = total
+                    else:
+                        row[metric_name(fn, col)] = total / value_count if value_count else None
+                rows.append(row)
+            return rows
+
+    def status(self):
+        return {
+            "version": self.version,
+            "aggregates": len(self._aggregates),
+            "rows_applied": self.rows_applied,
+            "full_rebuilds": self.full_rebuilds,
+        }
+
+    def _rebuild(self, table):
+        for aggregate in self._aggregates.values():
+            aggregate.bind(table)
+            aggregate.add_rows(table)
+        self.rows_applied += len(table)
+        self.full_rebuilds += 1
+
+    def _apply_changes(self, table, changed):
+        old_table = self._table
+        appended = np.arange(len(old_table), len(table))
+        for aggregate in self._aggregates.values():
+            if len(changed):
+                aggregate.add_rows(old_table, changed, sign=-1)
+                aggregate.add_rows(table, changed)
+            if len(appended):
+                aggregate.add_rows(table, appended)
+        self.rows_applied += len(changed) + len(appended)
+
+
+# ✅ "mean:MonthlyCharges,count" -> [("mean", "MonthlyCharges"), ("count", None)]
+def parse_metrics(spec):
+    metrics = []
+    for part in (spec or "count").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        fn, _, column = part.partition(":")
+        fn = fn.strip().lower()
+        if fn not in METRICS:
+            raise ValueError(f"Unknown metric '{fn}', expected one of: {', '.join(METRICS)}")
+        if fn != "count" and not column:
+            raise ValueError(f"Metric '{fn}' needs a column, e.g. {fn}:MonthlyCharges")
+        metrics.append((fn, column.strip() or None) if fn != "count" else ("count", None))
+    return metrics
+
+
+def metric_name(fn, column):
+    return "count" if fn == "count" else f"{fn}_{column}"
+
+
+# ✅ Filter expressions: "Month-to-month", "DSL|Fiber optic" (any of), "gte:12", "ne:No"
+def parse_filter(column, expression):
+    op, sep, value = expression.partition(":")
+    if not sep or op not in FILTER_OPS:
+        op, value = "eq", expression
+    values = value.split("|") if op in ("eq", "ne") else [value]
+    return column, op, values
+
+
+# ✅ Rows of the table matching every filter
+def filter_mask(table, filters):
+    mask = np.ones(len(table), dtype=bool)
+    for column, op, values in filters:
+        if table.is_numeric(column):
+            series = table.numeric(column)
+            try:
+                values = np.asarray([float(v) for v in values], dtype=np.float32)
+            except ValueError:
+                raise ValueError(f"Filter on numeric column '{column}' needs numbers")
+            if op == "eq":
+                mask &= np.isin(series, values)
+            elif op == "ne":
+                mask &= ~np.isin(series, values)
+            else:
+                compare = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}[op]
+                mask &= compare(series, values[0])  # NaN compares False, so those rows drop out
+        elif op not in ("eq", "ne"):
+            raise ValueError(f"Filter '{op}' needs a numeric column, '{column}' is text")
+        else:
+            if table.is_categorical(column):
+                wanted = [code for code, label in enumerate(table.categories(column)) if label in values]
+                matches = np.isin(table.codes(column), wanted)  # compares 1-byte codes, not strings
+            else:
+                matches = np.isin(table.labels(column), values)
+            mask &= matches if op == "eq" else ~matches
+    return mask
+
+
+# ✅ Vectorized group-by over the snapshot's customer table (any metric, optional filters)
+def table_group_by(table, by, metrics, filters=()):
+    columns = set(by) | {col for _, col in metrics if col} | {col for col, _, _ in filters}
+    missing = sorted(col for col in columns if col not in table)
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    for fn, col in metrics:
+        if col and not table.is_numeric(col):
+            raise ValueError(f"Metric '{fn}' needs a numeric column, '{col}' is text")
+
+    rows = np.flatnonzero(filter_mask(table, filters)) if filters else None
+    rows, groups, keys = table.group_index(list(by), rows)
+    n_groups = len(keys)
+    result = [dict(zip(by, key)) for key in keys]
+
+    for fn, col in metrics:
+        name = metric_name(fn, col)
+        if fn == "count":
+            values = np.bincount(groups, minlength=n_groups)
+        else:
+            column = widen(table.numeric(col)[rows])
+            valid = ~np.isnan(column)
+            values = _group_metric(fn, column[valid], groups[valid], n_groups)
+        for row, value in zip(result, values.tolist()):
+            row[name] = value
+    return [_plain_row(row) for row in result]
+
+
+def _group_metric(fn, values, groups, n_groups):
+    counts = np.bincount(groups, minlength=n_groups)
+    sums = np.bincount(groups, weights=values, minlength=n_groups)
+    empty = counts == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if fn == "sum":
+            return sums
+        mean = sums / counts
+        if fn == "mean":
+            return mean
+        if fn == "std":  # sample standard deviation, like pandas
+            squares = np.bincount(groups, weights=(values - mean[groups]) ** 2, minlength=n_groups)
+            return np.sqrt(squares / (counts - 1))
+    if fn in ("min", "max"):
+        result = np.full(n_groups, np.inf if fn == "min" else -np.inf)
+        (np.minimum if fn == "min" else np.maximum).at(result, groups, values)
+        result[empty] = np.nan
+        return result
+    # median: sort by (group, value) and take the middle of each group's run
+    ordered = values[np.lexsort((values, groups))]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    low = np.clip(starts + (counts - 1) // 2, 0, max(0, len(ordered) - 1))
+    high = np.clip(starts + counts // 2, 0, max(0, len(ordered) - 1))
+    result = (ordered[low] + ordered[high]) / 2.0 if len(ordered) else np.full(n_groups, np.nan)
+    result[empty] = np.nan
+    return result
+
+
+def _plain_row(row):
+    plain = {}
+    for key, value in row.items():
+        if hasattr(value, "item"):
+            value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        plain[key] = value
+    return plain
+
+
+# ✅ Answer an aggregate query: incremental engine when possible, otherwise a vectorized table group-by
+def run_aggregate(snapshot, engine, by, metrics, filters=()):
+    if snapshot is None:
+        raise LookupError("Google Sheets returned no data.")
+    if not filters and by:
+        engine.sync(snapshot)  # a no-op when the engine already moved past this snapshot
+        rows = engine.group_by(by, metrics, version=snapshot.version)
+        if rows is not None:
+            return rows
+    return table_group_by(snapshot.table, by, metrics, filters)
@@ -1,57 +1,260 @@
+import csv
+import hmac
+import io
+import json
 import os
-import joblib
-import lime
+import time
+from concurrent.futures import TimeoutError as PredictTimeout
 import numpy as np
-import pandas as pd
-import shap
-import tensorflow as tf
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from lime.lime_tabular import LimeTabularExplainer
-
-# ✅ Load Google Sheets Credentials
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-SERVICE_ACCOUNT_FILE = r"D:\coding\mini project new\backend\credentials_service.json"
-SPREADSHEET_ID = "1kHP7cAB_-Rnb7WH3uGH4CUkkmTs6f8Ub1X6nO91VXr0"
-RANGE_NAME = "A1:Z"
-
-# ✅ Authenticate with Google Sheets API
-creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-service = build("sheets", "v4", credentials=creds)
-
-# ✅ Load ML Model, Scaler, and Encoder
-scaler = joblib.load(r"D:\coding\mini project new\backend\model\scaler_churn.pkl")
-encoder = joblib.load(r"D:\coding\mini project new\backend\model\encoder_churn.pkl")  # Load the encoder
-model = tf.keras.models.load_model(r"D:\coding\mini project new\backend\model\best_churn_model.keras")
-
-# Debugging: Check if encoder and scaler are loaded properly
-try:
-    print("✅ Encoder loaded successfully:", encoder)
-    print("✅ Scaler loaded successfully:", scaler)
-except Exception as e:
-    print("❌ Error loading encoder or scaler:", str(e))
+from aggregates import AggregateEngine, parse_filter, parse_metrics, run_aggregate
+from batcher import MicroBatcher
+from bulk_score import SCORE_INDEX_PATH, ScoreIndexFile, clamp_top
+from bundle import BundleManager, ModelBundle
+import charts
+from binning import clamp_bins, clamp_sample
+from cache import PredictionCache, parse_quantization
+from data_source import get_data_source
+from explainer import METHODS as EXPLAIN_METHODS, ChurnExplainer
+from http_cache import SnapshotResponses
+from metrics import (
+    CONTENT_TYPE, MODEL_BATCH_SIZE, REGISTRY, SamplingProfiler, begin_trace, count_rows, end_trace, server_timing, span,
+)
+from resources import ResourceRegistry
+from scoring import build_result, parse_customer, predict_churn_probabilities
+from snapshot import DatasetSnapshot
+
+# ✅ Data source (DATA_SOURCE=sheets | csv | columnar, see data_source.py)
+SNAPSHOT_TTL_SECONDS = float(os.environ.get("SNAPSHOT_TTL_SECONDS", "300"))
+SNAPSHOT_PREFETCH = os.environ.get("SNAPSHOT_PREFETCH", "true").lower() == "true"
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "5000"))
+PREDICT_MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "64"))
+PREDICT_MAX_WAIT_MS = float(os.environ.get("PREDICT_MAX_WAIT_MS", "5"))
+PREDICT_TIMEOUT_SECONDS = float(os.environ.get("PREDICT_TIMEOUT_SECONDS", "30"))
+data_source = get_data_source()
+
+# ✅ Model artifacts (MODEL_RUNTIME=keras | numpy | student), served from versioned bundles in MODEL_BUNDLES_DIR
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model"))
+MODEL_BUNDLES_DIR = os.environ.get("MODEL_BUNDLES_DIR", os.path.join(MODEL_DIR, "bundles"))
+MODEL_RELOAD_POLL_SECONDS = float(os.environ.get("MODEL_RELOAD_POLL_SECONDS", "10"))
+MODEL_RUNTIME = os.environ.get("MODEL_RUNTIME", "keras").lower()
+STUDENT_MAX_AUC_DROP = float(os.environ.get("STUDENT_MAX_AUC_DROP", "0.01"))
+STUDENT_MIN_AGREEMENT = float(os.environ.get("STUDENT_MIN_AGREEMENT", "0.97"))
+
+# ✅ Explanations (POST /explain): sampling budget, background size and cache size
+EXPLAIN_METHOD = os.environ.get("EXPLAIN_METHOD", "shap").lower()
+EXPLAIN_NSAMPLES = int(os.environ.get("EXPLAIN_NSAMPLES", "256"))
+EXPLAIN_LIME_SAMPLES = int(os.environ.get("EXPLAIN_LIME_SAMPLES", "500"))
+EXPLAIN_BACKGROUND_K = int(os.environ.get("EXPLAIN_BACKGROUND_K", "20"))
+EXPLAIN_BATCH_SIZE = int(os.environ.get("EXPLAIN_BATCH_SIZE", "4096"))
+EXPLAIN_CACHE_SIZE = int(os.environ.get("EXPLAIN_CACHE_SIZE", "1024"))
+
+# ✅ Prediction cache: size 0 disables it; PREDICTION_CACHE_DB shares it between workers
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+PREDICTION_CACHE_QUANTIZE = os.environ.get("PREDICTION_CACHE_QUANTIZE", "")  # e.g. "monthlyCharges=0.5,totalCharges=5"
+PREDICTION_CACHE_DB = os.environ.get("PREDICTION_CACHE_DB", "")
+
+# ✅ Precomputed scores (python bulk_score.py writes SCORE_INDEX_PATH); the file is re-read when it changes
+SCORE_INDEX_CHECK_SECONDS = float(os.environ.get("SCORE_INDEX_CHECK_SECONDS", "5"))
+
+# ✅ HTTP responses: bodies smaller than this are sent uncompressed; encoded bodies kept per ETag
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+
+# ✅ Metrics (GET /metrics) and on-demand profiling: requests sending "X-Profile: <PROFILE_TOKEN>" are sampled
+#    and get a Server-Timing header; an empty token disables profiling
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+# ✅ Admin endpoints (POST /reload) require "X-Admin-Token: <ADMIN_TOKEN>"; an empty token disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# ✅ Startup mode: "background" warms up after the server starts, "eager" before, "lazy" on first use
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "background").lower()
+PROCESS_STARTED_AT = time.time()
+
+# ✅ Load a model bundle; the NumPy and student runtimes never import TensorFlow
+STUDENT_TOLERANCE = {"max_auc_drop": STUDENT_MAX_AUC_DROP, "min_agreement": STUDENT_MIN_AGREEMENT}
+
+def load_bundle(path):
+    return ModelBundle.load(path, MODEL_RUNTIME, **STUDENT_TOLERANCE)
+
+def load_flat_bundle():
+    return ModelBundle.load_flat(MODEL_DIR, MODEL_RUNTIME, **STUDENT_TOLERANCE)
+
+# ✅ New bundles are loaded and warmed in the background, then swapped in atomically
+def warm_up_bundle(bundle):
+    bundle.model.predict_on_batch(bundle.transform([WARM_UP_CUSTOMER]))
+
+model_bundles = BundleManager(
+    MODEL_BUNDLES_DIR,
+    load_bundle,
+    load_fallback=load_flat_bundle,
+    warm_up=warm_up_bundle,
+    poll_seconds=MODEL_RELOAD_POLL_SECONDS,
+)
+
+# ✅ The first bundle is loaded on first use (or by the warm-up)
+resources = ResourceRegistry()
+bundle_resource = resources.register(f"model bundle ({MODEL_RUNTIME})", model_bundles.load_initial)
+
+def current_bundle():
+    bundle_resource.get()
+    return model_bundles.current()
+
+# ✅ Explainer over a k-means summary of X_train_churn.npy, built once
+def build_explainer():
+    bundle = current_bundle()
+
+    def predict_scaled(X):
+        X = np.asarray(X).reshape(len(X), -1, 1)
+        return np.asarray(bundle.model.predict(X, batch_size=EXPLAIN_BATCH_SIZE, verbose=0)).reshape(-1)
+
+    return ChurnExplainer(
+        predict_scaled,
+        np.load(os.path.join(MODEL_DIR, "X_train_churn.npy")),
+        bundle.feature_order,
+        background_k=EXPLAIN_BACKGROUND_K,
+        nsamples=EXPLAIN_NSAMPLES,
+        lime_samples=EXPLAIN_LIME_SAMPLES,
+        batch_size=EXPLAIN_BATCH_SIZE,
+        cache_size=EXPLAIN_CACHE_SIZE,
+    )
+
+explainer_resource = resources.register("explainer", build_explainer, optional=True)
+
+# ✅ Objects tied to one model version are dropped when another one becomes active
+def on_bundle_swap(bundle, previous):
+    prediction_cache.set_model_version(bundle.version)
+    if previous is not None:
+        explainer_resource.reset()
+
+model_bundles.add_listener(on_bundle_swap)
 
 # ✅ Initialize Flask App
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
 
-# ✅ Fetch Google Sheets Data
+# ✅ Request latency per route, plus the optional per-request profile
+REQUEST_SECONDS = REGISTRY.histogram(
+    "churn_http_request_seconds", "Time until the response is handed to the server (streamed bodies excluded)",
+    ["endpoint", "method", "status"],
+)
+UPSTREAM_ERRORS = REGISTRY.counter("churn_upstream_fetch_errors_total", "Failed or empty data source fetches", ["source"])
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if PROFILE_TOKEN and request.headers.get("X-Profile") == PROFILE_TOKEN:
+        begin_trace()
+        g.profiler = SamplingProfiler(interval_ms=PROFILE_INTERVAL_MS).start()
+
+def request_endpoint():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+def finish_profile():
+    """Stop the request's profiler and close its trace; safe to call twice (after_request, then teardown)."""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        trace = end_trace() or []
+        path = profiler.stop().save(PROFILE_DIR, f"{request.method}{request_endpoint()}")
+        g.profile = (trace, path, profiler.samples)
+    return g.get("profile")
+
+@app.after_request
+def record_request(response):
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - g.request_started,
+        endpoint=request_endpoint(), method=request.method, status=str(response.status_code),
+    )
+    profile = finish_profile()
+    if profile is not None:
+        trace, path, samples = profile
+        response.headers["Server-Timing"] = server_timing(trace)
+        response.headers["X-Profile-File"] = os.path.basename(path)
+        response.headers["X-Profile-Samples"] = str(samples)
+    return response
+
+# Runs even when the view raised and after_request was skipped, so no profiler thread or trace is left behind
+@app.teardown_request
+def stop_request_profile(exc):
+    finish_profile()
+
+# ✅ Fetch the dataset from the configured data source
 def fetch_sheet_data():
     try:
-        response = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID, range=RANGE_NAME
-        ).execute()
-        data = response.get("values", [])
+        with span("upstream_fetch"):
+            data = data_source.fetch_values()
 
         if not data:
-            print("⚠️ Google Sheets API returned empty data!")
+            raise ValueError(f"Data source '{data_source.name}' returned empty data")
+        count_rows("upstream_fetch", len(data) - 1)
         return data
     except Exception as e:
-        print(f"❌ Error fetching Google Sheets data: {e}")
-        return []
-    
+        # The snapshot keeps serving the previous data and records the error in /ready
+        UPSTREAM_ERRORS.inc(source=data_source.name)
+        print(f"❌ Error fetching data from '{data_source.name}': {e}")
+        raise
+
+# ✅ Shared in-memory dataset, refreshed in the background every SNAPSHOT_TTL_SECONDS
+dataset = DatasetSnapshot(fetch_sheet_data, ttl_seconds=SNAPSHOT_TTL_SECONDS, prefetch=SNAPSHOT_PREFETCH)
+
+# ✅ Chart group-bys, updated incrementally whenever the snapshot changes
+aggregate_engine = AggregateEngine()
+for by, metrics in charts.CHART_QUERIES:
+    aggregate_engine.register_query(by, metrics)
+dataset.add_listener(aggregate_engine.sync)
+
+# ✅ Read endpoints carry an ETag from the snapshot version and are gzip/brotli-encoded
+def request_snapshot():
+    """The snapshot this request reads, resolved once so a refresh mid-request cannot mix versions."""
+    if "snapshot" not in g:
+        g.snapshot = dataset.get()
+    return g.snapshot
+
+responses = SnapshotResponses(
+    request_snapshot,
+    min_compress_bytes=RESPONSE_COMPRESS_MIN_BYTES,
+    cache_size=RESPONSE_CACHE_SIZE,
+)
+
+# ✅ Force a dataset refresh (e.g. right after the sheet was edited)
+@app.route("/refresh-data", methods=["POST"])
+def refresh_data():
+    wait = request.args.get("wait", "false").lower() == "true"
+    dataset.refresh(wait=wait)
+    return jsonify(dataset.status())
+
+# ✅ Score a micro-batch of concurrent /predict requests with one model call (one bundle per batch)
+def predict_probabilities(customers):
+    bundle = current_bundle()
+    MODEL_BATCH_SIZE.observe(len(customers), path="predict")
+    with span("features"):
+        X_scaled = bundle.transform(customers)
+    with span("model"):
+        probabilities = np.asarray(bundle.model.predict_on_batch(X_scaled)).reshape(-1).tolist()
+    return [(probability, bundle.version) for probability in probabilities]
+
+# ✅ Cached probabilities, cleared automatically when the model files or the active bundle change
+prediction_cache = PredictionCache(
+    max_size=PREDICTION_CACHE_SIZE,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+    quantize=parse_quantization(PREDICTION_CACHE_QUANTIZE),
+    artifact_paths=[
+        os.path.join(MODEL_DIR, name)
+        for name in ("scaler_churn.pkl", "encoder_churn.pkl", "best_churn_model.keras", "churn_model_weights.npz",
+                     "churn_student.joblib")
+    ],
+    shared_path=PREDICTION_CACHE_DB,
+)
+
+prediction_batcher = MicroBatcher(
+    predict_probabilities, max_batch_size=PREDICT_MAX_BATCH_SIZE, max_wait_ms=PREDICT_MAX_WAIT_MS
+)
+
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
@@ -59,379 +262,382 @@ def predict():
         if not data:
             raise ValueError("No data received")
 
-        # Extract input values
-        tenure = float(data.get("tenure", 0))
-        monthly_charges = float(data.get("monthlyCharges", 0))
-        total_charges = data.get("totalCharges", "0")
-        contract = data.get("contract", "Month-to-month")
-        internet_service = data.get("internetService", "DSL")
-
-        # Convert TotalCharges to float safely
-        try:
-            total_charges = float(total_charges)
-        except ValueError:
-            total_charges = 0.0
-
-        # Prepare data as DataFrame
-        input_data = pd.DataFrame([[tenure, monthly_charges, total_charges, contract, internet_service]],
-                                  columns=["tenure", "MonthlyCharges", "TotalCharges", "Contract", "InternetService"])
-
-        # Encode categorical data
-        categorical_encoded = encoder.transform(input_data[["Contract", "InternetService"]])
-        categorical_df = pd.DataFrame(categorical_encoded, columns=encoder.get_feature_names_out())
-
-        # Prepare numeric data
-        numeric_df = input_data[["tenure", "MonthlyCharges", "TotalCharges"]]
-
-        # Combine numeric and categorical data
-        processed_data = pd.concat([numeric_df, categorical_df], axis=1)
-
-        # Ensure column order matches the model training
-        expected_features = ["tenure", "MonthlyCharges", "TotalCharges"] + list(encoder.get_feature_names_out())
-        processed_data = processed_data[expected_features]
-
-        # Scale input data
-        X_scaled = scaler.transform(processed_data)
-
-        # Reshape for Conv1D model (3D format)
-        X_scaled = X_scaled.reshape(1, X_scaled.shape[1], 1)
-
-        # Make prediction
-        churn_probability = model.predict(X_scaled)[0][0]
-        churn_result = "Yes" if churn_probability >= 0.5 else "No"
-
-        # Define Personalized Offers based on more granular data
-        offer = ""
-
-        # Add more personalized retention strategies
-        if churn_result == "Yes":
-            if tenure < 3:
-                offer = "New customers get 3 months of premium service at the price of a basic plan. Free router upgrade included!"
-            elif tenure < 6:
-                offer = "We value you! Enjoy a 10% discount on your next 3 months' subscription."
-            elif monthly_charges > 120:
-                offer = "Spend less and get more! Switch to an annual plan and save $20/month."
-            elif contract == "Month-to-month":
-                offer = "Switch to a 12-month contract and get 20% off your monthly charges."
-            elif internet_service == "DSL":
-                offer = "Upgrade to fiber and enjoy faster speeds with a 15% discount."
-            elif total_charges > 500:
-                offer = "Loyal customers get a 10% discount as a token of appreciation. Tell us what you think and get additional discounts based on feedback."
-            elif total_charges > 1000:
-                offer = "As one of our top customers, enjoy a special upgrade to our premium plan."
-            
-        else:
-            offer = "Thank you for staying with us! Enjoy a 5% discount on your next month’s subscription."
-            if tenure > 12:
-                offer += " As a loyal customer, we are giving you a VIP discount on your next bill."
-            if internet_service == "DSL":
-                offer += " Upgrade to fiber for faster speeds and more data."
-            if monthly_charges > 120:
-                offer += " Unlock exclusive offers on premium plans!"
+        # Extract and normalize input values
+        customer = parse_customer(data)
 
-        return jsonify({
-            "churn_probability": float(churn_probability),
-            "churn": churn_result,
-            "personalized_offer": offer,
-            "comparison_data": {
-                "tenure": tenure,
-                "monthlyCharges": monthly_charges,
-                "totalCharges": total_charges,
-                "contract": contract,
-                "internetService": internet_service
-            }
-        })
+        # Repeat inputs are served from the cache; otherwise predict
+        # (coalesced with concurrent requests into one model call)
+        model_version = current_bundle().version
+        with span("predict.cache_lookup"):
+            churn_probability = prediction_cache.get(customer)
+        if churn_probability is None:
+            with span("predict.batch_wait"):  # queueing + the shared features/model call
+                churn_probability, model_version = prediction_batcher.predict(customer, timeout=PREDICT_TIMEOUT_SECONDS)
+            prediction_cache.set(customer, churn_probability, model_version=model_version)
 
+        with span("serialize"):
+            return jsonify({**build_result(customer, churn_probability), "model_version": model_version})
+
+    except PredictTimeout:
+        return jsonify({"error": f"Prediction did not finish within {PREDICT_TIMEOUT_SECONDS:g}s"}), 503
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
-    # ✅ Gender vs. Monthly Charges
-@app.route("/gender-monthly-charges", methods=["GET"])
-def gender_vs_monthly_charges():
+# ✅ One warm-up inference so the first real request doesn't pay graph-tracing cost
+WARM_UP_CUSTOMER = parse_customer({})
+
+def warm_up_inference():
+    warm_up_bundle(current_bundle())
+
+def start_warm_up(background=True):
+    dataset.refresh(wait=not background)
+    return resources.warm_up(after=warm_up_inference, background=background)
+
+# ✅ Readiness: which components are loaded, and whether the warm-up has finished
+@app.route("/ready", methods=["GET"])
+def ready():
+    status = resources.status()
+    status["ready"] = resources.ready()
+    status["startup_mode"] = STARTUP_MODE
+    status["uptime_seconds"] = round(time.time() - PROCESS_STARTED_AT, 1)
+    status["components"]["dataset"] = dataset.status()
+    if hasattr(data_source, "status"):
+        status["components"]["dataset"]["upstream"] = data_source.status()
+    status["components"]["model_bundles"] = model_bundles.status()
+    status["components"]["score_index"] = score_index.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# ✅ Switch model bundles without a restart: POST /reload (re-read CURRENT) or /reload?version=<v>&wait=true
+@app.route("/reload", methods=["POST"])
+def reload_model():
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "POST /reload is disabled (ADMIN_TOKEN is not set)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Missing or invalid X-Admin-Token"}), 401
+    try:
+        body = request.get_json(silent=True) or {}
+        version = request.args.get("version") or body.get("version")
+        version = str(version) if version is not None else None
+        wait = request.args.get("wait", "false").lower() == "true"
+        status = model_bundles.reload(version, wait=wait)
+        return jsonify(status), 202 if status["loading"] else 200
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ✅ Prometheus metrics: stage latencies, rows processed, batch sizes and cache hit ratios (per process)
+def cache_stat(field):
+    caches = {
+        "prediction": prediction_cache.stats,
+        "response": responses.cache_info,
+        "explanation": lambda: explainer_resource.get().cache_info() if explainer_resource.loaded else None,
+    }
+
+    def collect():
+        values = {}
+        for name, read_stats in caches.items():
+            stats = read_stats()
+            if stats is not None:
+                values[name] = stats[field]
+        return values
+
+    return collect
+
+REGISTRY.collect("churn_cache_hits_total", "Cache hits", cache_stat("hits"), kind="counter", labelnames=["cache"])
+REGISTRY.collect("churn_cache_misses_total", "Cache misses", cache_stat("misses"), kind="counter", labelnames=["cache"])
+REGISTRY.collect("churn_cache_hit_ratio", "Hits / lookups since start-up", cache_stat("hit_ratio"), labelnames=["cache"])
+REGISTRY.collect("churn_cache_entries", "Entries currently cached", cache_stat("size"), labelnames=["cache"])
+REGISTRY.collect("churn_predict_queue_depth", "/predict calls waiting for a batch", lambda: prediction_batcher.stats()["queued"])
+REGISTRY.collect("churn_dataset_rows", "Rows in the current dataset snapshot", lambda: dataset.status()["rows"])
+REGISTRY.collect("churn_dataset_age_seconds", "Age of the current dataset snapshot", lambda: dataset.status()["age_seconds"])
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+# ✅ Micro-batching and cache metrics for /predict
+@app.route("/predict/stats", methods=["GET"])
+def predict_stats():
+    return jsonify({"batcher": prediction_batcher.stats(), "cache": prediction_cache.stats()})
+
+
+# ✅ Explain one customer's churn score (body: same fields as /predict, optional "method": shap | lime)
+@app.route("/explain", methods=["POST"])
+def explain():
     try:
-        sheet_data = fetch_sheet_data()
-                
-        if not sheet_data:
-            return jsonify({"error": "Google Sheets returned no data."}), 500
+        data = request.json
+        if not data:
+            raise ValueError("No data received")
+
+        method = str(data.get("method", request.args.get("method", EXPLAIN_METHOD))).lower()
+        if method not in EXPLAIN_METHODS:
+            return jsonify({"error": f"Unknown explanation method '{method}' (expected {' or '.join(EXPLAIN_METHODS)})"}), 400
+        customer = parse_customer(data)
+        key = tuple(customer.values())
+
+        bundle = current_bundle()
+        with span("features"):
+            X_scaled = bundle.transform([customer])
+        with span(f"explain.{method}"):
+            explanation = explainer_resource.get().explain(key, X_scaled, method=method)
+        churn_probability = prediction_cache.get(customer)
+        if churn_probability is None:
+            MODEL_BATCH_SIZE.observe(1, path="explain")
+            with span("model"):
+                churn_probability = float(np.asarray(bundle.model.predict_on_batch(X_scaled)).reshape(-1)[0])
+            prediction_cache.set(customer, churn_probability, model_version=bundle.version)
+
+        return jsonify({
+            "churn_probability": churn_probability,
+            "model_version": bundle.version,
+            "explanation": explanation,
+            "comparison_data": customer,
+        })
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        headers = sheet_data[0]
-        gender_index = headers.index("gender") if "gender" in headers else -1
-        monthly_charges_index = headers.index("MonthlyCharges") if "MonthlyCharges" in headers else -1
 
-        if gender_index == -1 or monthly_charges_index == -1:
-            return jsonify({"error": "Missing required columns"}), 500
+# ✅ Read batch input: JSON array, NDJSON or CSV (raw body or multipart "file" upload)
+def read_batch_records():
+    upload = request.files.get("file")
+    if upload is not None:
+        body = upload.read().decode("utf-8")
+        content_type = upload.mimetype or ""
+        if upload.filename and upload.filename.lower().endswith(".csv"):
+            content_type = "text/csv"
+    else:
+        body = request.get_data(as_text=True)
+        content_type = request.mimetype or ""
+
+    if "csv" in content_type:
+        return list(csv.DictReader(io.StringIO(body)))
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    records = json.loads(body) if body.strip() else []
+    if isinstance(records, dict):
+        records = records.get("customers", [])
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of customers")
+    return records
+
+
+# ✅ Batch prediction: one vectorized encoder/scaler/model call per chunk, streamed back as NDJSON
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    try:
+        records = read_batch_records()
+    except Exception as e:
+        return jsonify({"error": f"Could not parse batch input: {e}"}), 400
 
-        gender_data = {}
+    def generate():
+        bundle = current_bundle()  # the whole batch is scored by one model version
+        for start in range(0, len(records), BATCH_CHUNK_SIZE):
+            chunk = records[start:start + BATCH_CHUNK_SIZE]
+            customers, positions, lines = [], [], []
 
-        for row in sheet_data[1:]:
-            if len(row) > max(gender_index, monthly_charges_index):
+            for offset, record in enumerate(chunk):
+                index = start + offset
+                try:
+                    customers.append(parse_customer(record))
+                    positions.append(index)
+                except Exception as e:
+                    lines.append((index, {"index": index, "error": str(e)}))
+
+            # Only customers missing from the prediction cache go through the model
+            probabilities = [prediction_cache.get(c) for c in customers]
+            missing = [i for i, p in enumerate(probabilities) if p is None]
+            count_rows("predict.batch", len(chunk))
+            if missing:
+                MODEL_BATCH_SIZE.observe(len(missing), path="batch")
                 try:
-                    gender = row[gender_index]
-                    monthly_charges = float(row[monthly_charges_index])
-                    if gender in gender_data:
-                        gender_data[gender].append(monthly_charges)
-                    else:
-                        gender_data[gender] = [monthly_charges]
-                except ValueError:
-                    continue
-
-        result = [
-            {"gender": g, "avgMonthlyCharge": sum(charges) / len(charges)}
-            for g, charges in gender_data.items()
+                    scored = predict_churn_probabilities([customers[i] for i in missing], bundle.transform, bundle.model)
+                except Exception as e:
+                    # The response is already streaming: report the failed chunk row by row and go on
+                    print(f"❌ Batch chunk at {start} failed: {e}")
+                    lines.extend((index, {"index": index, "error": str(e)}) for index in positions)
+                    customers, positions = [], []
+                else:
+                    for i, probability in zip(missing, scored):
+                        probabilities[i] = float(probability)
+                        prediction_cache.set(customers[i], probability, model_version=bundle.version)
+
+            for index, customer, probability in zip(positions, customers, probabilities):
+                record_id = records[index].get("customerID")
+                result = {
+                    "index": index,
+                    **({"customerID": record_id} if record_id else {}),
+                    **build_result(customer, probability),
+                    "model_version": bundle.version,
+                }
+                lines.append((index, result))
+
+            lines.sort(key=lambda item: item[0])
+            yield "".join(json.dumps(line) + "\n" for _, line in lines)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+# ✅ Bulk scores: ranked lookups from the index written by bulk_score.py, no model call
+score_index = ScoreIndexFile(SCORE_INDEX_PATH, check_seconds=SCORE_INDEX_CHECK_SECONDS)
+
+# /at-risk?top=50&contract=Month-to-month  (several contracts: contract=One year|Two year)
+@app.route("/at-risk", methods=["GET"])
+def at_risk():
+    try:
+        index = score_index.get()
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 503
+    try:
+        top = clamp_top(request.args.get("top"))
+        contracts = [c for c in request.args.get("contract", "").split("|") if c]
+        customers, matched = index.top(top, contracts)
+        return jsonify({"customers": customers, "matched": matched, **index.meta})
+    except (LookupError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/score/<customer_id>", methods=["GET"])
+def customer_score(customer_id):
+    try:
+        index = score_index.get()
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 503
+    entry = index.get(customer_id)
+    if entry is None:
+        return jsonify({"error": f"No score for customer {customer_id}"}), 404
+    return jsonify({**entry, **index.meta})
+
+
+# ✅ Generic aggregation: /aggregate?by=gender,Churn&metric=mean:MonthlyCharges,count&Contract=Month-to-month
+#    (add format=ndjson to any list endpoint to stream one row per line)
+@app.route("/aggregate", methods=["GET"])
+@responses.cached
+def aggregate():
+    snapshot = request_snapshot()
+    if snapshot is None:
+        return jsonify({"error": "The dataset is not loaded yet"}), 503
+    try:
+        by = [col.strip() for col in request.args.get("by", "").split(",") if col.strip()]
+        metrics = parse_metrics(request.args.get("metric", "count"))
+        filters = [
+            parse_filter(column, expression)
+            for column, expression in request.args.items(multi=True)
+            if column not in ("by", "metric", "format")
         ]
+        return run_aggregate(snapshot, aggregate_engine, by, metrics, filters)
+    except (LookupError, ValueError) as e:  # unknown column, metric or filter
+        return jsonify({"error": str(e)}), 400
+
+
+# ✅ All dashboard charts in one response, computed from a single data pass
+@app.route("/dashboard", methods=["GET"])
+@responses.cached
+def dashboard():
+    try:
+        bins = clamp_bins(request.args.get("bins"), default=24)
+        return charts.dashboard(request_snapshot(), aggregate_engine, tenure_bins=bins)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
-        return jsonify(result)
+# ✅ Gender vs. Monthly Charges
+@app.route("/gender-monthly-charges", methods=["GET"])
+@responses.cached
+def gender_vs_monthly_charges():
+    try:
+        return charts.gender_monthly_charges(request_snapshot(), aggregate_engine)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # ✅ Tenure vs. Monthly Charges
+#    ?mode=sample&n=1000 | mode=histogram&bins=20 | mode=hexbin&bins=20 keep the response size fixed
 @app.route("/tenure-monthly-charges", methods=["GET"])
+@responses.cached
 def tenure_vs_monthly_charges():
     try:
-        sheet_data = fetch_sheet_data()
-        headers = sheet_data[0] if sheet_data else []
-        
-        tenure_index = headers.index("tenure") if "tenure" in headers else -1
-        monthly_charges_index = headers.index("MonthlyCharges") if "MonthlyCharges" in headers else -1
-
-        if tenure_index == -1 or monthly_charges_index == -1:
-            return jsonify({"error": "Required columns not found"}), 500
-
-        tenure_values, monthly_charges_values = [], []
-
-        for row in sheet_data[1:]:
-            if len(row) > max(tenure_index, monthly_charges_index):
-                try:
-                    tenure_values.append(float(row[tenure_index]))
-                    monthly_charges_values.append(float(row[monthly_charges_index]))
-                except ValueError:
-                    continue
-
-        result = [{"tenure": tenure_values[i], "monthly_charges": monthly_charges_values[i]} for i in range(len(tenure_values))]
-
-        return jsonify(result)
+        mode = request.args.get("mode")
+        if mode and mode not in ("sample", "histogram", "hexbin"):
+            return jsonify({"error": f"Unknown mode '{mode}', expected histogram, hexbin or sample"}), 400
+        if mode:
+            bins = clamp_bins(request.args.get("bins"))
+            n = clamp_sample(request.args.get("n"))
+            return charts.tenure_monthly_charges_binned(request_snapshot(), mode, bins, n)
+        return charts.tenure_monthly_charges(request_snapshot())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # ✅ Churn Distribution
 @app.route("/churn-distribution", methods=["GET"])
+@responses.cached
 def churn_distribution():
     try:
-        sheet_data = fetch_sheet_data()
-        headers = sheet_data[0] if sheet_data else []
-        
-        churn_index = headers.index("Churn") if "Churn" in headers else -1
-
-        if churn_index == -1:
-            return jsonify({"error": "Required columns not found"}), 500
-
-        churn_counts = {"Yes": 0, "No": 0}
-
-        for row in sheet_data[1:]:
-            if len(row) > churn_index:
-                churn_value = row[churn_index]
-                if churn_value in churn_counts:
-                    churn_counts[churn_value] += 1
-
-        result = [
-            {"churn": "Yes", "count": churn_counts["Yes"]},
-            {"churn": "No", "count": churn_counts["No"]}
-        ]
-
-        return jsonify(result)
+        return charts.churn_distribution(request_snapshot(), aggregate_engine)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # ✅ Churn vs Gender vs Monthly Charges
 @app.route("/churn-gender-monthly-charges", methods=["GET"])
+@responses.cached
 def churn_gender_monthly_charges():
     try:
-        sheet_data = fetch_sheet_data()
-        if not sheet_data:
-            return jsonify({"error": "Google Sheets returned no data."}), 500
-
-        headers = sheet_data[0]
-        churn_index = headers.index("Churn") if "Churn" in headers else -1
-        gender_index = headers.index("gender") if "gender" in headers else -1
-        monthly_charges_index = headers.index("MonthlyCharges") if "MonthlyCharges" in headers else -1
-
-        if churn_index == -1 or gender_index == -1 or monthly_charges_index == -1:
-            return jsonify({"error": "Missing required columns"}), 500
-
-        data = {}
-
-        for row in sheet_data[1:]:
-            if len(row) > max(churn_index, gender_index, monthly_charges_index):
-                try:
-                    churn = row[churn_index]
-                    gender = row[gender_index]
-                    monthly_charges = float(row[monthly_charges_index])
-
-                    if churn not in data:
-                        data[churn] = {}
-
-                    if gender not in data[churn]:
-                        data[churn][gender] = []
-
-                    data[churn][gender].append(monthly_charges)
-
-                except ValueError:
-                    continue
-
-        result = []
-        for churn, gender_data in data.items():
-            for gender, charges in gender_data.items():
-                result.append({
-                    "churn": churn,
-                    "gender": gender,
-                    "avgMonthlyCharge": sum(charges) / len(charges)
-                })
-
-        return jsonify(result)
+        return charts.churn_gender_monthly_charges(request_snapshot(), aggregate_engine)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-# ✅ Churn vs Tenure
+# ✅ Churn vs Tenure (?mode=histogram&bins=24 or ?mode=sample&n=1000 keep the response size fixed)
 @app.route("/churn-tenure", methods=["GET"])
+@responses.cached
 def churn_tenure():
     try:
-        sheet_data = fetch_sheet_data()
-        if not sheet_data:
-            return jsonify({"error": "Google Sheets returned no data."}), 500
-
-        headers = sheet_data[0]
-        churn_index = headers.index("Churn") if "Churn" in headers else -1
-        tenure_index = headers.index("tenure") if "tenure" in headers else -1
-
-        if churn_index == -1 or tenure_index == -1:
-            return jsonify({"error": "Missing required columns"}), 500
-
-        data = {"Yes": [], "No": []}
-
-        for row in sheet_data[1:]:
-            if len(row) > max(churn_index, tenure_index):
-                try:
-                    churn = row[churn_index]
-                    tenure = float(row[tenure_index])
-                    if churn in data:
-                        data[churn].append(tenure)
-                except ValueError:
-                    continue
-
-        result = []
-        for churn, tenure_values in data.items():
-            result.append({
-                "churn": churn,
-                "tenure_values": tenure_values
-            })
-
-        return jsonify(result)
+        mode = request.args.get("mode")
+        if mode == "histogram":
+            bins = clamp_bins(request.args.get("bins"), default=24)
+            return charts.churn_tenure_histogram(request_snapshot(), aggregate_engine, bins=bins)
+        if mode == "sample":
+            return charts.churn_tenure_sample(request_snapshot(), clamp_sample(request.args.get("n")))
+        if mode:
+            return jsonify({"error": f"Unknown mode '{mode}', expected histogram or sample"}), 400
+        return charts.churn_tenure(request_snapshot(), aggregate_engine)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # ✅ Gender vs Payment Method vs Churn
 @app.route("/gender-payment-method-churn", methods=["GET"])
+@responses.cached
 def gender_payment_method_churn():
     try:
-        sheet_data = fetch_sheet_data()
-        if not sheet_data:
-            return jsonify({"error": "Google Sheets returned no data."}), 500
-
-        headers = sheet_data[0]
-        gender_index = headers.index("gender") if "gender" in headers else -1
-        payment_method_index = headers.index("PaymentMethod") if "PaymentMethod" in headers else -1
-        churn_index = headers.index("Churn") if "Churn" in headers else -1
-
-        if gender_index == -1 or payment_method_index == -1 or churn_index == -1:
-            return jsonify({"error": "Missing required columns"}), 500
-
-        data = {}
-
-        for row in sheet_data[1:]:
-            if len(row) > max(gender_index, payment_method_index, churn_index):
-                try:
-                    gender = row[gender_index]
-                    payment_method = row[payment_method_index]
-                    churn = row[churn_index]
-
-                    if gender not in data:
-                        data[gender] = {}
-
-                    if payment_method not in data[gender]:
-                        data[gender][payment_method] = {"Yes": 0, "No": 0}
-
-                    data[gender][payment_method][churn] += 1
-                except ValueError:
-                    continue
-
-        result = []
-        for gender, payment_method_data in data.items():
-            for payment_method, churn_data in payment_method_data.items():
-                result.append({
-                    "gender": gender,
-                    "payment_method": payment_method,
-                    "churn_yes": churn_data["Yes"],
-                    "churn_no": churn_data["No"]
-                })
-
-        return jsonify(result)
+        return charts.gender_payment_method_churn(request_snapshot(), aggregate_engine)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # ✅ Gender vs Streaming Movies
 @app.route("/gender-streaming-movies", methods=["GET"])
+@responses.cached
 def gender_streaming_movies():
     try:
-        sheet_data = fetch_sheet_data()
-        if not sheet_data:
-            return jsonify({"error": "Google Sheets returned no data."}), 500
-
-        headers = sheet_data[0]
-        gender_index = headers.index("gender") if "gender" in headers else -1
-        streaming_movies_index = headers.index("StreamingMovies") if "StreamingMovies" in headers else -1
-
-        if gender_index == -1 or streaming_movies_index == -1:
-            return jsonify({"error": "Missing required columns"}), 500
-
-        data = {}
-
-        for row in sheet_data[1:]:
-            if len(row) > max(gender_index, streaming_movies_index):
-                try:
-                    gender = row[gender_index]
-                    streaming_movies = row[streaming_movies_index]
-
-                    if gender not in data:
-                        data[gender] = {}
-
-                    if streaming_movies not in data[gender]:
-                        data[gender][streaming_movies] = 0
-
-                    data[gender][streaming_movies] += 1
-                except ValueError:
-                    continue
-
-        result = []
-        for gender, streaming_data in data.items():
-            for streaming_movies, count in streaming_data.items():
-                result.append({
-                    "gender": gender,
-                    "streaming_movies": streaming_movies,
-                    "count": count
-                })
-
-        return jsonify(result)
+        return charts.gender_streaming_movies(request_snapshot(), aggregate_engine)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # ✅ Run Flask Server
 if __name__ == "__main__":
+    # With debug=True the reloader re-runs this file in a child process; only warm up there
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" and STARTUP_MODE != "lazy":
+        start_warm_up(background=STARTUP_MODE != "eager")
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from processes import ProcessThread
+
+_STOP = object()  # queued by close(): score what is already queued, then exit
+
+# ✅ Batch-size histogram buckets (upper bounds)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item requests into one `predict_batch` call.
+
+    Callers block on `predict(item)`. A single worker thread collects queued
+    items until `max_batch_size` is reached or `max_wait_ms` has passed since
+    the first item arrived, runs `predict_batch(items)` once and hands every
+    caller its own result (or the exception).
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=5.0):
+        self._predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = ProcessThread(self._run, "predict-batcher")
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._histogram_overflow = 0
+
+    def submit(self, item):
+        self._worker.ensure(on_fork=self._reset_queue)
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self, timeout=10.0):
+        """Let the worker score everything already queued, then stop it (graceful shutdown)."""
+        if not self._worker.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            histogram = {f"<={bucket}": count for bucket, count in self._histogram.items()}
+            histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] = self._histogram_overflow
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "requests": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "queued": self._queue.qsize(),
+                "batch_size_histogram": histogram,
+            }
+
+    def _reset_queue(self):
+        self._queue = queue.Queue()  # the parent's queue and its pending futures belong to the parent
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    self._flush(batch)
+                    return
+                batch.append(entry)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = list(self._predict_batch(items))
+            if len(results) != len(batch):
+                raise RuntimeError(f"predict_batch returned {len(results)} results for {len(batch)} items")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():  # callers already answered keep their result
+                    future.set_exception(e)
+        self._record(len(batch))
+
+    def _record(self, size):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._largest_batch = max(self._largest_batch, size)
+            for bucket in BATCH_SIZE_BUCKETS:
+                if size <= bucket:
+                    self._histogram[bucket] += 1
+                    break
+            else:
+                self._histogram_overflow += 1
@@ -0,0 +1,418 @@
+import argparse
+import csv
+import http.client
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS_DIR = os.path.join(BASE_DIR, "benchmark_results")
+
+# ✅ Chart routes hit by the load test (GET)
+CHART_PATHS = [
+    "/dashboard",
+    "/gender-monthly-charges",
+    "/churn-distribution",
+    "/churn-gender-monthly-charges",
+    "/churn-tenure?mode=histogram&bins=24",
+    "/gender-payment-method-churn",
+    "/gender-streaming-movies",
+    "/tenure-monthly-charges?mode=sample&n=2000",
+    "/aggregate?by=Contract,Churn&metric=count,mean:MonthlyCharges",
+]
+
+
+# ✅ Small helpers
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1)  # nearest-rank percentile
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize_ms(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def rss_bytes(pid):
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(args):
+    return {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key != "func"},
+    }
+
+
+def load_customers(csv_path, limit):
+    """Customers for /predict built from the bundled CSV, so the inputs look like real traffic."""
+    customers = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            customers.append({
+                "customerID": row.get("customerID"),
+                "tenure": row.get("tenure") or 0,
+                "monthlyCharges": row.get("MonthlyCharges") or 0,
+                "totalCharges": (row.get("TotalCharges") or "").strip() or 0,
+                "contract": row.get("Contract"),
+                "internetService": row.get("InternetService"),
+            })
+            if len(customers) >= limit:
+                break
+    return customers
+
+
+# ✅ The API in a child process, fed by the CSV data source instead of Google Sheets
+class ServerProcess:
+    def __init__(self, port=None, env=None):
+        self.port = port or self._free_port()
+        self.env = {**os.environ, "DATA_SOURCE": "csv", **(env or {})}
+        self.process = None
+
+    @staticmethod
+    def _free_port():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def start(self, ready_timeout=120.0):
+        code = (
+            "import app; app.start_warm_up(background=True); "
+            f"app.app.run(host='127.0.0.1', port={self.port}, threaded=True, debug=False, use_reloader=False)"
+        )
+        self.process = subprocess.Popen([sys.executable, "-c", code], cwd=BASE_DIR, env=self.env)
+        deadline = time.time() + ready_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"❌ Server exited with code {self.process.returncode}")
+            try:
+                status, _ = request("127.0.0.1", self.port, "GET", "/ready", timeout=2.0)
+                if status == 200:
+                    return True
+            except OSError:
+                pass
+            time.sleep(0.5)
+        print(f"⚠️ Server not ready after {ready_timeout}s, benchmarking anyway (see /ready for what failed)")
+        return False
+
+    def rss(self):
+        return rss_bytes(self.process.pid) if self.process else None
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def request(host, port, method, path, body=None, headers=None, timeout=30.0):
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        conn.request(method, path, body=payload, headers={"Content-Type": "application/json", **(headers or {})})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, data
+    finally:
+        conn.close()
+
+
+# ✅ Drive one scenario from `concurrency` threads for `duration` seconds (or `requests` requests)
+def run_scenario(server, name, make_request, concurrency, duration, max_requests=None):
+    latencies, errors, statuses = [], 0, {}
+    lock = threading.Lock()
+    counter = iter(range(10 ** 12))
+    deadline = time.perf_counter() + duration
+    peak_rss = [server.rss() or 0]
+    stop_sampling = threading.Event()
+
+    def sample_rss():
+        while not stop_sampling.wait(0.2):
+            peak_rss[0] = max(peak_rss[0], server.rss() or 0)
+
+    def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            if max_requests is not None and i >= max_requests:
+                return
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            try:
+                status, _ = request("127.0.0.1", server.port, method, path, body)
+            except OSError:
+                status = "connection_error"
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if status in (200, 304):
+                    latencies.append(elapsed_ms)
+                else:
+                    errors += 1
+
+    rss_before = server.rss()
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+    stop_sampling.set()
+    sampler.join()
+
+    result = {
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "errors": errors,
+        "statuses": statuses,
+        "latency": summarize_ms(latencies),
+        "rss_before_bytes": rss_before,
+        "rss_peak_bytes": max(peak_rss[0], server.rss() or 0) or None,
+    }
+    lat = result["latency"]
+    print(f"📈 {name}: {result['throughput_rps']} req/s, p50 {lat.get('p50_ms')} ms, "
+          f"p95 {lat.get('p95_ms')} ms, p99 {lat.get('p99_ms')} ms, errors {errors}")
+    return result
+
+
+def load_test(args):
+    customers = load_customers(args.csv, args.customers)
+    batch_body = customers[:args.batch_size]
+    scenarios = {
+        "predict": lambda i: ("POST", "/predict", customers[i % len(customers)]),
+        "predict_repeat": lambda i: ("POST", "/predict", customers[0]),
+        "charts": lambda i: ("GET", CHART_PATHS[i % len(CHART_PATHS)], None),
+        "predict_batch": lambda i: ("POST", "/predict/batch", batch_body),
+    }
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+
+    env = {"MODEL_RUNTIME": args.runtime} if args.runtime else {}
+    server = ServerProcess(env=env)
+    results = {"meta": run_metadata(args), "scenarios": {}}
+    try:
+        results["meta"]["ready"] = server.start(ready_timeout=args.ready_timeout)
+        results["meta"]["rss_idle_bytes"] = server.rss()
+        for name in selected:
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                key = f"{name}@{concurrency}"
+                results["scenarios"][key] = run_scenario(
+                    server, key, scenarios[name], concurrency, args.duration,
+                    max_requests=args.requests or None,
+                )
+    finally:
+        server.stop()
+    return results
+
+
+# ✅ In-process micro-benchmarks for the hot paths
+def time_call(fn, repeat=200, warmup=5):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "mean_us": round(sum(samples) / len(samples), 2),
+        "p50_us": round(percentile(samples, 50), 2),
+        "p95_us": round(percentile(samples, 95), 2),
+        "min_us": round(samples[0], 2),
+    }
+
+
+def micro_benchmarks(args):
+    from aggregates import AggregateEngine, table_group_by
+    import charts
+    from data_source import CsvSource
+    from scoring import parse_customer, prepare_features
+    from snapshot import Snapshot, values_version
+    from table import CustomerTable
+
+    results = {"meta": run_metadata(args), "micro": {}}
+    micro = results["micro"]
+
+    def record(name, fn, repeat=args.repeat):
+        micro[name] = time_call(fn, repeat=repeat)
+        print(f"⏱️ {name}: p50 {micro[name]['p50_us']} µs, p95 {micro[name]['p95_us']} µs")
+
+    # Aggregations over the bundled CSV
+    values = CsvSource(args.csv).fetch_values()
+    snapshot = Snapshot(CustomerTable.from_values(values), values_version(values), time.time())
+    record("table.from_values", lambda: CustomerTable.from_values(values), repeat=max(1, args.repeat // 20))
+
+    def rebuild():
+        engine = AggregateEngine()
+        for by, metrics in charts.CHART_QUERIES:
+            engine.register_query(by, metrics)
+        engine.sync(snapshot)
+        return engine
+
+    record("aggregate.engine_full_sync", rebuild, repeat=max(1, args.repeat // 20))
+    engine = rebuild()
+    for by, metrics in charts.CHART_QUERIES:
+        label = "+".join(by)
+        record(f"aggregate.engine.{label}", lambda by=by, metrics=metrics: engine.group_by(by, metrics))
+        record(f"aggregate.table.{label}",
+               lambda by=by, metrics=metrics: table_group_by(snapshot.table, by, metrics))
+    record("charts.dashboard", lambda: charts.dashboard(snapshot, engine))
+
+    # Feature preparation and model calls need the trained artifacts
+    try:
+        from bundle import ModelBundle
+
+        model_dir = os.environ.get("MODEL_DIR", os.path.join(BASE_DIR, "model"))
+        bundle = ModelBundle.load_flat(model_dir, args.runtime or os.environ.get("MODEL_RUNTIME", "keras"))
+    except Exception as e:
+        print(f"⚠️ Skipping feature/model benchmarks, could not load model artifacts: {e}")
+        return results
+
+    customers = [parse_customer(c) for c in load_customers(args.csv, 1024)]
+    micro["model.runtime"] = bundle.runtime
+    for n in (1, 64, 1024):
+        batch = customers[:n]
+        record(f"features.pandas[{n}]", lambda batch=batch: prepare_features(batch, bundle.encoder, bundle.scaler),
+               repeat=max(1, args.repeat // 10))
+        record(f"features.transform[{n}]", lambda batch=batch: bundle.transform(batch))
+        rows = list(range(n))
+        record(f"features.transform_table[{n}]", lambda rows=rows: bundle.transform_table(snapshot.table, rows))
+        X = bundle.transform(batch)
+        record(f"model.predict_on_batch[{n}]", lambda X=X: bundle.model.predict_on_batch(X), repeat=max(1, args.repeat // 10))
+    return results
+
+
+# ✅ Compare two result files: percentage change of every latency / throughput figure
+COMPARED_FIELDS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "p50_us", "p95_us")
+
+
+def _flatten(results):
+    flat = {}
+    for section in ("scenarios", "micro"):
+        for name, entry in results.get(section, {}).items():
+            if not isinstance(entry, dict):
+                continue
+            for field in COMPARED_FIELDS:
+                value = entry.get(field, entry.get("latency", {}).get(field))
+                if isinstance(value, (int, float)):
+                    flat[f"{section}.{name}.{field}"] = value
+    return flat
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = _flatten(json.load(f))
+    with open(args.candidate) as f:
+        candidate = _flatten(json.load(f))
+
+    regressions = []
+    for key in sorted(set(baseline) & set(candidate)):
+        before, after = baseline[key], candidate[key]
+        change = (after - before) / before * 100.0 if before else 0.0
+        worse = -change if key.endswith("throughput_rps") else change
+        flag = "❌" if worse > args.threshold else "  "
+        if worse > args.threshold:
+            regressions.append(key)
+        print(f"{flag} {key}: {before} -> {after} ({change:+.1f}%)")
+    if regressions:
+        raise SystemExit(f"❌ {len(regressions)} figures regressed by more than {args.threshold}%")
+    print("✅ No regressions above the threshold")
+
+
+def save(results, out, kind):
+    if out is None:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        out = os.path.join(DEFAULT_RESULTS_DIR, f"{kind}-{stamp}-{results['meta']['commit'] or 'nogit'}.json")
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {out}")
+
+
+# ✅ python benchmark.py load --concurrency 1,8,32 --duration 20 | micro | compare old.json new.json
+def main():
+    parser = argparse.ArgumentParser(description="Load and micro benchmarks for the churn API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load", help="start the API on the CSV data source and drive it over HTTP")
+    load.add_argument("--scenarios", default="", help="comma-separated: predict,predict_repeat,charts,predict_batch")
+    load.add_argument("--concurrency", default="1,8,32")
+    load.add_argument("--duration", type=float, default=10.0, help="seconds per scenario and concurrency level")
+    load.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    load.add_argument("--customers", type=int, default=5000, help="distinct /predict inputs taken from the CSV")
+    load.add_argument("--batch-size", type=int, default=500, help="records per /predict/batch request")
+    load.add_argument("--ready-timeout", type=float, default=120.0)
+
+    micro = commands.add_parser("micro", help="in-process timings of feature prep, model calls and aggregations")
+    micro.add_argument("--repeat", type=int, default=200)
+
+    for sub in (load, micro):
+        sub.add_argument("--csv", default=os.environ.get("DATA_CSV_PATH", os.path.join(BASE_DIR, "..", "telco-churn.csv")))
+        sub.add_argument("--runtime", default=None, choices=["keras", "numpy", "student"])
+        sub.add_argument("--out", default=None, help=f"JSON file (default: {DEFAULT_RESULTS_DIR}/<kind>-<time>-<commit>.json)")
+
+    cmp = commands.add_parser("compare", help="compare two result files and fail on regressions")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+    cmp.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        save(load_test(args), args.out, "load")
+    elif args.command == "micro":
+        save(micro_benchmarks(args), args.out, "micro")
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
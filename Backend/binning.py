@@ -0,0 +1,82 @@
+import numpy as np
+
+# ✅ Size limits so a request cannot ask for an unbounded response
+MAX_BINS = 200
+MAX_SAMPLE = 20000
+
+
+def _parse_count(value, name, default):
+    if not value:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer, got '{value}'")
+
+
+def clamp_bins(bins, default=20):
+    return max(1, min(_parse_count(bins, "bins", default), MAX_BINS))
+
+
+def clamp_sample(n, default=1000):
+    return max(1, min(_parse_count(n, "n", default), MAX_SAMPLE))
+
+
+# ✅ 2D histogram on a bins x bins grid
+def histogram_2d(x, y, bins):
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    return x_edges.tolist(), y_edges.tolist(), counts.astype(int).tolist()
+
+
+# ✅ Hexagonal binning (same lattice layout as matplotlib's hexbin); only non-empty cells are returned
+def hexbin(x, y, gridsize):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0:
+        return []
+
+    nx = gridsize
+    ny = max(1, int(round(nx / np.sqrt(3))))
+    xmin, xmax = x.min(), x.max()
+    ymin, ymax = y.min(), y.max()
+    sx = (xmax - xmin) / nx or 1.0
+    sy = (ymax - ymin) / ny or 1.0
+
+    # Position on two offset rectangular lattices; each point goes to the nearer centre
+    ix = (x - xmin) / sx
+    iy = (y - ymin) / sy
+    ix1, iy1 = np.round(ix), np.round(iy)
+    ix2, iy2 = np.floor(ix), np.floor(iy)
+    d1 = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2
+    d2 = (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    use_first = d1 < d2
+
+    centre_x = np.where(use_first, ix1, ix2 + 0.5) * sx + xmin
+    centre_y = np.where(use_first, iy1, iy2 + 0.5) * sy + ymin
+    centres, counts = np.unique(np.column_stack([centre_x, centre_y]), axis=0, return_counts=True)
+    return [
+        {"x": float(cx), "y": float(cy), "count": int(count)}
+        for (cx, cy), count in zip(centres, counts)
+    ]
+
+
+# ✅ Stratified sample of exactly `n` rows: each stratum keeps its share, rounded by largest remainder
+#    (deterministic for a given seed)
+def stratified_sample_indexes(strata, n, seed=42):
+    strata = np.asarray(strata)
+    total = len(strata)
+    if total <= n:
+        return np.arange(total)
+
+    values, sizes = np.unique(strata, return_counts=True)
+    quotas = n * sizes / total
+    takes = np.floor(quotas).astype(np.int64)
+    leftover = n - int(takes.sum())
+    takes[np.argsort(takes - quotas, kind="stable")[:leftover]] += 1  # largest fractional parts first
+
+    rng = np.random.default_rng(seed)
+    picked = [
+        rng.choice(np.flatnonzero(strata == value), size=take, replace=False)
+        for value, take in zip(values, takes.tolist())
+    ]
+    return np.sort(np.concatenate(picked))
@@ -0,0 +1,296 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from scoring import churn_label, personalized_offer, predict_table_probabilities, table_customers
+from processes import spawn_pool
+from snapshot import values_version
+from table import ID_COLUMN, CustomerTable, encode_categories
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(BASE_DIR, "model"))
+
+# ✅ Bulk scoring: python bulk_score.py  (scores every customer of DATA_SOURCE with the active model bundle)
+SCORE_INDEX_PATH = os.environ.get("SCORE_INDEX_PATH", os.path.join(MODEL_DIR, "customer_scores.npz"))
+SCORE_WORKERS = int(os.environ.get("SCORE_WORKERS", "0"))  # 0 = one process per CPU core
+SCORE_CHUNK_SIZE = int(os.environ.get("SCORE_CHUNK_SIZE", "50000"))  # rows per task sent to a worker
+MAX_TOP = 10000
+
+
+def clamp_top(n, default=50):
+    n = int(n) if n else default
+    return max(1, min(n, MAX_TOP))
+
+
+# ✅ The bundle the API would serve: bundles/CURRENT, or the flat files in MODEL_DIR until a bundle exists
+def load_active_bundle(model_dir, runtime, **tolerance):
+    from bundle import ModelBundle, read_current
+
+    bundles_dir = os.environ.get("MODEL_BUNDLES_DIR", os.path.join(model_dir, "bundles"))
+    version = read_current(bundles_dir)
+    if version is not None:
+        return ModelBundle.load(os.path.join(bundles_dir, version), runtime, **tolerance)
+    return ModelBundle.load_flat(model_dir, runtime, **tolerance)
+
+
+# ✅ Score rows [start, stop): probabilities plus the offers, dictionary-encoded so little crosses the process pipe
+def score_rows(table, bundle, start, stop, batch_size=1024):
+    rows = np.arange(start, stop)
+    probabilities = predict_table_probabilities(table, bundle.transform_table, bundle.model, rows,
+                                                chunk_size=len(rows) or 1, batch_size=batch_size)
+    offers = [
+        personalized_offer(customer, churn_label(probability))
+        for customer, probability in zip(table_customers(table, rows), probabilities.tolist())
+    ]
+    offer_codes, offer_categories = encode_categories(offers)
+    return probabilities, offer_codes, offer_categories, (bundle.version, bundle.runtime)
+
+
+# Each worker process loads the table and the bundle once, then scores row ranges
+_worker = {}
+
+
+def _init_worker(table, model_dir, runtime, tolerance):
+    _worker["table"] = table
+    _worker["bundle"] = load_active_bundle(model_dir, runtime, **tolerance)
+
+
+def _score_range(bounds):
+    return score_rows(_worker["table"], _worker["bundle"], *bounds)
+
+
+# ✅ Stream the table through features + model in SCORE_CHUNK_SIZE ranges spread over `workers` processes
+def score_table(table, model_dir, runtime, workers=1, chunk_size=SCORE_CHUNK_SIZE, **tolerance):
+    """(probability per row, offer code per row, offer dictionary, model version, runtime); each worker loads the
+    active bundle, and the runtime is the one it resolved (e.g. keras when the student is out of tolerance)."""
+    ranges = [(start, min(start + chunk_size, len(table))) for start in range(0, len(table), chunk_size)]
+    probabilities = np.empty(len(table), dtype=np.float32)
+    offer_codes = np.empty(len(table), dtype=np.uint32)
+    offers, models = [], set()
+
+    def collect(results):
+        nonlocal offers
+        for (start, stop), (chunk_probabilities, chunk_codes, chunk_offers, model) in zip(ranges, results):
+            # Re-key each chunk's offer dictionary into the global one
+            mapping, offers = encode_categories(chunk_offers, offers)
+            probabilities[start:stop] = chunk_probabilities
+            offer_codes[start:stop] = mapping[chunk_codes] if len(chunk_codes) else chunk_codes
+            models.add(model)
+
+    if workers <= 1 or len(ranges) <= 1:
+        bundle = load_active_bundle(model_dir, runtime, **tolerance)
+        models.add((bundle.version, bundle.runtime))
+        collect(score_rows(table, bundle, start, stop) for start, stop in ranges)
+    else:
+        # The table is sent to each worker once
+        with spawn_pool(min(workers, len(ranges)), _init_worker, (table, model_dir, runtime, tolerance)) as pool:
+            collect(pool.map(_score_range, ranges))
+    if len(models) > 1:
+        used = ", ".join(f"{version} ({runtime})" for version, runtime in sorted(models))
+        raise RuntimeError(f"The active model bundle changed while scoring ({used}); run again")
+    version, resolved_runtime = models.pop()
+    return probabilities, offer_codes, offers, version, resolved_runtime
+
+
+# ✅ Ranked index file: one entry per customer, highest churn probability first
+def write_index(path, table, probabilities, offer_codes, offers, meta):
+    if ID_COLUMN not in table:
+        raise ValueError(f"The dataset has no {ID_COLUMN} column to key the scores by")
+    order = np.argsort(-probabilities, kind="stable")
+    contract = table.codes("Contract") if table.is_categorical("Contract") else np.zeros(len(table), np.uint8)
+    contracts = table.categories("Contract") if table.is_categorical("Contract") else [""]
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            ids=np.char.encode(table.labels(ID_COLUMN, order), "utf-8"),
+            probability=probabilities[order],
+            contract=contract[order],
+            contracts=np.array(contracts, dtype=str),
+            offer=offer_codes[order],
+            offers=np.array(offers, dtype=str),
+            meta=np.array(json.dumps({**meta, "rows": len(table)})),
+        )
+    os.replace(tmp_path, path)  # the API sees the old or the new index, never half of one
+
+
+class ScoreIndex:
+    """Read side of the bulk scores, loaded from the file `bulk_score.py` writes.
+
+    Entries are stored in rank order (highest churn probability first), so
+    `top(n)` is a slice. Each contract keeps the ranks of its customers, so
+    `top(n, contract)` reads the first n of that list. `get(customer_id)` is
+    a binary search over the sorted IDs: O(log n), without a per-customer
+    Python dict.
+    """
+
+    def __init__(self, ids, probability, contract, contracts, offer, offers, meta):
+        self.ids = ids
+        self.probability = probability
+        self.contract = contract
+        self.contracts = list(contracts)
+        self.offer = offer
+        self.offers = list(offers)
+        self.meta = meta
+        self._id_order = np.argsort(ids, kind="stable")
+        self._sorted_ids = ids[self._id_order]
+        self._ranks_by_contract = {
+            name: np.flatnonzero(contract == code) for code, name in enumerate(self.contracts)
+        }
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["ids"], data["probability"], data["contract"], data["contracts"].tolist(),
+                data["offer"], data["offers"].tolist(), json.loads(str(data["meta"])),
+            )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def entry(self, rank):
+        probability = float(self.probability[rank])
+        return {
+            "customerID": self.ids[rank].decode("utf-8"),
+            "rank": int(rank) + 1,
+            "churn_probability": probability,
+            "churn": churn_label(probability),
+            "personalized_offer": self.offers[self.offer[rank]],
+            "contract": self.contracts[self.contract[rank]],
+        }
+
+    def get(self, customer_id):
+        key = customer_id.encode("utf-8")
+        i = int(np.searchsorted(self._sorted_ids, key))
+        if i == len(self._sorted_ids) or self._sorted_ids[i] != key:
+            return None
+        return self.entry(self._id_order[i])
+
+    def top(self, n, contracts=None):
+        """(entries of the n highest-risk customers, customers matched); `contracts` narrows to those contracts."""
+        unknown = [name for name in contracts or () if name not in self._ranks_by_contract]
+        if unknown:
+            raise LookupError(f"Unknown contract: {', '.join(unknown)} (expected one of: {', '.join(self.contracts)})")
+        if not contracts:
+            ranks, matched = np.arange(min(n, len(self))), len(self)
+        else:
+            lists = [self._ranks_by_contract[name] for name in contracts]
+            ranks = np.sort(np.concatenate([part[:n] for part in lists]))[:n]
+            matched = sum(len(part) for part in lists)
+        return [self.entry(rank) for rank in ranks.tolist()], matched
+
+    def status(self):
+        return {**self.meta, "entries": len(self)}
+
+
+class ScoreIndexFile:
+    """The latest ScoreIndex at `path`; re-read when the file changes (checked at most every `check_seconds`)."""
+
+    def __init__(self, path, check_seconds=5.0):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._index = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.last_error = None
+
+    def get(self):
+        if time.time() - self._checked_at >= self.check_seconds:
+            with self._lock:
+                if time.time() - self._checked_at >= self.check_seconds:
+                    self._reload_if_changed()
+        if self._index is None:
+            raise FileNotFoundError(f"No customer scores at {self.path}; run `python bulk_score.py` first")
+        return self._index
+
+    def status(self):
+        index = self._index
+        return {"path": self.path, "loaded": index is not None, "last_error": self.last_error,
+                **(index.status() if index is not None else {})}
+
+    def _reload_if_changed(self):
+        self._checked_at = time.time()
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return  # keep serving the index already loaded, if any
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        try:
+            self._index = ScoreIndex.load(self.path)
+            self._stamp = stamp
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Could not load customer scores from {self.path}: {e}")
+
+
+def export_csv(path, index):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "customerID", "churn_probability", "churn", "Contract", "personalized_offer"])
+        for rank in range(len(index)):
+            entry = index.entry(rank)
+            writer.writerow([entry["rank"], entry["customerID"], round(entry["churn_probability"], 6), entry["churn"],
+                             entry["contract"], entry["personalized_offer"]])
+
+
+# ✅ python bulk_score.py [--workers 8] [--csv scores.csv]
+def main():
+    from data_source import get_data_source
+    from wsgi import limit_threads, thread_limits
+
+    parser = argparse.ArgumentParser(description="Score every customer and write the ranked at-risk index.")
+    parser.add_argument("--source", default=None, help="data source (defaults to DATA_SOURCE)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--runtime", default=os.environ.get("MODEL_RUNTIME", "keras").lower(),
+                        choices=["keras", "numpy", "student"])
+    parser.add_argument("--workers", type=int, default=SCORE_WORKERS, help="scoring processes (0 = CPU cores)")
+    parser.add_argument("--chunk-size", type=int, default=SCORE_CHUNK_SIZE)
+    parser.add_argument("--out", default=SCORE_INDEX_PATH)
+    parser.add_argument("--csv", default=None, help="also write the ranked scores as CSV")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    limit_threads(*thread_limits(workers))  # inherited by the workers, so they do not oversubscribe the cores
+    tolerance = {
+        "max_auc_drop": float(os.environ.get("STUDENT_MAX_AUC_DROP", "0.01")),
+        "min_agreement": float(os.environ.get("STUDENT_MIN_AGREEMENT", "0.97")),
+    }
+
+    started = time.perf_counter()
+    source = get_data_source(args.source)
+    values = source.fetch_values()
+    table = CustomerTable.from_values(values)
+    loaded = time.perf_counter()
+    print(f"✅ Loaded {len(table)} customers from '{source.name}' in {loaded - started:.1f} s")
+
+    probabilities, offer_codes, offers, version, runtime = score_table(
+        table, args.model_dir, args.runtime, workers=workers, chunk_size=max(1, args.chunk_size), **tolerance
+    )
+    scored = time.perf_counter()
+    print(f"✅ Scored {len(table)} customers on {workers} worker(s) in {scored - loaded:.1f} s "
+          f"({len(table) / max(scored - loaded, 1e-9):.0f} rows/s)")
+
+    meta = {"model_version": version, "runtime": runtime, "dataset_version": values_version(values),
+            "source": source.name, "scored_at": time.time()}
+    write_index(args.out, table, probabilities, offer_codes, offers, meta)
+    at_risk = int((probabilities >= 0.5).sum())
+    print(f"💾 Index written to {args.out}: {at_risk} of {len(table)} customers predicted to churn")
+    if args.csv:
+        export_csv(args.csv, ScoreIndex.load(args.out))
+        print(f"💾 Ranked scores written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from cache import artifacts_fingerprint
+from features import build_transforms
+from processes import ProcessThread
+from scoring import NUMERIC_FEATURES
+
+# ✅ Bundle layout: model/bundles/<version>/{bundle.json, encoder.pkl, scaler.pkl, model files}
+BUNDLE_FILE = "bundle.json"
+POINTER_FILE = "CURRENT"
+ENCODER_FILE = "encoder.pkl"
+SCALER_FILE = "scaler.pkl"
+MODEL_FILES = {"keras": "model.keras", "numpy": "model.npz", "student": "student.joblib"}
+
+# ✅ Flat files written by preprocess.py / train_model.py / numpy_model.py / distill.py
+FLAT_ENCODER = "encoder_churn.pkl"
+FLAT_SCALER = "scaler_churn.pkl"
+FLAT_MODEL_FILES = {"keras": "best_churn_model.keras", "numpy": "churn_model_weights.npz", "student": "churn_student.joblib"}
+
+
+def _file_sha1(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_current(bundles_dir):
+    try:
+        with open(os.path.join(bundles_dir, POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def set_current(bundles_dir, version):
+    # Only plain bundle names listed in `bundles_dir` (never a path such as "../x")
+    if os.path.basename(version) != version or version not in list_bundles(bundles_dir):
+        raise LookupError(f"❌ Unknown model bundle: {version}")
+    tmp_path = os.path.join(bundles_dir, POINTER_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, os.path.join(bundles_dir, POINTER_FILE))  # readers see the old or the new version, never half
+
+
+def list_bundles(bundles_dir):
+    if not os.path.isdir(bundles_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(bundles_dir)
+        if os.path.exists(os.path.join(bundles_dir, name, BUNDLE_FILE))
+    )
+
+
+# ✅ Package the flat artifacts in `model_dir` as a new immutable bundle
+def create_bundle(model_dir, bundles_dir, activate=False, note=None):
+    files = {ENCODER_FILE: FLAT_ENCODER, SCALER_FILE: FLAT_SCALER}
+    files.update({
+        MODEL_FILES[runtime]: flat for runtime, flat in FLAT_MODEL_FILES.items()
+        if os.path.exists(os.path.join(model_dir, flat))
+    })
+    if MODEL_FILES["student"] in files:
+        # A student distilled from an earlier teacher is out of tolerance, so it is left out of the bundle
+        from distill import teacher_checksum
+
+        report = _read_json(os.path.join(model_dir, "student_report.json"))
+        flat_paths = {rt: os.path.join(model_dir, flat) for rt, flat in FLAT_MODEL_FILES.items()}
+        teacher_sha1 = current_teacher_sha1(report, flat_paths)
+        if teacher_sha1 is None or teacher_checksum(report) != teacher_sha1:
+            print(f"⚠️ Not bundling {FLAT_MODEL_FILES['student']}: it was not distilled from the current teacher "
+                  f"(run distill.py again)")
+            del files[MODEL_FILES["student"]]
+    if not any(name in files for name in MODEL_FILES.values()):
+        raise FileNotFoundError(f"❌ No model file found in {model_dir}")
+
+    checksums = {name: _file_sha1(os.path.join(model_dir, flat)) for name, flat in files.items()}
+    content_hash = hashlib.sha1(json.dumps(checksums, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{content_hash}"
+
+    import joblib
+
+    encoder = joblib.load(os.path.join(model_dir, FLAT_ENCODER))
+    preprocess_manifest = _read_json(os.path.join(model_dir, "manifest.json")) or {}
+    fold_metrics = _read_json(os.path.join(model_dir, "fold_metrics.json")) or {}
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "feature_order": NUMERIC_FEATURES + list(encoder.get_feature_names_out()),
+        "models": {runtime: name for runtime, name in MODEL_FILES.items() if name in files},
+        "files": checksums,
+        "metadata": {
+            "note": note,
+            "data_fingerprint": preprocess_manifest.get("stages", {}).get("churn", {}).get("data_fingerprint"),
+            "best_fold": fold_metrics.get("best_fold"),
+            "student_report": _read_json(os.path.join(model_dir, "student_report.json")),
+        },
+    }
+
+    os.makedirs(bundles_dir, exist_ok=True)
+    staging = os.path.join(bundles_dir, f".staging-{version}")
+    os.makedirs(staging)
+    for name, flat in files.items():
+        shutil.copy2(os.path.join(model_dir, flat), os.path.join(staging, name))
+    with open(os.path.join(staging, BUNDLE_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(staging, os.path.join(bundles_dir, version))  # a bundle directory is complete or absent
+
+    if activate:
+        set_current(bundles_dir, version)
+    return manifest
+
+
+# ✅ Checksum of the teacher file a student report refers to, as it is on disk now (None when missing)
+def current_teacher_sha1(report, model_paths):
+    teacher = (report or {}).get("teacher") or {}
+    path = model_paths.get(teacher.get("runtime", "keras"))
+    return _file_sha1(path) if path and os.path.exists(path) else None
+
+
+# ✅ Load the model for `runtime`; the student is only used within its accuracy tolerance of its own teacher
+def load_model(model_paths, runtime, max_auc_drop=0.01, min_agreement=0.97):
+    if runtime == "student" and "student" in model_paths:
+        from distill import StudentChurnModel, teacher_checksum, within_tolerance
+        student = StudentChurnModel.load(model_paths["student"])
+        report = student.report or {}
+        teacher_sha1 = current_teacher_sha1(report, model_paths)
+        if within_tolerance(report, max_auc_drop, min_agreement, teacher_sha1):
+            return student, "student"
+        if teacher_sha1 is None or teacher_checksum(report) != teacher_sha1:
+            print("⚠️ Student model was not distilled from the current teacher, serving the Keras model")
+        else:
+            print(f"⚠️ Student model is outside tolerance (agreement {report.get('agreement')}, "
+                  f"AUC delta {report.get('auc_delta')}), serving the Keras model")
+
+    if runtime == "numpy" and "numpy" in model_paths:
+        from numpy_model import NumpyChurnModel
+        return NumpyChurnModel.load(model_paths["numpy"]), "numpy"
+
+    if "keras" not in model_paths:
+        raise FileNotFoundError(f"❌ No model file for runtime '{runtime}' (have: {', '.join(model_paths) or 'none'})")
+    import tensorflow as tf
+    return tf.keras.models.load_model(model_paths["keras"]), "keras"
+
+
+class ModelBundle:
+    """Everything one model version needs to score: encoder, scaler, feature transform and model."""
+
+    def __init__(self, version, encoder, scaler, model, runtime, feature_order, metadata=None, path=None):
+        self.version = version
+        self.encoder = encoder
+        self.scaler = scaler
+        self.model = model
+        self.runtime = runtime
+        self.feature_order = feature_order
+        self.metadata = metadata or {}
+        self.path = path
+        self.transform, self.transform_table = build_transforms(encoder, scaler)
+        self.loaded_at = time.time()
+
+    @classmethod
+    def assemble(cls, version, encoder_path, scaler_path, model_paths, runtime, expected_order=None,
+                 metadata=None, path=None, **tolerance):
+        import joblib
+
+        encoder, scaler = joblib.load(encoder_path), joblib.load(scaler_path)
+        feature_order = NUMERIC_FEATURES + list(encoder.get_feature_names_out())
+        if expected_order is not None and list(expected_order) != feature_order:
+            raise ValueError(f"❌ Bundle {version}: encoder features do not match the recorded feature order")
+        model, runtime = load_model(model_paths, runtime, **tolerance)
+        return cls(version, encoder, scaler, model, runtime, feature_order, metadata, path)
+
+    @classmethod
+    def load(cls, path, runtime, **tolerance):
+        with open(os.path.join(path, BUNDLE_FILE)) as f:
+            manifest = json.load(f)
+        return cls.assemble(
+            manifest["version"],
+            os.path.join(path, ENCODER_FILE),
+            os.path.join(path, SCALER_FILE),
+            {rt: os.path.join(path, name) for rt, name in manifest["models"].items()},
+            runtime,
+            expected_order=manifest.get("feature_order"),
+            metadata=manifest.get("metadata"),
+            path=path,
+            **tolerance,
+        )
+
+    @classmethod
+    def load_flat(cls, model_dir, runtime, **tolerance):
+        """Artifacts written straight into `model_dir` (no bundle yet); versioned by file stats."""
+        model_paths = {
+            rt: os.path.join(model_dir, name) for rt, name in FLAT_MODEL_FILES.items()
+            if os.path.exists(os.path.join(model_dir, name))
+        }
+        paths = [os.path.join(model_dir, FLAT_ENCODER), os.path.join(model_dir, FLAT_SCALER)] + list(model_paths.values())
+        version = "flat-" + hashlib.sha1(artifacts_fingerprint(paths).encode("utf-8")).hexdigest()[:8]
+        return cls.assemble(version, paths[0], paths[1], model_paths, runtime, path=model_dir, **tolerance)
+
+    def status(self):
+        return {"version": self.version, "runtime": self.runtime, "loaded_at": self.loaded_at, "metadata": self.metadata}
+
+
+class BundleManager:
+    """Serves the active model bundle and swaps in new versions without downtime.
+
+    `bundles/CURRENT` names the active version. A watcher thread polls it
+    every `poll_seconds`; a new version is loaded and warmed up on a
+    background thread while the previous bundle keeps serving, then replaces
+    it with a single reference assignment. A bundle that fails to load or warm
+    up is never activated (and not retried until `reload()` asks for it).
+    """
+
+    def __init__(self, bundles_dir, load, load_fallback=None, warm_up=None, poll_seconds=10.0):
+        self.bundles_dir = bundles_dir
+        self._load = load
+        self._load_fallback = load_fallback
+        self._warm_up = warm_up
+        self.poll_seconds = poll_seconds
+        self._active = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._loading = None
+        self._load_thread = None
+        self._watcher = ProcessThread(self._watch, "bundle-watcher")
+        self._failed = {}
+        self.swaps = 0
+        self.last_swap_at = None
+
+    def add_listener(self, listener):
+        """`listener(new_bundle, old_bundle)` runs after every activation, including the first."""
+        self._listeners.append(listener)
+
+    def load_initial(self):
+        version = read_current(self.bundles_dir)
+        if version is not None:
+            bundle = self._load(os.path.join(self.bundles_dir, version))
+        elif self._load_fallback is not None:
+            bundle = self._load_fallback()
+        else:
+            raise LookupError(f"❌ No model bundle is active in {self.bundles_dir}")
+        self._activate(bundle)
+        self._ensure_watcher()
+        return bundle
+
+    def current(self):
+        self._ensure_watcher()
+        return self._active
+
+    def reload(self, version=None, wait=False):
+        if version is not None:
+            set_current(self.bundles_dir, version)
+        target = read_current(self.bundles_dir)
+        if target is None:
+            raise LookupError(f"❌ No model bundle is active in {self.bundles_dir}")
+        self._failed.pop(target, None)
+        thread = self._start_load(target)
+        if wait and thread is not None:
+            thread.join()
+        return self.status()
+
+    def check(self):
+        target = read_current(self.bundles_dir)
+        active = self._active
+        if target is None or active is None or target in self._failed or active.version == target:
+            return None  # nothing new, or the first load (done by load_initial) has not happened yet
+        return self._start_load(target)
+
+    def status(self):
+        active = self._active
+        return {
+            "active": active.status() if active else None,
+            "pointer": read_current(self.bundles_dir),
+            "loading": self._loading,
+            "failed": dict(self._failed),
+            "swaps": self.swaps,
+            "last_swap_at": self.last_swap_at,
+            "available": list_bundles(self.bundles_dir),
+        }
+
+    def _start_load(self, version):
+        with self._lock:
+            if self._load_thread is not None and self._load_thread.is_alive():
+                return self._load_thread  # the watcher picks up any newer pointer afterwards
+            active = self._active
+            if active is not None and active.version == version:
+                return None
+            self._loading = version
+            self._load_thread = threading.Thread(
+                target=self._load_and_swap, args=(version,), name="bundle-load", daemon=True
+            )
+            self._load_thread.start()
+            return self._load_thread
+
+    def _load_and_swap(self, version):
+        try:
+            started = time.perf_counter()
+            bundle = self._load(os.path.join(self.bundles_dir, version))
+            if self._warm_up is not None:
+                self._warm_up(bundle)
+            self._activate(bundle)
+            print(f"♻️ Model bundle {version} active (loaded and warmed in {time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            self._failed[version] = str(e)
+            print(f"❌ Model bundle {version} not activated, keeping {self._active.version if self._active else None}: {e}")
+        finally:
+            self._loading = None
+
+    def _activate(self, bundle):
+        previous, self._active = self._active, bundle
+        if previous is not None:
+            self.swaps += 1
+            self.last_swap_at = time.time()
+        for listener in self._listeners:
+            try:
+                listener(bundle, previous)
+            except Exception as e:
+                print(f"⚠️ Bundle listener failed: {e}")
+
+    def _ensure_watcher(self):
+        if self.poll_seconds > 0:
+            self._watcher.ensure()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ Model bundle check failed: {e}")
+
+
+# ✅ python bundle.py create --activate | activate <version> | list
+def main():
+    parser = argparse.ArgumentParser(description="Create and activate versioned model bundles.")
+    parser.add_argument("--model-dir", default="model")
+    parser.add_argument("--bundles-dir", default=None, help="defaults to <model-dir>/bundles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="bundle the current flat artifacts")
+    create.add_argument("--activate", action="store_true")
+    create.add_argument("--note", default=None)
+    activate = commands.add_parser("activate", help="point CURRENT at an existing bundle")
+    activate.add_argument("version")
+    commands.add_parser("list", help="list bundles (* = active)")
+    args = parser.parse_args()
+
+    bundles_dir = args.bundles_dir or os.path.join(args.model_dir, "bundles")
+    if args.command == "create":
+        manifest = create_bundle(args.model_dir, bundles_dir, activate=args.activate, note=args.note)
+        print(f"✅ Created bundle {manifest['version']} ({', '.join(manifest['models'])})"
+              + (" and made it current" if args.activate else ""))
+    elif args.command == "activate":
+        set_current(bundles_dir, args.version)
+        print(f"✅ {args.version} is now current; running servers switch within their poll interval")
+    else:
+        current = read_current(bundles_dir)
+        for version in list_bundles(bundles_dir):
+            print(f"{'*' if version == current else ' '} {version}")
+
+
+if __name__ == "__main__":
+    main()
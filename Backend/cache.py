@@ -0,0 +1,239 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with optional TTL and hit/miss/eviction counters."""
+
+    def __init__(self, max_size=1024, ttl_seconds=None):
+        self.max_size = int(max_size)
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl_seconds is None or time.time() - stored_at < self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ✅ "tenure=1,monthlyCharges=0.5" -> {"tenure": 1.0, "monthlyCharges": 0.5}
+def parse_quantization(spec):
+    steps = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            field, step = part.split("=", 1)
+            if float(step) > 0:
+                steps[field.strip()] = float(step)
+    return steps
+
+
+# ✅ Changes whenever any model artifact is replaced on disk
+def artifacts_fingerprint(paths):
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return "|".join(parts)
+
+
+class PredictionCache:
+    """Churn probabilities keyed on the normalized /predict input.
+
+    Numeric fields can be quantized (`quantize={"monthlyCharges": 0.5}`) so
+    near-identical inputs share one entry. Entries are dropped when the model
+    artifacts change on disk, checked at most every `check_interval` seconds.
+    With `shared_path`, hits and misses also go through a SQLite file that all
+    worker processes on the host share.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=3600, quantize=None, artifact_paths=(),
+                 shared_path=None, check_interval=5.0):
+        self._local = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.quantize = dict(quantize or {})
+        self.artifact_paths = list(artifact_paths)
+        self.check_interval = check_interval
+        self.model_version = None
+        self._fingerprint = self._current_fingerprint()
+        self._checked_at = time.time()
+        self.invalidations = 0
+        self.shared_hits = 0
+
+        self.shared_path = shared_path or None
+        self._shared_writes = 0
+        self._shared_local = threading.local()
+        if self.shared_path:
+            with self._shared_connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS predictions ("
+                    "key TEXT PRIMARY KEY, fingerprint TEXT, probability REAL, stored_at REAL)"
+                )
+
+    @property
+    def enabled(self):
+        return self._local.max_size > 0
+
+    def key(self, customer):
+        parts = []
+        for field in ("tenure", "monthlyCharges", "totalCharges"):
+            value = float(customer[field])
+            step = self.quantize.get(field)
+            parts.append(round(value / step) if step else value)
+        parts.append(str(customer["contract"]).strip())
+        parts.append(str(customer["internetService"]).strip())
+        return tuple(parts)
+
+    def get(self, customer):
+        if not self.enabled:
+            return None
+        self._check_artifacts()
+        key = self.key(customer)
+        value = self._local.get(key, None)
+        if value is None and self.shared_path:
+            value = self._shared_get(key)
+            if value is not None:
+                self.shared_hits += 1
+                self._local.set(key, value)
+        return value
+
+    def set(self, customer, probability, model_version=None):
+        if not self.enabled:
+            return
+        if model_version is not None and model_version != self.model_version:
+            return  # computed by a model that has been swapped out since
+        key = self.key(customer)
+        self._local.set(key, float(probability))
+        if self.shared_path:
+            self._shared_set(key, float(probability))
+
+    def set_model_version(self, version):
+        """Entries belong to the model version that computed them; switching versions empties the cache."""
+        if version == self.model_version:
+            return
+        self.model_version = version
+        self._fingerprint = self._current_fingerprint()
+        self._local.clear()
+        self.invalidations += 1
+
+    def clear(self):
+        self._local.clear()
+        if self.shared_path:
+            with self._shared_connection() as conn:
+                conn.execute("DELETE FROM predictions")
+
+    def stats(self):
+        stats = self._local.stats()
+        stats.update({
+            "quantize": self.quantize,
+            "invalidations": self.invalidations,
+            "shared": bool(self.shared_path),
+            "shared_hits": self.shared_hits,
+        })
+        return stats
+
+    def _check_artifacts(self):
+        now = time.time()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        fingerprint = self._current_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._local.clear()
+            self.invalidations += 1
+            print("♻️ Model artifacts changed, prediction cache cleared")
+
+    def _current_fingerprint(self):
+        return f"{artifacts_fingerprint(self.artifact_paths)}|{self.model_version}"
+
+    # ✅ Shared SQLite tier (one connection per thread)
+    def _shared_connection(self):
+        conn = getattr(self._shared_local, "conn", None)
+        if conn is None or self._shared_local.pid != os.getpid():  # never reuse a connection across fork()
+            conn = sqlite3.connect(self.shared_path, timeout=1.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._shared_local.conn = conn
+            self._shared_local.pid = os.getpid()
+        return conn
+
+    def _shared_get(self, key):
+        try:
+            row = self._shared_connection().execute(
+                "SELECT probability, stored_at FROM predictions WHERE key = ? AND fingerprint = ?",
+                (json.dumps(key), self._fingerprint),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        probability, stored_at = row
+        if self._local.ttl_seconds is not None and time.time() - stored_at >= self._local.ttl_seconds:
+            return None
+        return probability
+
+    def _shared_set(self, key, probability):
+        try:
+            with self._shared_connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (key, fingerprint, probability, stored_at) VALUES (?, ?, ?, ?)",
+                    (json.dumps(key), self._fingerprint, probability, time.time()),
+                )
+                self._shared_writes += 1
+                if self._shared_writes % 100 == 0:
+                    conn.execute(
+                        "DELETE FROM predictions WHERE rowid IN ("
+                        "SELECT rowid FROM predictions ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self._local.max_size,),
+                    )
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared prediction cache write failed: {e}")
@@ -0,0 +1,193 @@
+import numpy as np
+
+from aggregates import run_aggregate
+from binning import hexbin, histogram_2d, stratified_sample_indexes
+from table import widen
+
+# ✅ Group-bys behind the chart routes, kept up to date incrementally by the aggregate engine
+CHART_QUERIES = [
+    (["gender"], [("mean", "MonthlyCharges")]),
+    (["Churn"], [("count", None)]),
+    (["Churn", "gender"], [("mean", "MonthlyCharges")]),
+    (["Churn", "tenure"], [("count", None)]),
+    (["gender", "PaymentMethod", "Churn"], [("count", None)]),
+    (["gender", "StreamingMovies"], [("count", None)]),
+]
+
+# Every function below raises LookupError (no data / columns not found) or ValueError (bad input).
+
+
+# ✅ Gender vs. Monthly Charges
+def gender_monthly_charges(snapshot, engine):
+    rows = run_aggregate(snapshot, engine, ["gender"], [("mean", "MonthlyCharges")])
+    return [
+        {"gender": row["gender"], "avgMonthlyCharge": row["mean_MonthlyCharges"]}
+        for row in rows
+    ]
+
+
+# ✅ Churn Distribution
+def churn_distribution(snapshot, engine):
+    rows = run_aggregate(snapshot, engine, ["Churn"], [("count", None)])
+    churn_counts = {"Yes": 0, "No": 0}
+    for row in rows:
+        if row["Churn"] in churn_counts:
+            churn_counts[row["Churn"]] = row["count"]
+    return [
+        {"churn": "Yes", "count": churn_counts["Yes"]},
+        {"churn": "No", "count": churn_counts["No"]}
+    ]
+
+
+# ✅ Churn vs Gender vs Monthly Charges
+def churn_gender_monthly_charges(snapshot, engine):
+    rows = run_aggregate(snapshot, engine, ["Churn", "gender"], [("mean", "MonthlyCharges")])
+    return [
+        {"churn": row["Churn"], "gender": row["gender"], "avgMonthlyCharge": row["mean_MonthlyCharges"]}
+        for row in rows
+    ]
+
+
+# ✅ Tenure counts per churn value: {"Yes": ([tenure, ...], [count, ...]), "No": (...)}
+def _churn_tenure_counts(snapshot, engine):
+    rows = run_aggregate(snapshot, engine, ["Churn", "tenure"], [("count", None)])
+    counts = {"Yes": ([], []), "No": ([], [])}
+    for row in rows:
+        if row["Churn"] in counts and isinstance(row["tenure"], float):
+            counts[row["Churn"]][0].append(row["tenure"])
+            counts[row["Churn"]][1].append(row["count"])
+    return counts
+
+
+# ✅ Churn vs Tenure (every raw tenure value)
+def churn_tenure(snapshot, engine):
+    result = []
+    for churn, (tenures, counts) in _churn_tenure_counts(snapshot, engine).items():
+        tenure_values = []
+        for tenure, count in zip(tenures, counts):
+            tenure_values.extend([tenure] * count)
+        result.append({"churn": churn, "tenure_values": tenure_values})
+    return result
+
+
+# ✅ Churn vs Tenure histogram, weighted from the per-tenure counts (no row scan)
+def churn_tenure_histogram(snapshot, engine, bins=24):
+    counts = _churn_tenure_counts(snapshot, engine)
+    all_tenures = counts["Yes"][0] + counts["No"][0]
+    value_range = (min(all_tenures), max(all_tenures)) if all_tenures else None
+    result = []
+    for churn, (tenures, weights) in counts.items():
+        bin_counts, edges = np.histogram(tenures, bins=bins, range=value_range, weights=weights)
+        result.append({"churn": churn, "bin_edges": edges.tolist(), "counts": bin_counts.astype(int).tolist()})
+    return result
+
+
+# ✅ Churn vs Tenure stratified sample
+def churn_tenure_sample(snapshot, n):
+    rows = numeric_rows(snapshot, ["tenure"], extra=["Churn"])
+    tenure, churn = rows["tenure"], rows["Churn"]
+    picked = stratified_sample_indexes(churn, n)
+    return [
+        {"churn": value, "tenure_values": widen(tenure[picked][churn[picked] == value]).tolist()}
+        for value in ("Yes", "No")
+    ]
+
+
+# ✅ Gender vs Payment Method vs Churn
+def gender_payment_method_churn(snapshot, engine):
+    rows = run_aggregate(snapshot, engine, ["gender", "PaymentMethod", "Churn"], [("count", None)])
+    data = {}
+    for row in rows:
+        churn_data = data.setdefault((row["gender"], row["PaymentMethod"]), {"Yes": 0, "No": 0})
+        if row["Churn"] in churn_data:
+            churn_data[row["Churn"]] += row["count"]
+    return [
+        {
+            "gender": gender,
+            "payment_method": payment_method,
+            "churn_yes": churn_data["Yes"],
+            "churn_no": churn_data["No"]
+        }
+        for (gender, payment_method), churn_data in data.items()
+    ]
+
+
+# ✅ Gender vs Streaming Movies
+def gender_streaming_movies(snapshot, engine):
+    rows = run_aggregate(snapshot, engine, ["gender", "StreamingMovies"], [("count", None)])
+    return [
+        {"gender": row["gender"], "streaming_movies": row["StreamingMovies"], "count": row["count"]}
+        for row in rows
+    ]
+
+
+# ✅ Column arrays (float32 numbers, decoded `extra` labels) of the rows with valid values in `columns`
+def numeric_rows(snapshot, columns, extra=()):
+    if snapshot is None:
+        raise LookupError("Google Sheets returned no data.")
+    table = snapshot.table
+    if any(col not in table or not table.is_numeric(col) for col in columns) or any(col not in table for col in extra):
+        raise LookupError("Required columns not found")
+    valid = np.ones(len(table), dtype=bool)
+    for col in columns:
+        valid &= ~np.isnan(table.numeric(col))
+    rows = np.flatnonzero(valid)
+    result = {col: table.numeric(col)[rows] for col in columns}
+    result.update({col: table.labels(col, rows) for col in extra})
+    return result
+
+
+# ✅ Tenure vs. Monthly Charges, one point per customer
+def tenure_monthly_charges(snapshot):
+    rows = numeric_rows(snapshot, ["tenure", "MonthlyCharges"])
+    return [
+        {"tenure": tenure, "monthly_charges": monthly_charges}
+        for tenure, monthly_charges in zip(widen(rows["tenure"]).tolist(), widen(rows["MonthlyCharges"]).tolist())
+    ]
+
+
+# ✅ Tenure vs. Monthly Charges with a fixed-size response: sample, histogram or hexbin
+def tenure_monthly_charges_binned(snapshot, mode, bins, n):
+    rows = numeric_rows(snapshot, ["tenure", "MonthlyCharges"], extra=["Churn"] if mode == "sample" else [])
+    tenure = rows["tenure"].astype(np.float64)
+    monthly_charges = rows["MonthlyCharges"].astype(np.float64)
+
+    if mode == "sample":
+        picked = stratified_sample_indexes(rows["Churn"], n)
+        return [
+            {"tenure": t, "monthly_charges": m}
+            for t, m in zip(widen(rows["tenure"][picked]).tolist(), widen(rows["MonthlyCharges"][picked]).tolist())
+        ]
+    if mode == "histogram":
+        tenure_edges, monthly_charges_edges, counts = histogram_2d(tenure, monthly_charges, bins)
+        return {
+            "mode": "histogram",
+            "bins": bins,
+            "tenure_edges": tenure_edges,
+            "monthly_charges_edges": monthly_charges_edges,
+            "counts": counts,
+        }
+    if mode == "hexbin":
+        cells = hexbin(tenure, monthly_charges, bins)
+        return {
+            "mode": "hexbin",
+            "gridsize": bins,
+            "cells": [{"tenure": c["x"], "monthly_charges": c["y"], "count": c["count"]} for c in cells],
+        }
+    raise ValueError(f"Unknown mode '{mode}', expected histogram, hexbin or sample")
+
+
+# ✅ Every dashboard chart from one engine sync (a single pass over changed rows)
+def dashboard(snapshot, engine, tenure_bins=24):
+    if snapshot is None:
+        raise LookupError("Google Sheets returned no data.")
+    engine.sync(snapshot)
+    return {
+        "version": snapshot.version,
+        "gender_monthly_charges": gender_monthly_charges(snapshot, engine),
+        "churn_distribution": churn_distribution(snapshot, engine),
+        "churn_gender_monthly_charges": churn_gender_monthly_charges(snapshot, engine),
+        "churn_tenure": churn_tenure_histogram(snapshot, engine, bins=tenure_bins),
+        "gender_payment_method_churn": gender_payment_method_churn(snapshot, engine),
+        "gender_streaming_movies": gender_streaming_movies(snapshot, engine),
+    }
@@ -0,0 +1,423 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from metrics import REGISTRY
+from snapshot import values_version
+from table import ColumnValues
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ✅ Google Sheets settings (overridable through the environment)
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+SERVICE_ACCOUNT_FILE = os.environ.get(
+    "SERVICE_ACCOUNT_FILE", r"D:\coding\mini project new\backend\credentials_service.json"
+)
+SPREADSHEET_ID = os.environ.get("SPREADSHEET_ID", "1kHP7cAB_-Rnb7WH3uGH4CUkkmTs6f8Ub1X6nO91VXr0")
+RANGE_NAME = os.environ.get("SHEET_RANGE", "A1:Z")
+
+# ✅ Local backends
+DEFAULT_CSV_PATH = os.environ.get("DATA_CSV_PATH", os.path.join(BASE_DIR, "..", "telco-churn.csv"))
+DEFAULT_CACHE_DIR = os.environ.get("DATA_CACHE_DIR", os.path.join(BASE_DIR, "model", "data_cache"))
+
+
+class DataSource:
+    """Common interface: `fetch_values()` returns the header row followed by data rows, all strings
+    (or a table.ColumnValues holding the same cells column by column)."""
+
+    name = "base"
+
+    def fetch_values(self):
+        raise NotImplementedError
+
+    def fetch_dataframe(self):
+        import pandas as pd
+
+        values = self.fetch_values()
+        if not values:
+            raise ValueError(f"❌ No data found in the {self.name} data source.")
+        return pd.DataFrame(values[1:], columns=values[0])
+
+    def fingerprint(self):
+        """Changes whenever the data changes; sources override it with something cheaper than a full fetch."""
+        return f"{self.name}:{values_version(self.fetch_values())}"
+
+    def reset_connection(self):
+        """Drop any open client/connection (called in each worker after fork, so sockets are not shared)."""
+
+    def iter_dataframes(self, chunk_size=50000):
+        """Yield the data as consecutive DataFrames of at most `chunk_size` rows (all strings)."""
+        df = self.fetch_dataframe()
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].reset_index(drop=True)
+
+    def pin(self):
+        """A source holding one fetch of this one, so its fingerprint always describes the data it returns."""
+        return PinnedSource(self.name, self.fetch_values())
+
+
+# ✅ One fetch of another source: every read (and the fingerprint) sees the same values, with no further upstream calls
+class PinnedSource(DataSource):
+    def __init__(self, name, values):
+        if not values:
+            raise ValueError(f"❌ No data found in the {name} data source.")
+        self.name = name
+        self._values = values
+        self._fingerprint = f"{name}:{values_version(values)}"
+
+    def fetch_values(self):
+        return self._values
+
+    def fingerprint(self):
+        return self._fingerprint
+
+    def pin(self):
+        return self
+
+    def fetch_dataframe(self):
+        if not isinstance(self._values, ColumnValues):
+            return super().fetch_dataframe()
+        import pandas as pd
+
+        return pd.DataFrame({column: np.asarray(data) for column, data in self._values.columns.items()})
+
+
+# ✅ Google Sheets REST API: endpoint, timeouts, retries and how often to re-read the whole range
+SHEETS_API_URL = os.environ.get("SHEETS_API_URL", "https://sheets.googleapis.com")
+SHEETS_TIMEOUT_SECONDS = float(os.environ.get("SHEETS_TIMEOUT_SECONDS", "10"))
+SHEETS_MAX_RETRIES = int(os.environ.get("SHEETS_MAX_RETRIES", "5"))
+SHEETS_BACKOFF_SECONDS = float(os.environ.get("SHEETS_BACKOFF_SECONDS", "0.5"))
+SHEETS_BACKOFF_MAX_SECONDS = 30.0
+SHEETS_FULL_SYNC_SECONDS = float(os.environ.get("SHEETS_FULL_SYNC_SECONDS", "3600"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "churn_upstream_requests_total", "Upstream API calls by kind (full, incremental) and retries", ["source", "kind"]
+)
+UPSTREAM_ROWS = REGISTRY.counter(
+    "churn_upstream_rows_transferred_total", "Rows actually downloaded from the upstream API", ["source"]
+)
+
+# "Sheet1!A1:Z" -> ("Sheet1!", "A", 1, "Z"); ranges with an explicit last row are always read in full
+_A1_RANGE = re.compile(r"^(?:(?P<sheet>.+)!)?(?P<first_col>[A-Za-z]+)(?P<first_row>\d*):(?P<last_col>[A-Za-z]+)$")
+
+
+def parse_a1_range(range_name):
+    match = _A1_RANGE.match(range_name)
+    if match is None:
+        return None
+    sheet = f"{match['sheet']}!" if match["sheet"] else ""
+    return sheet, match["first_col"], int(match["first_row"] or 1), match["last_col"]
+
+
+def backoff_delay(attempt, base=SHEETS_BACKOFF_SECONDS, cap=SHEETS_BACKOFF_MAX_SECONDS):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# ✅ Google Sheets (the original online source)
+class GoogleSheetsSource(DataSource):
+    """Reads the sheet over one kept-alive HTTP session, fetching only appended rows.
+
+    The first call (and one every `full_sync_seconds`) reads the whole range.
+    Later calls request the range starting at the last row already held: if
+    that row is unchanged, everything after it is new; if it differs or is
+    gone, rows were edited or removed above it and the whole range is read
+    again. Edits to older rows are picked up by the next full sync.
+    Timeouts, connection errors, 429 and 5xx answers are retried with
+    jittered exponential backoff (honouring `Retry-After`).
+    """
+
+    name = "sheets"
+
+    def __init__(self, spreadsheet_id=SPREADSHEET_ID, range_name=RANGE_NAME,
+                 service_account_file=SERVICE_ACCOUNT_FILE, api_url=SHEETS_API_URL,
+                 timeout=SHEETS_TIMEOUT_SECONDS, max_retries=SHEETS_MAX_RETRIES,
+                 full_sync_seconds=SHEETS_FULL_SYNC_SECONDS):
+        self.spreadsheet_id = spreadsheet_id
+        self.range_name = range_name
+        self.service_account_file = service_account_file
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.full_sync_seconds = full_sync_seconds
+        self._session = None
+        self._values = None
+        self._full_sync_due = 0.0
+        self._lock = threading.Lock()
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.retries = 0
+
+    def _get_session(self):
+        if self._session is None:
+            if self.service_account_file:
+                from google.auth.transport.requests import AuthorizedSession
+                from google.oauth2.service_account import Credentials
+
+                creds = Credentials.from_service_account_file(self.service_account_file, scopes=SCOPES)
+                self._session = AuthorizedSession(creds)
+            else:
+                import requests
+
+                self._session = requests.Session()  # no credentials: only useful against fake_sheets.py
+        return self._session
+
+    def reset_connection(self):
+        session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def _get_range(self, range_name):
+        import requests
+
+        url = f"{self.api_url}/v4/spreadsheets/{quote(self.spreadsheet_id, safe='')}/values/{quote(range_name, safe='')}"
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self._get_session().get(url, params={"majorDimension": "ROWS"}, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    values = response.json().get("values", [])
+                    UPSTREAM_ROWS.inc(len(values), source=self.name)
+                    return values
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRY_STATUSES:
+                    raise RuntimeError(f"❌ Sheets API request for {range_name} failed with {error}")
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise RuntimeError(f"❌ Sheets API request for {range_name} failed after {attempt + 1} attempts: {error}")
+            self.retries += 1
+            UPSTREAM_REQUESTS.inc(source=self.name, kind="retry")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff_delay(attempt)
+            print(f"⚠️ Sheets API {error}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    def _full_sync(self):
+        UPSTREAM_REQUESTS.inc(source=self.name, kind="full")
+        self._values = self._get_range(self.range_name)
+        self._full_sync_due = time.time() + self.full_sync_seconds
+        self.full_syncs += 1
+        return self._values
+
+    def fetch_values(self):
+        with self._lock:
+            a1 = parse_a1_range(self.range_name)
+            if not self._values or a1 is None or time.time() >= self._full_sync_due:
+                return self._full_sync()
+
+            sheet, first_col, first_row, last_col = a1
+            last_known_row = first_row + len(self._values) - 1
+            UPSTREAM_REQUESTS.inc(source=self.name, kind="incremental")
+            tail = self._get_range(f"{sheet}{first_col}{last_known_row}:{last_col}")
+            if not tail or tail[0] != self._values[-1]:
+                return self._full_sync()  # rows above the end changed or were removed
+
+            self.incremental_syncs += 1
+            if len(tail) > 1:
+                self._values = self._values + tail[1:]  # a new list: snapshots holding the old one are untouched
+            return self._values
+
+    def status(self):
+        return {
+            "rows": max(0, len(self._values) - 1) if self._values else 0,
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "retries": self.retries,
+        }
+
+
+# ✅ Local CSV file (the bundled telco-churn.csv by default)
+class CsvSource(DataSource):
+    name = "csv"
+
+    def __init__(self, path=DEFAULT_CSV_PATH):
+        self.path = path
+
+    def fetch_values(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [row for row in csv.reader(f)]
+
+    def fetch_dataframe(self):
+        import pandas as pd
+
+        # Keep every cell as a string so the frame looks exactly like the Sheets one
+        return pd.read_csv(self.path, dtype=str, keep_default_na=False)
+
+    def fingerprint(self):
+        digest = hashlib.sha1()
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return f"{self.name}:{digest.hexdigest()[:16]}"
+
+    def pin(self):
+        # A local file: reading it again is cheap, and streaming preprocessing must not hold it all in memory
+        return self
+
+    def iter_dataframes(self, chunk_size=50000):
+        import pandas as pd
+
+        # Only one chunk is parsed at a time, so memory does not grow with the file
+        with pd.read_csv(self.path, dtype=str, keep_default_na=False, chunksize=chunk_size) as reader:
+            yield from reader
+
+
+# ✅ On-disk columnar cache: one memory-mapped .npy file per column
+class ColumnarCacheSource(DataSource):
+    """Column files are opened with `mmap_mode="r"`, so loading costs a few
+    milliseconds and worker processes share the same pages through the OS
+    page cache. The cache is (re)built from `upstream` when it is missing.
+    """
+
+    name = "columnar"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, upstream=None):
+        self.cache_dir = cache_dir
+        self.upstream = upstream
+        self._meta_path = os.path.join(cache_dir, "meta.json")
+
+    def exists(self):
+        return os.path.exists(self._meta_path)
+
+    def build(self, values=None):
+        if values is None:
+            if self.upstream is None:
+                raise ValueError("❌ Columnar cache is missing and no upstream source was given.")
+            values = self.upstream.fetch_values()
+        if not values:
+            raise ValueError("❌ Cannot build the columnar cache from empty data.")
+
+        headers, rows = values[0], values[1:]
+        version = values_version(values)
+        previous = self._read_meta()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Column files are named after the build, so the current meta.json keeps pointing at complete files
+        # until the new one replaces it; each file is written under a temporary name first
+        files = []
+        for i, column in enumerate(headers):
+            cells = [row[i] if i < len(row) else "" for row in rows]
+            name = f"col_{version}_{i:03d}.npy"
+            tmp_path = os.path.join(self.cache_dir, name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.array(cells, dtype=str))
+            os.replace(tmp_path, os.path.join(self.cache_dir, name))
+            files.append(name)
+
+        meta = {
+            "columns": list(headers),
+            "files": files,
+            "rows": len(rows),
+            "version": version,
+            "source": self.upstream.name if self.upstream else None,
+            "built_at": time.time(),
+        }
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, self._meta_path)  # meta.json appears last, so readers never see a half-built cache
+
+        # Files of the previous build are no longer referenced (open memory maps stay valid)
+        stale = set(self._files(previous)) - set(files) if previous else set()
+        for name in stale:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+        return meta
+
+    def load_columns(self):
+        return self._load()[1]
+
+    def _load(self):
+        if not self.exists():
+            self.build()
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        columns = {
+            column: np.load(os.path.join(self.cache_dir, name), mmap_mode="r")
+            for column, name in zip(meta["columns"], self._files(meta))
+        }
+        return meta, columns
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _files(meta):
+        # Caches built before file names were recorded use col_<index>.npy
+        return meta.get("files") or [f"col_{i:03d}.npy" for i in range(len(meta["columns"]))]
+
+    def fingerprint(self):
+        if not self.exists():
+            self.build()
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        if "version" not in meta:  # cache built before versions were recorded
+            return super().fingerprint()
+        return f"{self.name}:{meta['version']}"
+
+    def fetch_values(self):
+        # The memory-mapped columns go to the table loader as they are; no list of rows is built
+        meta, columns = self._load()
+        return ColumnValues(columns, version=meta.get("version"))
+
+    def fetch_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame({column: np.asarray(data) for column, data in self.load_columns().items()})
+
+    def iter_dataframes(self, chunk_size=50000):
+        import pandas as pd
+
+        columns = self.load_columns()
+        rows = len(next(iter(columns.values()))) if columns else 0
+        for start in range(0, rows, chunk_size):
+            # Slicing a memory-mapped column only reads the pages of this chunk
+            yield pd.DataFrame({column: np.asarray(data[start:start + chunk_size]) for column, data in columns.items()})
+
+
+# ✅ Pick the backend from the DATA_SOURCE environment variable (sheets | csv | columnar)
+def get_data_source(name=None):
+    name = (name or os.environ.get("DATA_SOURCE", "sheets")).lower()
+    if name == "sheets":
+        return GoogleSheetsSource()
+    if name == "csv":
+        return CsvSource()
+    if name == "columnar":
+        upstream = get_data_source(os.environ.get("DATA_CACHE_UPSTREAM", "csv"))
+        return ColumnarCacheSource(upstream=upstream)
+    raise ValueError(f"❌ Unknown data source: {name}")
+
+
+# ✅ Build or rebuild the columnar cache: python data_source.py --upstream csv
+def main():
+    parser = argparse.ArgumentParser(description="Build the on-disk columnar data cache.")
+    parser.add_argument("--upstream", default=os.environ.get("DATA_CACHE_UPSTREAM", "csv"), choices=["sheets", "csv"])
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    cache = ColumnarCacheSource(cache_dir=args.cache_dir, upstream=get_data_source(args.upstream))
+    meta = cache.build()
+    print(f"✅ Columnar cache built: {meta['rows']} rows x {len(meta['columns'])} columns in {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from manifest import file_sha1
+
+# ✅ Students regress the teacher's logit; a sigmoid turns their output back into a probability
+STUDENT_KINDS = ("gbt", "mlp", "logistic")
+PROBABILITY_EPSILON = 1e-6
+
+
+def _logit(p):
+    p = np.clip(p, PROBABILITY_EPSILON, 1.0 - PROBABILITY_EPSILON)
+    return np.log(p / (1.0 - p))
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def make_student(kind):
+    if kind == "gbt":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(max_iter=300, learning_rate=0.1, max_leaf_nodes=31, random_state=42)
+    if kind == "mlp":
+        from sklearn.neural_network import MLPRegressor
+        return MLPRegressor(hidden_layer_sizes=(32, 16), early_stopping=True, max_iter=500, random_state=42)
+    if kind == "logistic":
+        from sklearn.linear_model import Ridge
+        return Ridge(alpha=1.0)  # linear logit = logistic model fitted to the soft labels
+    raise ValueError(f"❌ Unknown student kind: {kind} (expected one of {', '.join(STUDENT_KINDS)})")
+
+
+class StudentChurnModel:
+    """Compact sklearn model distilled from the Keras churn network.
+
+    Exposes the same `predict` / `predict_on_batch` methods the API calls on
+    the Keras model (input `(n, features, 1)` or `(n, features)`, output
+    `(n, 1)`), together with the distillation report used to gate serving.
+    """
+
+    def __init__(self, estimator, kind, report=None):
+        self.estimator = estimator
+        self.kind = kind
+        self.report = report or {}
+
+    @classmethod
+    def load(cls, path):
+        import joblib
+
+        bundle = joblib.load(path)
+        return cls(bundle["estimator"], bundle["kind"], bundle.get("report"))
+
+    def save(self, path):
+        import joblib
+
+        joblib.dump({"estimator": self.estimator, "kind": self.kind, "report": self.report}, path)
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1)
+        if not batch_size or len(X) <= batch_size:
+            return self._forward(X)
+        return np.concatenate([self._forward(X[i:i + batch_size]) for i in range(0, len(X), batch_size)])
+
+    def predict_on_batch(self, X):
+        return self.predict(X)
+
+    def _forward(self, X):
+        return _sigmoid(self.estimator.predict(X)).astype(np.float32).reshape(-1, 1)
+
+
+# ✅ Serve the student only if it was distilled from `teacher_sha1` and stays close enough to that teacher
+def within_tolerance(report, max_auc_drop, min_agreement, teacher_sha1):
+    if not report or teacher_sha1 is None or teacher_checksum(report) != teacher_sha1:
+        return False
+    return report["auc_delta"] >= -max_auc_drop and report["agreement"] >= min_agreement
+
+
+def teacher_runtime(path):
+    return "numpy" if path.endswith(".npz") else "keras"
+
+
+def teacher_checksum(report):
+    """sha1 of the teacher file the student was distilled from (None for reports written before it was recorded)."""
+    return ((report or {}).get("teacher") or {}).get("sha1")
+
+
+def load_teacher(path):
+    if path.endswith(".npz"):
+        from numpy_model import NumpyChurnModel
+        return NumpyChurnModel.load(path)
+
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+
+def _rows_per_second(model, X, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict(X, batch_size=4096, verbose=0)
+        best = min(best, time.perf_counter() - started)
+    return len(X) / best if best > 0 else float("inf")
+
+
+# ✅ Teacher vs. student on the held-out split
+def compare(teacher, student, X_test, y_test, threshold=0.5):
+    from sklearn.metrics import f1_score, roc_auc_score
+
+    X_test = X_test.reshape(len(X_test), -1, 1)
+    p_teacher = np.asarray(teacher.predict(X_test, batch_size=4096, verbose=0)).reshape(-1)
+    p_student = student.predict(X_test).reshape(-1)
+
+    teacher_auc, student_auc = roc_auc_score(y_test, p_teacher), roc_auc_score(y_test, p_student)
+    teacher_f1 = f1_score(y_test, p_teacher >= threshold)
+    student_f1 = f1_score(y_test, p_student >= threshold)
+    teacher_speed, student_speed = _rows_per_second(teacher, X_test), _rows_per_second(student, X_test)
+    return {
+        "kind": student.kind,
+        "rows": int(len(y_test)),
+        "agreement": float(np.mean((p_teacher >= threshold) == (p_student >= threshold))),
+        "mean_abs_probability_diff": float(np.mean(np.abs(p_teacher - p_student))),
+        "teacher_auc": float(teacher_auc),
+        "student_auc": float(student_auc),
+        "auc_delta": float(student_auc - teacher_auc),
+        "teacher_f1": float(teacher_f1),
+        "student_f1": float(student_f1),
+        "f1_delta": float(student_f1 - teacher_f1),
+        "teacher_rows_per_second": round(teacher_speed, 1),
+        "student_rows_per_second": round(student_speed, 1),
+        "speedup": round(student_speed / teacher_speed, 1) if teacher_speed else None,
+    }
+
+
+def distill(teacher, X_train, kind="gbt"):
+    X_train = X_train.reshape(len(X_train), -1)
+    soft_labels = np.asarray(teacher.predict(X_train.reshape(len(X_train), -1, 1), batch_size=4096, verbose=0)).reshape(-1)
+    estimator = make_student(kind)
+    estimator.fit(X_train, _logit(soft_labels))
+    return StudentChurnModel(estimator, kind)
+
+
+# ✅ python distill.py --kind gbt  (writes model/churn_student.joblib and model/student_report.json)
+def main():
+    parser = argparse.ArgumentParser(description="Distill the churn network into a compact sklearn student.")
+    parser.add_argument("--teacher", default="model/best_churn_model.keras", help=".keras model or NumPy .npz export")
+    parser.add_argument("--kind", default="gbt", choices=STUDENT_KINDS)
+    parser.add_argument("--model-dir", default="model")
+    parser.add_argument("--out", default="model/churn_student.joblib")
+    args = parser.parse_args()
+
+    teacher = load_teacher(args.teacher)
+    X_train = np.load(os.path.join(args.model_dir, "X_train_churn.npy"))
+    X_test = np.load(os.path.join(args.model_dir, "X_test_churn.npy"))
+    y_test = np.load(os.path.join(args.model_dir, "y_test_churn.npy")).astype(int)
+
+    started = time.time()
+    student = distill(teacher, X_train, kind=args.kind)
+    student.report = {
+        **compare(teacher, student, X_test, y_test),
+        "fit_seconds": round(time.time() - started, 1),
+        # A retrained teacher changes this checksum, which takes the old student out of tolerance
+        "teacher": {"runtime": teacher_runtime(args.teacher), "file": os.path.basename(args.teacher),
+                    "sha1": file_sha1(args.teacher)},
+    }
+    student.save(args.out)
+    with open(os.path.join(os.path.dirname(args.out) or ".", "student_report.json"), "w") as f:
+        json.dump(student.report, f, indent=2)
+
+    report = student.report
+    print(f"✅ Student ({args.kind}) saved to {args.out}")
+    print(f"🔍 Agreement {report['agreement']:.2%}, AUC {report['student_auc']:.4f} ({report['auc_delta']:+.4f}), "
+          f"F1 {report['student_f1']:.4f} ({report['f1_delta']:+.4f}), {report['speedup']}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import threading
+import zlib
+
+import numpy as np
+
+from cache import LRUCache
+
+METHODS = ("shap", "lime")
+
+
+class ChurnExplainer:
+    """Per-customer explanations with a bounded cost.
+
+    SHAP's KernelExplainer runs against a k-means summary of the training data
+    instead of the full set, and every explanation is capped at `nsamples`
+    perturbations (`lime_samples` for LIME). All perturbations for one
+    explanation go to the model in batches of `batch_size` rows, and finished
+    explanations are kept in an LRU cache keyed on the input.
+    """
+
+    def __init__(self, predict, X_train, feature_names, background_k=20, nsamples=256,
+                 lime_samples=500, batch_size=4096, cache_size=1024, random_state=42):
+        import shap  # imported here so the API starts without it
+
+        self._predict = predict
+        self.feature_names = list(feature_names)
+        self.nsamples = int(nsamples)
+        self.lime_samples = int(lime_samples)
+        self.batch_size = int(batch_size)
+        self.random_state = random_state
+
+        X_train = np.asarray(X_train, dtype=np.float64).reshape(len(X_train), -1)
+        self._background = shap.kmeans(X_train, min(int(background_k), len(X_train)))
+        self._shap = shap.KernelExplainer(self._predict_batched, self._background)
+        self._shap_lock = threading.Lock()  # KernelExplainer keeps per-call state while shap_values runs
+
+        # LIME only needs feature statistics, so a fixed sample of the training data is enough
+        rng = np.random.default_rng(random_state)
+        self._lime_training = X_train[rng.choice(len(X_train), min(len(X_train), 1000), replace=False)]
+        self._lime = None
+        self._lime_lock = threading.Lock()  # guards creation and every explain_instance call
+
+        self._cache = LRUCache(max_size=cache_size)
+
+    def _predict_batched(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(len(X), -1)
+        return np.concatenate([
+            np.asarray(self._predict(X[i:i + self.batch_size])).reshape(-1)
+            for i in range(0, len(X), self.batch_size)
+        ])
+
+    def _predict_proba(self, X):
+        p = self._predict_batched(X)
+        return np.column_stack([1.0 - p, p])
+
+    def _get_lime(self):
+        if self._lime is None:
+            with self._lime_lock:
+                if self._lime is None:
+                    from lime.lime_tabular import LimeTabularExplainer
+
+                    self._lime = LimeTabularExplainer(
+                        self._lime_training,
+                        feature_names=self.feature_names,
+                        class_names=["No", "Yes"],
+                        mode="classification",
+                        discretize_continuous=False,
+                        random_state=self.random_state,
+                    )
+        return self._lime
+
+    def explain(self, key, x, method="shap"):
+        """Explain one scaled feature row `x`; `key` identifies the raw input for caching."""
+        cache_key = (method, key)
+        cached = self._cache.get(cache_key, None)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        x = np.asarray(x, dtype=np.float64).reshape(1, -1)
+        if method == "shap":
+            result = self._explain_shap(x)
+        elif method == "lime":
+            result = self._explain_lime(x)
+        else:
+            raise ValueError(f"Unknown explanation method: {method}")
+
+        self._cache.set(cache_key, result)
+        return {**result, "cached": False}
+
+    def _explain_shap(self, x):
+        with self._shap_lock:
+            values = np.asarray(self._shap.shap_values(x, nsamples=self.nsamples, silent=True)).reshape(-1)
+            base_value = float(np.asarray(self._shap.expected_value).reshape(-1)[0])
+        return {
+            "method": "shap",
+            "base_value": base_value,
+            "samples": self.nsamples,
+            "contributions": self._ranked(values),
+        }
+
+    def _explain_lime(self, x):
+        lime = self._get_lime()
+        with self._lime_lock:
+            # explain_instance draws its perturbations from the explainer's RandomState: one call at a time,
+            # reseeded from the input so the result depends on the customer, not on earlier requests
+            lime.random_state = np.random.RandomState(zlib.crc32(x.tobytes(), self.random_state or 0))
+            explanation = lime.explain_instance(
+                x[0], self._predict_proba, labels=(1,),
+                num_features=len(self.feature_names), num_samples=self.lime_samples,
+            )
+        values = np.zeros(len(self.feature_names))
+        for index, weight in explanation.as_map()[1]:
+            values[index] = weight
+        return {
+            "method": "lime",
+            "base_value": float(explanation.intercept[1]),
+            "samples": self.lime_samples,
+            "contributions": self._ranked(values),
+        }
+
+    def _ranked(self, values):
+        order = np.argsort(-np.abs(values))
+        return [{"feature": self.feature_names[i], "contribution": float(values[i])} for i in order]
+
+    def cache_info(self):
+        return self._cache.stats()
@@ -0,0 +1,276 @@
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ✅ Offline stand-in for the Sheets API `values` endpoints used by GoogleSheetsSource:
+#    GET  /v4/spreadsheets/<id>/values/<range>          read (A1 notation, open-ended ranges allowed)
+#    POST /v4/spreadsheets/<id>/values/<range>:append   append rows  (body: {"values": [[...], ...]})
+#    PUT  /v4/spreadsheets/<id>/values/<range>          overwrite rows starting at the range's first row
+#    GET  /stats                                       requests and cells served so far
+_VALUES_PATH = re.compile(r"^/v4/spreadsheets/(?P<sheet_id>[^/]+)/values/(?P<range>[^:]+)(?P<append>:append)?$")
+_A1 = re.compile(r"^(?:(?P<sheet>.+)!)?(?P<first_col>[A-Za-z]+)(?P<first_row>\d*)(?::(?P<last_col>[A-Za-z]+)(?P<last_row>\d*))?$")
+
+
+def column_index(letters):
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def _trim(row):
+    # The real API drops trailing empty cells of each row, and trailing empty rows
+    while row and row[-1] == "":
+        row = row[:-1]
+    return row
+
+
+class FakeSheet:
+    """Rows of one sheet (header included) with request counters and optional fault injection."""
+
+    def __init__(self, rows, latency_ms=0.0, fail_rate=0.0, throttle_every=0):
+        self.rows = [list(row) for row in rows]
+        self.latency = latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.throttle_every = throttle_every
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cells_served = 0
+        self.failures = 0
+
+    @classmethod
+    def from_csv(cls, path, **options):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.reader(f)), **options)
+
+    def read(self, range_name):
+        first_row, last_row, first_col, last_col = self._bounds(range_name)
+        with self._lock:
+            rows = self.rows[first_row:last_row + 1 if last_row is not None else None]
+            values = [_trim(row[first_col:last_col + 1]) for row in rows]
+            while values and not values[-1]:
+                values.pop()
+            self.cells_served += sum(len(row) for row in values)
+        return values
+
+    def append(self, values):
+        with self._lock:
+            self.rows.extend(list(row) for row in values)
+            return len(self.rows)
+
+    def update(self, range_name, values):
+        first_row, _, first_col, _ = self._bounds(range_name)
+        with self._lock:
+            for offset, new_row in enumerate(values):
+                index = first_row + offset
+                while len(self.rows) <= index:
+                    self.rows.append([])
+                row = self.rows[index] + [""] * max(0, first_col + len(new_row) - len(self.rows[index]))
+                row[first_col:first_col + len(new_row)] = new_row
+                self.rows[index] = row
+
+    def delete_rows(self, first_row, count=1):
+        """Remove `count` rows starting at 1-based sheet row `first_row`."""
+        with self._lock:
+            del self.rows[first_row - 1:first_row - 1 + count]
+
+    def fault(self):
+        """Called once per request: returns (status, headers) to fail with, or None."""
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+        if self.latency:
+            time.sleep(self.latency)
+        if self.throttle_every and number % self.throttle_every == 0:
+            self.failures += 1
+            return 429, {"Retry-After": "1"}
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.failures += 1
+            return 503, {}
+        return None
+
+    def stats(self):
+        return {"rows": len(self.rows), "requests": self.requests, "cells_served": self.cells_served,
+                "failures": self.failures}
+
+    @staticmethod
+    def _bounds(range_name):
+        match = _A1.match(range_name)
+        if match is None:
+            raise ValueError(f"Unable to parse range: {range_name}")
+        first_row = int(match["first_row"] or 1) - 1
+        last_row = int(match["last_row"]) - 1 if match["last_row"] else None
+        first_col = column_index(match["first_col"])
+        last_col = column_index(match["last_col"]) if match["last_col"] else first_col
+        return first_row, last_row, first_col, last_col
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self):
+        path = urlparse(self.path).path
+        if path == "/stats":
+            return None, None
+        match = _VALUES_PATH.match(path)
+        if match is None:
+            self._send(404, {"error": {"code": 404, "message": f"Unknown path {path}"}})
+            return False, None
+        failure = self.server.sheet.fault()
+        if failure is not None:
+            status, headers = failure
+            self._send(status, {"error": {"code": status, "message": "injected failure"}}, headers)
+            return False, None
+        return unquote(match["range"]), bool(match["append"])
+
+    def _body_values(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}").get("values", [])
+
+    def do_GET(self):
+        range_name, _ = self._route()
+        if range_name is None:
+            return self._send(200, self.server.sheet.stats())
+        if range_name is False:
+            return
+        try:
+            values = self.server.sheet.read(range_name)
+        except ValueError as e:
+            return self._send(400, {"error": {"code": 400, "message": str(e)}})
+        body = {"range": range_name, "majorDimension": "ROWS"}
+        if values:
+            body["values"] = values  # like the real API, the key is omitted for an empty range
+        self._send(200, body)
+
+    def do_POST(self):
+        range_name, append = self._route()
+        if not range_name:
+            return
+        if not append:
+            return self._send(404, {"error": {"code": 404, "message": "Only :append is supported for POST"}})
+        values = self._body_values()
+        rows = self.server.sheet.append(values)
+        self._send(200, {"updates": {"updatedRows": len(values), "totalRows": rows}})
+
+    def do_PUT(self):
+        range_name, _ = self._route()
+        if not range_name:
+            return
+        values = self._body_values()
+        self.server.sheet.update(range_name, values)
+        self._send(200, {"updatedRange": range_name, "updatedRows": len(values)})
+
+
+class FakeSheetsServer:
+    """Serves a FakeSheet on 127.0.0.1 from a background thread (`port=0` picks a free port)."""
+
+    def __init__(self, sheet, host="127.0.0.1", port=0):
+        self.sheet = sheet
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.sheet = sheet
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-sheets", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ✅ End-to-end check of GoogleSheetsSource against the fake: full, incremental, edited and flaky syncs
+def check(csv_path):
+    from data_source import GoogleSheetsSource
+
+    sheet = FakeSheet.from_csv(csv_path)
+    server = FakeSheetsServer(sheet).start()
+    expected = lambda: [_trim(row) for row in sheet.rows]
+    source = GoogleSheetsSource(spreadsheet_id="fake", range_name="A1:Z", service_account_file="",
+                                api_url=server.url, max_retries=8)
+    try:
+        steps = [
+            ("full sync", lambda: None),
+            ("no changes", lambda: None),
+            ("3 rows appended", lambda: sheet.append(sheet.rows[1:4])),
+            ("last row edited", lambda: sheet.update(f"A{len(sheet.rows)}:Z", [["edited"]])),
+            ("row deleted", lambda: sheet.delete_rows(2)),
+        ]
+        for name, change in steps:
+            change()
+            before = sheet.stats()["cells_served"]
+            started = time.perf_counter()
+            values = source.fetch_values()
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            if values != expected():
+                raise SystemExit(f"❌ {name}: fetched values differ from the sheet")
+            print(f"✅ {name}: {len(values) - 1} rows, {sheet.stats()['cells_served'] - before} cells transferred, "
+                  f"{elapsed_ms:.1f} ms")
+
+        sheet.fail_rate, sheet.throttle_every = 0.5, 0
+        sheet.append(sheet.rows[1:2])
+        if source.fetch_values() != expected():
+            raise SystemExit("❌ flaky upstream: fetched values differ from the sheet")
+        print(f"✅ flaky upstream (50% 503s): recovered after {source.retries} retries in total")
+        print(f"📊 {source.status()} / server {sheet.stats()}")
+    finally:
+        server.stop()
+
+
+# ✅ python fake_sheets.py --port 8765  (then SHEETS_API_URL=http://127.0.0.1:8765 SERVICE_ACCOUNT_FILE= python app.py)
+#    python fake_sheets.py --check       (offline end-to-end check of the incremental fetcher)
+def main():
+    parser = argparse.ArgumentParser(description="Offline fake of the Google Sheets values API.")
+    parser.add_argument("--csv", default=os.environ.get("DATA_CSV_PATH", os.path.join(BASE_DIR, "..", "telco-churn.csv")))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--check", action="store_true", help="run the fetcher check and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        return check(args.csv)
+
+    sheet = FakeSheet.from_csv(args.csv, latency_ms=args.latency_ms, fail_rate=args.fail_rate,
+                               throttle_every=args.throttle_every)
+    server = FakeSheetsServer(sheet, port=args.port).start()
+    print(f"✅ Fake Sheets API serving {len(sheet.rows) - 1} rows at {server.url} (any spreadsheet id)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from scoring import CATEGORICAL_FEATURES, NUMERIC_FEATURES, prepare_features, table_customers
+from table import widen
+
+# ✅ Customer dict keys for each model input column
+CUSTOMER_KEYS = {
+    "tenure": "tenure",
+    "MonthlyCharges": "monthlyCharges",
+    "TotalCharges": "totalCharges",
+    "Contract": "contract",
+    "InternetService": "internetService",
+}
+
+
+class FeaturePipeline:
+    """Precompiled replacement for the encoder -> DataFrame -> scaler path.
+
+    Built once from the fitted OneHotEncoder and StandardScaler. Each
+    categorical feature gets a lookup table holding its already-scaled one-hot
+    block (one row per known category plus a last row for unknown values), and
+    the numeric columns go through a single `(x - mean) / scale` step. The
+    arithmetic is the same as StandardScaler.transform, so the output is
+    bit-for-bit identical to `scoring.prepare_features`.
+    """
+
+    def __init__(self, encoder, scaler):
+        if getattr(encoder, "drop_idx_", None) is not None:
+            raise ValueError("FeaturePipeline does not support encoders fitted with drop=")
+
+        encoded_names = list(encoder.get_feature_names_out())
+        self.feature_names = NUMERIC_FEATURES + encoded_names
+        n_features = len(self.feature_names)
+        n_numeric = len(NUMERIC_FEATURES)
+
+        mean = scaler.mean_ if scaler.with_mean else None
+        scale = scaler.scale_ if scaler.with_std else None
+        mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        self._numeric_mean = mean[:n_numeric]
+        self._numeric_scale = scale[:n_numeric]
+
+        # One scaled lookup table per categorical feature
+        self._tables = []
+        offset = n_numeric
+        for feature, categories in zip(CATEGORICAL_FEATURES, encoder.categories_):
+            width = len(categories)
+            block_mean = mean[offset:offset + width]
+            block_scale = scale[offset:offset + width]
+            one_hot = np.vstack([np.eye(width), np.zeros((1, width))])  # last row: unknown category
+            table = (one_hot - block_mean) / block_scale
+            index = {str(category): i for i, category in enumerate(categories)}
+            self._tables.append((feature, CUSTOMER_KEYS[feature], offset, width, index, table))
+            offset += width
+
+        self.n_features = n_features
+
+    def transform(self, customers):
+        n = len(customers)
+        X = np.empty((n, self.n_features), dtype=np.float64)
+
+        numeric = np.array(
+            [[c[CUSTOMER_KEYS[f]] for f in NUMERIC_FEATURES] for c in customers], dtype=np.float64
+        ).reshape(n, len(NUMERIC_FEATURES))
+        X[:, :len(NUMERIC_FEATURES)] = (numeric - self._numeric_mean) / self._numeric_scale
+
+        for _, key, offset, width, index, table in self._tables:
+            unknown = len(table) - 1
+            rows = np.fromiter((index.get(str(c[key]), unknown) for c in customers), dtype=np.intp, count=n)
+            X[:, offset:offset + width] = table[rows]
+
+        # Reshape for the Conv1D model (3D format)
+        return X.reshape(n, self.n_features, 1)
+
+    def transform_table(self, table, rows=None):
+        """Features for `rows` of a CustomerTable, straight from its arrays.
+
+        Categorical columns map each table category to a lookup row once, then
+        index with the 1-byte codes; unparseable numbers count as 0 like in
+        `parse_customer`. Numbers are widened from float32 to the decimal they
+        were parsed from, so results match `transform` for the same rows.
+        """
+        select = slice(None) if rows is None else rows
+        n = len(table) if rows is None else len(rows)
+        X = np.empty((n, self.n_features), dtype=np.float64)
+
+        numeric = np.column_stack([widen(table.numeric(f)[select]) for f in NUMERIC_FEATURES])
+        numeric = np.nan_to_num(numeric, nan=0.0).reshape(n, len(NUMERIC_FEATURES))
+        X[:, :len(NUMERIC_FEATURES)] = (numeric - self._numeric_mean) / self._numeric_scale
+
+        for feature, _, offset, width, index, block in self._tables:
+            unknown = len(block) - 1
+            lookup = np.array([index.get(str(c), unknown) for c in table.categories(feature)], dtype=np.intp)
+            X[:, offset:offset + width] = block[lookup[table.codes(feature)[select]]]
+
+        return X.reshape(n, self.n_features, 1)
+
+
+# ✅ Representative inputs: every known category plus an unknown one, a few numeric values each
+def parity_samples(encoder):
+    contracts, services = [list(map(str, c)) + ["__unknown__"] for c in encoder.categories_]
+    numbers = [(0.0, 0.0, 0.0), (1.0, 29.85, 29.85), (34.0, 56.95, 1889.5), (72.0, 118.75, 8684.8)]
+    return [
+        {"tenure": t, "monthlyCharges": m, "totalCharges": tc, "contract": c, "internetService": s}
+        for (t, m, tc), c, s in itertools.product(numbers, contracts, services)
+    ]
+
+
+# ✅ True when the fast pipeline reproduces the pandas/sklearn path exactly
+def check_parity(pipeline, encoder, scaler, customers=None):
+    customers = customers or parity_samples(encoder)
+    expected = prepare_features(customers, encoder, scaler)
+    actual = pipeline.transform(customers)
+    return expected.shape == actual.shape and np.array_equal(expected, actual)
+
+
+# ✅ Fast pipeline when it matches the encoder/scaler exactly, otherwise the pandas path.
+#    Returns (transform(customers), transform_table(table, rows=None)).
+def build_transforms(encoder, scaler):
+    try:
+        pipeline = FeaturePipeline(encoder, scaler)
+        if check_parity(pipeline, encoder, scaler):
+            print("✅ Fast feature pipeline enabled (parity check passed)")
+            return pipeline.transform, pipeline.transform_table
+        print("⚠️ Fast feature pipeline disagrees with encoder/scaler, using pandas path")
+    except Exception as e:
+        print(f"⚠️ Fast feature pipeline unavailable ({e}), using pandas path")
+    return (
+        lambda customers: prepare_features(customers, encoder, scaler),
+        lambda table, rows=None: prepare_features(table_customers(table, rows), encoder, scaler),
+    )
+
+
+# ✅ Parity check + timing against saved artifacts: python features.py --model-dir model
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Check the precompiled feature pipeline against sklearn.")
+    parser.add_argument("--model-dir", default="model")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    encoder = joblib.load(f"{args.model_dir}/encoder_churn.pkl")
+    scaler = joblib.load(f"{args.model_dir}/scaler_churn.pkl")
+    pipeline = FeaturePipeline(encoder, scaler)
+
+    if not check_parity(pipeline, encoder, scaler):
+        raise SystemExit("❌ FeaturePipeline output differs from encoder/scaler output")
+    print("✅ FeaturePipeline output is identical to encoder/scaler output")
+
+    customer = [parity_samples(encoder)[0]]
+    for name, fn in [("pandas/sklearn", lambda: prepare_features(customer, encoder, scaler)),
+                     ("FeaturePipeline", lambda: pipeline.transform(customer))]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        print(f"⏱️ {name}: {(time.perf_counter() - start) / args.repeat * 1e6:.1f} µs per row")
+
+
+if __name__ == "__main__":
+    main()
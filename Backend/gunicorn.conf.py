@@ -0,0 +1,32 @@
+import os
+
+import wsgi
+
+# ✅ gunicorn -c gunicorn.conf.py "wsgi:create_app()"  (run from Backend/)
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = wsgi.worker_count()
+threads = wsgi.WEB_THREADS
+worker_class = "gthread"
+
+# ✅ Load the app once in the master, then fork: workers share its memory copy-on-write
+preload_app = True
+
+# ✅ Graceful shutdown: on SIGTERM workers stop accepting and finish in-flight requests first
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# ✅ Optional periodic worker recycling (0 = never)
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# ✅ Thread limits are set before the app (and NumPy/TensorFlow) is imported by the master
+wsgi.limit_threads(*wsgi.thread_limits(workers))
+
+
+def post_fork(server, worker):
+    wsgi.init_worker()
+
+
+def worker_exit(server, worker):
+    wsgi.shutdown()
@@ -0,0 +1,148 @@
+import functools
+import gzip
+import hashlib
+import json
+import zlib
+
+from flask import Response, request, stream_with_context
+
+from cache import LRUCache
+from metrics import REGISTRY, span
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+NDJSON_CHUNK_ROWS = 1000
+
+CACHE_RESULTS = REGISTRY.counter(
+    "churn_http_cache_requests_total", "Read requests by outcome: not_modified (304), hit (cached body) or miss", ["result"]
+)
+
+
+def _encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _compress(body, encoding, level):
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level)
+
+
+class _StreamCompressor:
+    """Incremental gzip/brotli for streamed NDJSON bodies."""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class SnapshotResponses:
+    """Conditional, compressed JSON responses for read endpoints backed by the dataset snapshot.
+
+    The ETag is the snapshot version plus a hash of the request path and query,
+    so an unchanged dataset answers `If-None-Match` with 304 before the view
+    runs. `current_snapshot` must return the same snapshot for the rest of the
+    request, so the view renders exactly the version named by the ETag. Encoded bodies are cached per (ETag, encoding), so clients without a
+    copy are served without recomputing or recompressing. `?format=ndjson`
+    streams list responses one row per line.
+    """
+
+    def __init__(self, current_snapshot, min_compress_bytes=1024, compression_level=6, cache_size=256):
+        self._current_snapshot = current_snapshot
+        self.min_compress_bytes = min_compress_bytes
+        self.compression_level = compression_level
+        self._bodies = LRUCache(max_size=cache_size)
+
+    def cache_info(self):
+        return self._bodies.stats()
+
+    def etag(self, version):
+        path_hash = hashlib.sha1(request.full_path.encode("utf-8")).hexdigest()[:8]
+        return f"{version}-{path_hash}"
+
+    def cached(self, view):
+        """Decorate a GET view that returns plain JSON data (error tuples pass through untouched)."""
+
+        render_stage = f"render.{view.__name__}"
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            snapshot = self._current_snapshot()
+            if snapshot is None:
+                return view(*args, **kwargs)
+
+            etag = self.etag(snapshot.version)
+            if request.if_none_match.contains_weak(etag):
+                CACHE_RESULTS.inc(result="not_modified")
+                return self._finish(Response(status=304), etag)
+
+            accepted = request.accept_encodings.best_match(_encodings())
+            ndjson = request.args.get("format") == "ndjson"
+            if not ndjson:
+                cached = self._bodies.get((etag, accepted), None)
+                if cached is not None:
+                    CACHE_RESULTS.inc(result="hit")
+                    return self._finish(self._body_response(*cached), etag)
+
+            CACHE_RESULTS.inc(result="miss")
+            with span(render_stage):
+                result = view(*args, **kwargs)
+            if isinstance(result, (Response, tuple)):
+                return result
+            if ndjson and isinstance(result, list):
+                return self._finish(self._ndjson_response(result, accepted), etag)
+
+            with span("serialize"):
+                body = json.dumps(result).encode("utf-8")
+            encoding = accepted if accepted and len(body) >= self.min_compress_bytes else None
+            if encoding:
+                with span("compress"):
+                    body = _compress(body, encoding, self.compression_level)
+            self._bodies.set((etag, accepted), (body, encoding))
+            return self._finish(self._body_response(body, encoding), etag)
+
+        return wrapper
+
+    def _body_response(self, body, encoding):
+        response = Response(body, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _ndjson_response(self, rows, encoding):
+        compressor = _StreamCompressor(encoding, self.compression_level) if encoding else None
+
+        def generate():
+            for start in range(0, len(rows), NDJSON_CHUNK_ROWS):
+                chunk = "".join(json.dumps(row) + "\n" for row in rows[start:start + NDJSON_CHUNK_ROWS]).encode("utf-8")
+                yield compressor.compress(chunk) if compressor else chunk
+            if compressor:
+                yield compressor.finish()
+
+        response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _finish(self, response, etag):
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"  # always revalidate; unchanged data costs a 304
+        response.vary.add("Accept-Encoding")
+        return response
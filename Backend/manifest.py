@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import time
+
+from cache import artifacts_fingerprint
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_sha1(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(data_fingerprint, config):
+    """Changes whenever the input data or the stage's configuration changes."""
+    payload = json.dumps({"data": data_fingerprint, "config": config}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# ✅ Size, checksum and (for .npy files) shape/dtype of one artifact
+def describe_artifact(path):
+    info = {"bytes": os.path.getsize(path), "sha1": file_sha1(path)}
+    if path.endswith(".npy"):
+        import numpy as np
+
+        array = np.load(path, mmap_mode="r")
+        info.update(shape=list(array.shape), dtype=str(array.dtype))
+    return info
+
+
+class ArtifactManifest:
+    """`model/manifest.json`: which data and config produced each preprocessing stage.
+
+    A stage is current when its recorded key matches and its files are still
+    the ones it wrote (same size and modification time), so checking costs a
+    few `stat` calls.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILENAME)
+        self.stages = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.stages = json.load(f).get("stages", {})
+            except (OSError, ValueError):
+                self.stages = {}  # unreadable manifest: every stage is rebuilt
+
+    def is_current(self, stage, key):
+        entry = self.stages.get(stage)
+        if not entry or entry.get("key") != key:
+            return False
+        return artifacts_fingerprint(self._paths(entry["artifacts"])) == entry.get("files")
+
+    def record(self, stage, key, filenames, seconds, **details):
+        self.stages[stage] = {
+            "key": key,
+            "built_at": time.time(),
+            "seconds": round(seconds, 3),
+            **details,
+            "artifacts": {name: describe_artifact(os.path.join(self.directory, name)) for name in filenames},
+            "files": artifacts_fingerprint(self._paths(filenames)),
+        }
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _paths(self, filenames):
+        return [os.path.join(self.directory, name) for name in sorted(filenames)]
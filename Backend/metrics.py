@@ -0,0 +1,272 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounts
+
+# ✅ Histogram buckets: stage latencies in seconds, batch sizes in rows
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_text(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics), one series per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [per-bucket counts (+ overflow), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def lines(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class Collected:
+    """Values read from an existing stats() call at scrape time (cache sizes, hit ratios, ...)."""
+
+    def __init__(self, name, help, collect, kind="gauge", labelnames=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+
+    def lines(self):
+        try:
+            value = self._collect()
+        except Exception:
+            return []  # e.g. a resource that is not loaded yet
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [
+            f"{self.name}{_label_text(self.labelnames, key if isinstance(key, tuple) else (key,))} {_number(v)}"
+            for key, v in sorted(value.items()) if v is not None
+        ]
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Recording is a dict lookup and a few additions under a per-metric lock, so
+    it is cheap enough to stay on in production; `enabled=False` turns every
+    `inc`/`observe` into an immediate return.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, name, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(name, lambda: Counter(self, name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(name, lambda: Histogram(self, name, help, labelnames, buckets))
+
+    def collect(self, name, help, collect, kind="gauge", labelnames=()):
+        return self._add(name, lambda: Collected(name, help, collect, kind, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+        return "\n".join(lines) + "\n"
+
+
+# ✅ Shared registry and the metrics recorded across modules (METRICS_ENABLED=false turns recording off)
+REGISTRY = MetricsRegistry(enabled=os.environ.get("METRICS_ENABLED", "true").lower() != "false")
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "churn_stage_seconds", "Time spent in each hot-path stage", ["stage"]
+)
+ROWS_PROCESSED = REGISTRY.counter(
+    "churn_rows_processed_total", "Rows handled by each stage", ["stage"]
+)
+MODEL_BATCH_SIZE = REGISTRY.histogram(
+    "churn_model_batch_rows", "Rows per model call", ["path"], buckets=SIZE_BUCKETS
+)
+
+_local = threading.local()
+
+
+class span:
+    """`with span("model"):` records the block's duration under churn_stage_seconds{stage="model"}.
+
+    Inside a profiled request the duration is also added to that request's trace.
+    """
+
+    __slots__ = ("stage", "_started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._started
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        trace = getattr(_local, "trace", None)
+        if trace is not None:
+            trace.append((self.stage, elapsed))
+        return False
+
+
+def count_rows(stage, rows):
+    ROWS_PROCESSED.inc(rows, stage=stage)
+
+
+# ✅ Per-request traces: spans recorded on this thread between begin_trace() and end_trace()
+def begin_trace():
+    _local.trace = []
+
+
+def end_trace():
+    trace, _local.trace = getattr(_local, "trace", None), None
+    return trace
+
+
+def server_timing(trace):
+    """Trace -> `Server-Timing` header value (durations in ms, repeated stages summed)."""
+    totals = {}
+    for stage, seconds in trace:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage.replace('.', '-')};dur={seconds * 1000.0:.3f}" for stage, seconds in totals.items())
+
+
+# ✅ Sampling profiler for one thread: collapsed stacks ("a;b;c count") for flamegraph.pl / speedscope
+class SamplingProfiler:
+    """Samples the stack of `thread_id` every `interval_ms` from a helper thread.
+
+    The profiled thread runs unmodified (no tracing hooks), so the cost is one
+    `sys._current_frames()` call per sample on the helper thread.
+    """
+
+    def __init__(self, thread_id=None, interval_ms=5.0, max_depth=64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.max_depth = max_depth
+        self.stacks = _StackCounts()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, directory, label):
+        os.makedirs(directory, exist_ok=True)
+        safe_label = "".join(ch if ch.isalnum() else "_" for ch in label).strip("_") or "request"
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{os.getpid()}-{self.thread_id}.txt")
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return path
@@ -0,0 +1,165 @@
+import argparse
+import json
+
+import numpy as np
+
+# ✅ Layers expected in train_model.py::create_model, in graph order
+EXPECTED_LAYER_COUNTS = {"Conv1D": 4, "LayerNormalization": 5, "Dense": 6, "LeakyReLU": 3}
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+
+class NumpyChurnModel:
+    """Pure-NumPy forward pass for the Conv1D + residual + SE + spatial-attention churn model.
+
+    Mirrors `train_model.py::create_model` layer for layer (dropout is a no-op
+    at inference) and exposes the same `predict` / `predict_on_batch` methods
+    the API calls on the Keras model, so it can be swapped in without
+    importing TensorFlow.
+    """
+
+    def __init__(self, weights, config):
+        self.weights = weights
+        self.config = config
+        self._dtype = np.float32
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data["config"]))
+            weights = {key: data[key].astype(np.float32) for key in data.files if key != "config"}
+        return cls(weights, config)
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=self._dtype)
+        if X.ndim == 2:
+            X = X[:, :, None]
+        if not batch_size or len(X) <= batch_size:
+            return self._forward(X)
+        return np.concatenate([self._forward(X[i:i + batch_size]) for i in range(0, len(X), batch_size)])
+
+    def predict_on_batch(self, X):
+        return self.predict(X)
+
+    # ✅ Layers
+    def _conv1d(self, x, i, activation=None):
+        kernel, bias = self.weights[f"conv{i}_kernel"], self.weights[f"conv{i}_bias"]
+        k = kernel.shape[0]
+        left = (k - 1) // 2  # "same" padding, as in TensorFlow
+        length = x.shape[1]
+        padded = np.pad(x, ((0, 0), (left, k - 1 - left), (0, 0)))
+        windows = np.concatenate([padded[:, j:j + length, :] for j in range(k)], axis=-1)
+        out = windows @ kernel.reshape(-1, kernel.shape[-1]) + bias
+        return _sigmoid(out) if activation == "sigmoid" else out
+
+    def _layer_norm(self, x, i):
+        mean = x.mean(axis=-1, keepdims=True)
+        var = x.var(axis=-1, keepdims=True)
+        x = (x - mean) / np.sqrt(var + self.config["layer_norm_epsilon"][i])
+        return x * self.weights[f"ln{i}_gamma"] + self.weights[f"ln{i}_beta"]
+
+    def _leaky_relu(self, x, i):
+        return np.where(x >= 0, x, x * self.config["leaky_relu_slope"][i])
+
+    def _dense(self, x, i, activation=None):
+        out = x @ self.weights[f"dense{i}_kernel"] + self.weights[f"dense{i}_bias"]
+        if activation == "relu":
+            return _relu(out)
+        if activation == "sigmoid":
+            return _sigmoid(out)
+        return out
+
+    def _forward(self, x):
+        # Stem
+        x = self._leaky_relu(self._layer_norm(self._conv1d(x, 0), 0), 0)
+
+        # Residual block
+        shortcut = x
+        x = self._leaky_relu(self._layer_norm(self._conv1d(x, 1), 1), 1)
+        x = self._leaky_relu(self._layer_norm(self._conv1d(x, 2), 2), 2)
+        x = shortcut + x
+
+        # Squeeze-and-Excitation block
+        se = x.mean(axis=1)
+        se = self._dense(se, 0, "relu")
+        se = self._dense(se, 1, "sigmoid")
+        x = x * se[:, None, :]
+
+        # Spatial attention
+        x = x * self._conv1d(x, 3, "sigmoid")
+
+        # Head
+        x = x.mean(axis=1)
+        x = self._layer_norm(self._dense(x, 2, "relu"), 3)
+        x = self._layer_norm(self._dense(x, 3, "relu"), 4)
+        x = self._dense(x, 4, "relu")
+        return self._dense(x, 5, "sigmoid")
+
+
+# ✅ Pull weights out of a trained Keras model (works on any Keras object, no TF import here)
+def export_weights(keras_model, path):
+    layers = {name: [] for name in EXPECTED_LAYER_COUNTS}
+    for layer in keras_model.layers:
+        kind = type(layer).__name__
+        if kind in layers:
+            layers[kind].append(layer)
+
+    for kind, expected in EXPECTED_LAYER_COUNTS.items():
+        if len(layers[kind]) != expected:
+            raise ValueError(f"❌ Expected {expected} {kind} layers, found {len(layers[kind])}")
+
+    arrays = {}
+    for i, layer in enumerate(layers["Conv1D"]):
+        arrays[f"conv{i}_kernel"], arrays[f"conv{i}_bias"] = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+    for i, layer in enumerate(layers["Dense"]):
+        arrays[f"dense{i}_kernel"], arrays[f"dense{i}_bias"] = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+    for i, layer in enumerate(layers["LayerNormalization"]):
+        arrays[f"ln{i}_gamma"], arrays[f"ln{i}_beta"] = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+
+    config = {
+        "layer_norm_epsilon": [float(layer.get_config()["epsilon"]) for layer in layers["LayerNormalization"]],
+        "leaky_relu_slope": [
+            float(layer.get_config().get("negative_slope", layer.get_config().get("alpha", 0.3)))
+            for layer in layers["LeakyReLU"]
+        ],
+        "input_shape": [int(d) for d in keras_model.input_shape[1:]],
+    }
+    np.savez(path, config=np.array(json.dumps(config)), **arrays)
+    return config
+
+
+# ✅ Export + verify: python numpy_model.py --model model/best_churn_model.keras --out model/churn_model_weights.npz
+def main():
+    parser = argparse.ArgumentParser(description="Export the Keras churn model for the NumPy runtime.")
+    parser.add_argument("--model", default="model/best_churn_model.keras")
+    parser.add_argument("--out", default="model/churn_model_weights.npz")
+    parser.add_argument("--check-data", default="model/X_test_churn.npy")
+    parser.add_argument("--tolerance", type=float, default=1e-2)  # the model is trained with mixed_float16
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    keras_model = tf.keras.models.load_model(args.model)
+    export_weights(keras_model, args.out)
+    print(f"✅ Exported weights to {args.out}")
+
+    X_check = np.load(args.check_data)
+    X_check = X_check.reshape(X_check.shape[0], X_check.shape[1], 1)
+    expected = keras_model.predict(X_check, verbose=0).reshape(-1)
+    actual = NumpyChurnModel.load(args.out).predict(X_check).reshape(-1)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    label_agreement = float(np.mean((expected >= 0.5) == (actual >= 0.5)))
+    print(f"🔍 Max |keras - numpy| = {max_diff:.2e}, label agreement = {label_agreement:.4%}")
+    if max_diff > args.tolerance:
+        raise SystemExit(f"❌ NumPy runtime differs from Keras by more than {args.tolerance}")
+    print("✅ NumPy runtime matches Keras within tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,71 @@
+import argparse
 import os
+import tempfile
+import time
 import joblib
 import numpy as np
 import pandas as pd
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import sklearn
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import ShuffleSplit, train_test_split
+from data_source import get_data_source
+from manifest import ArtifactManifest, stage_key
 
-# ✅ Ensure model directory exists
-os.makedirs("model", exist_ok=True)
+MODEL_DIR = "model"
+PREPROCESS_CHUNK_SIZE = int(os.environ.get("PREPROCESS_CHUNK_SIZE", "50000"))
+
+# ✅ Pipeline definitions; any change here (or to PREPROCESS_VERSION) invalidates the cached artifacts
+PREPROCESS_VERSION = 1
+FILL_COLUMNS = ["TotalCharges", "tenure", "MonthlyCharges"]
+PIPELINES = {
+    "churn": {
+        "numeric": ["tenure", "MonthlyCharges", "TotalCharges"],
+        "categorical": ["Contract", "InternetService"],
+        "target": "Churn",
+    },
+    "vis": {
+        "numeric": ["tenure", "MonthlyCharges", "TotalCharges"],
+        "categorical": ["gender", "StreamingTV", "StreamingMovies", "PaymentMethod", "InternetService", "Contract"],
+        "target": None,
+    },
+}
+SPLIT = {"test_size": 0.2, "random_state": 42}
 
-# ✅ Google Sheets credentials
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-SERVICE_ACCOUNT_FILE = r"D:\coding\mini project new\backend\credentials_service.json"
-SPREADSHEET_ID = "1kHP7cAB_-Rnb7WH3uGH4CUkkmTs6f8Ub1X6nO91VXr0"
-RANGE_NAME = "A1:Z"
+# ✅ Ensure model directory exists
+os.makedirs(MODEL_DIR, exist_ok=True)
 
-# ✅ Authenticate and fetch data from Google Sheets
-def fetch_data_from_google_sheets():
+# ✅ Fetch data from the configured data source (DATA_SOURCE=sheets | csv | columnar)
+def fetch_data(source=None):
+    source = source or get_data_source()
     try:
-        credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        service = build("sheets", "v4", credentials=credentials)
-        
-        sheet = service.spreadsheets()
-        result = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=RANGE_NAME).execute()
-        values = result.get("values", [])
-        
-        if not values:
-            raise ValueError("❌ No data found in the spreadsheet.")
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(values[1:], columns=values[0])
+        df = source.fetch_dataframe()
+        print(f"✅ Loaded {len(df)} rows from '{source.name}' data source")
         return df
     except Exception as e:
         print(f"❌ Error fetching data: {str(e)}")
         raise e
 
-# ✅ Preprocess data for Churn Prediction
-def preprocess_churn_data(df):
-    # Handle missing values for numeric columns (replace with mean or median)
-    numeric_cols = ["TotalCharges", "tenure", "MonthlyCharges"]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-        df[col].fillna(df[col].mean(), inplace=True)  # Fill missing with column mean
+# ✅ Parsed and typed table shared by both pipelines (built once per run)
+def build_base_table(df):
+    base = df.drop(columns=["customerID"], errors="ignore").copy()
 
-    # Drop customerID if exists
-    df.drop(columns=["customerID"], axis=1, errors="ignore", inplace=True)
+    # Handle missing values for numeric columns (replace with the column mean)
+    for col in FILL_COLUMNS:
+        base[col] = pd.to_numeric(base[col], errors="coerce")
+        base[col] = base[col].fillna(base[col].mean())
 
     # Convert Churn column to binary
-    df["Churn"] = df["Churn"].map({"Yes": 1, "No": 0})
+    base["Churn"] = base["Churn"].map({"Yes": 1, "No": 0})
+    return base
 
+# ✅ Preprocess data for Churn Prediction (`df` is the output of build_base_table)
+def preprocess_churn_data(df, out_dir=MODEL_DIR):
     # Select features for churn prediction
-    selected_features_churn = ["tenure", "MonthlyCharges", "TotalCharges", "Contract", "InternetService"]
+    categorical_features_churn = PIPELINES["churn"]["categorical"]
+    selected_features_churn = PIPELINES["churn"]["numeric"] + categorical_features_churn
     X_churn = df[selected_features_churn].copy()
 
     # One-hot encode categorical features
-    categorical_features_churn = ["Contract", "InternetService"]
     encoder_churn = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
     encoded_churn = encoder_churn.fit_transform(X_churn[categorical_features_churn])
     encoded_churn_df = pd.DataFrame(encoded_churn, columns=encoder_churn.get_feature_names_out(categorical_features_churn))
@@ -72,31 +82,28 @@ def preprocess_churn_data(df):
     y_churn = df["Churn"].astype(int)
 
     # Train-test split for churn prediction
-    X_train_churn, X_test_churn, y_train_churn, y_test_churn = train_test_split(X_churn_scaled, y_churn, test_size=0.2, random_state=42)
+    X_train_churn, X_test_churn, y_train_churn, y_test_churn = train_test_split(X_churn_scaled, y_churn, **SPLIT)
 
     # Save preprocessed data
-    np.save("model/X_train_churn.npy", X_train_churn)
-    np.save("model/X_test_churn.npy", X_test_churn)
-    np.save("model/y_train_churn.npy", y_train_churn)
-    np.save("model/y_test_churn.npy", y_test_churn)
+    np.save(os.path.join(out_dir, "X_train_churn.npy"), X_train_churn)
+    np.save(os.path.join(out_dir, "X_test_churn.npy"), X_test_churn)
+    np.save(os.path.join(out_dir, "y_train_churn.npy"), y_train_churn)
+    np.save(os.path.join(out_dir, "y_test_churn.npy"), y_test_churn)
 
     # Save encoder and scaler
-    joblib.dump(scaler_churn, "model/scaler_churn.pkl")
-    joblib.dump(encoder_churn, "model/encoder_churn.pkl")
+    joblib.dump(scaler_churn, os.path.join(out_dir, "scaler_churn.pkl"))
+    joblib.dump(encoder_churn, os.path.join(out_dir, "encoder_churn.pkl"))
 
     return X_train_churn, X_test_churn, y_train_churn, y_test_churn
 
-# ✅ Preprocess data for Visualization (e.g., feature engineering for visualization)
-def preprocess_visualization_data(df):
-    selected_features_vis = [
-        "tenure", "MonthlyCharges", "TotalCharges", "gender",
-        "StreamingTV", "StreamingMovies", "PaymentMethod", "InternetService", "Contract"
-    ]
-    
+# ✅ Preprocess data for Visualization (`df` is the output of build_base_table)
+def preprocess_visualization_data(df, out_dir=MODEL_DIR):
+    categorical_features_vis = PIPELINES["vis"]["categorical"]
+    selected_features_vis = PIPELINES["vis"]["numeric"] + categorical_features_vis
+
     X_vis = df[selected_features_vis].copy()
 
     # One-hot encode categorical variables
-    categorical_features_vis = ["gender", "StreamingTV", "StreamingMovies", "PaymentMethod", "InternetService", "Contract"]
     encoder_vis = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
     encoded_cats = encoder_vis.fit_transform(X_vis[categorical_features_vis])
     encoded_df = pd.DataFrame(encoded_cats, columns=encoder_vis.get_feature_names_out(categorical_features_vis))
@@ -110,29 +117,254 @@ def preprocess_visualization_data(df):
     X_vis_scaled = scaler_vis.fit_transform(X_vis_final)
 
     # Train-test split for visualization data
-    X_train_vis, X_test_vis = train_test_split(X_vis_scaled, test_size=0.2, random_state=42)
+    X_train_vis, X_test_vis = train_test_split(X_vis_scaled, **SPLIT)
 
     # Save preprocessed data
-    np.save("model/X_train_vis.npy", X_train_vis)
-    np.save("model/X_test_vis.npy", X_test_vis)
+    np.save(os.path.join(out_dir, "X_train_vis.npy"), X_train_vis)
+    np.save(os.path.join(out_dir, "X_test_vis.npy"), X_test_vis)
 
     # Save encoder and scaler
-    joblib.dump(scaler_vis, "model/scaler_vis.pkl")
-    joblib.dump(encoder_vis, "model/encoder_vis.pkl")
+    joblib.dump(scaler_vis, os.path.join(out_dir, "scaler_vis.pkl"))
+    joblib.dump(encoder_vis, os.path.join(out_dir, "encoder_vis.pkl"))
 
     return X_train_vis, X_test_vis
 
+
+class StreamingPipeline:
+    """One encoder/scaler pipeline fitted and applied chunk by chunk.
+
+    Mirrors `preprocess_churn_data` / `preprocess_visualization_data`: the
+    numeric columns come first (mean-filled), followed by the one-hot columns,
+    and everything is standardized. Outputs are written straight into
+    memory-mapped `.npy` files.
+    """
+
+    def __init__(self, name, numeric, categorical, target=None):
+        self.name = name
+        self.numeric = numeric
+        self.categorical = categorical
+        self.target = target
+        self.encoder = None
+        self.scaler = StandardScaler()
+        self.outputs = {}
+        self.arrays = {}
+
+    def fit_encoder(self, categories):
+        # Fitting on each column's distinct values gives the same sorted categories_ as a full fit
+        values = {col: sorted(categories[col]) for col in self.categorical}
+        width = max(len(v) for v in values.values())
+        frame = pd.DataFrame({col: v + [v[0]] * (width - len(v)) for col, v in values.items()})
+        self.encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False).fit(frame)
+
+    def features(self, chunk, fill_means):
+        numeric = pd.DataFrame({
+            col: pd.to_numeric(chunk[col], errors="coerce").fillna(fill_means[col]) for col in self.numeric
+        })
+        encoded = pd.DataFrame(
+            self.encoder.transform(chunk[self.categorical]),
+            columns=self.encoder.get_feature_names_out(self.categorical),
+        )
+        return pd.concat([numeric, encoded], axis=1)
+
+    def open_outputs(self, out_dir, n_train, n_test):
+        width = len(self.numeric) + sum(len(c) for c in self.encoder.categories_)
+        self.outputs = {
+            f"X_train_{self.name}.npy": ((n_train, width), np.float64),
+            f"X_test_{self.name}.npy": ((n_test, width), np.float64),
+        }
+        if self.target:
+            self.outputs[f"y_train_{self.name}.npy"] = ((n_train,), np.int64)
+            self.outputs[f"y_test_{self.name}.npy"] = ((n_test,), np.int64)
+        self.arrays = {
+            filename: np.lib.format.open_memmap(os.path.join(out_dir, filename + ".tmp"), mode="w+", dtype=dtype, shape=shape)
+            for filename, (shape, dtype) in self.outputs.items()
+        }
+
+    def write(self, chunk, fill_means, train_slots, test_slots, in_test):
+        X = self.scaler.transform(self.features(chunk, fill_means))
+        y = chunk[self.target].map({"Yes": 1, "No": 0}).astype(int).to_numpy() if self.target else None
+        for split, slots, mask in (("train", train_slots, ~in_test), ("test", test_slots, in_test)):
+            self.arrays[f"X_{split}_{self.name}.npy"][slots] = X[mask]
+            if y is not None:
+                self.arrays[f"y_{split}_{self.name}.npy"][slots] = y[mask]
+
+    def close(self, out_dir):
+        for filename in self.arrays:
+            self.arrays[filename].flush()
+        self.arrays = {}  # unmap before renaming (required on Windows)
+        for filename in self.outputs:
+            os.replace(os.path.join(out_dir, filename + ".tmp"), os.path.join(out_dir, filename))
+        joblib.dump(self.scaler, os.path.join(out_dir, f"scaler_{self.name}.pkl"))
+        joblib.dump(self.encoder, os.path.join(out_dir, f"encoder_{self.name}.pkl"))
+
+
+def streaming_pipelines(names=None):
+    return [
+        StreamingPipeline(name, spec["numeric"], spec["categorical"], target=spec["target"])
+        for name, spec in PIPELINES.items()
+        if names is None or name in names
+    ]
+
+
+def _chunks(source, chunk_size):
+    start = 0
+    for chunk in source.iter_dataframes(chunk_size):
+        chunk = chunk.reset_index(drop=True)
+        yield start, chunk
+        start += len(chunk)
+
+
+def preprocess_streaming(source=None, chunk_size=PREPROCESS_CHUNK_SIZE, out_dir=MODEL_DIR, names=None):
+    """Three passes over the source, each holding one chunk: statistics, scaler fit, transform."""
+    source = source or get_data_source()
+    pipelines = streaming_pipelines(names)
+    categorical = sorted({col for pipeline in pipelines for col in pipeline.categorical})
+
+    # Pass 1: row count, fill means and categories
+    rows, sums, counts = 0, dict.fromkeys(FILL_COLUMNS, 0.0), dict.fromkeys(FILL_COLUMNS, 0)
+    categories = {col: set() for col in categorical}
+    for _, chunk in _chunks(source, chunk_size):
+        rows += len(chunk)
+        for col in FILL_COLUMNS:
+            values = pd.to_numeric(chunk[col], errors="coerce")
+            sums[col] += float(values.sum())
+            counts[col] += int(values.count())
+        for col in categorical:
+            categories[col].update(chunk[col].unique())
+    if rows == 0:
+        raise ValueError(f"❌ No data found in the {source.name} data source.")
+    fill_means = {col: sums[col] / counts[col] if counts[col] else np.nan for col in FILL_COLUMNS}
+    for pipeline in pipelines:
+        pipeline.fit_encoder(categories)
+
+    # Pass 2: running mean/variance of every scaled column
+    for _, chunk in _chunks(source, chunk_size):
+        for pipeline in pipelines:
+            pipeline.scaler.partial_fit(pipeline.features(chunk, fill_means))
+
+    # Same rows on each side as train_test_split(**SPLIT) in the in-memory mode
+    train_index, test_index = next(ShuffleSplit(n_splits=1, **SPLIT).split(np.empty((rows, 0))))
+    slots = np.empty(rows, dtype=np.int64)
+    slots[train_index] = np.arange(len(train_index))
+    slots[test_index] = np.arange(len(test_index))
+    is_test = np.zeros(rows, dtype=bool)
+    is_test[test_index] = True
+    del train_index, test_index
+
+    # Pass 3: transform each chunk into its rows of the memory-mapped outputs
+    for pipeline in pipelines:
+        pipeline.open_outputs(out_dir, rows - int(is_test.sum()), int(is_test.sum()))
+    for start, chunk in _chunks(source, chunk_size):
+        chunk_slots, in_test = slots[start:start + len(chunk)], is_test[start:start + len(chunk)]
+        for pipeline in pipelines:
+            pipeline.write(chunk, fill_means, chunk_slots[~in_test], chunk_slots[in_test], in_test)
+    for pipeline in pipelines:
+        pipeline.close(out_dir)
+
+    print(f"✅ Streamed {rows} rows from '{source.name}' in chunks of {chunk_size}")
+    return rows
+
+
+# ✅ Compare the artifacts written by two runs (e.g. in-memory vs. streaming)
+def compare_artifacts(dir_a, dir_b, rtol=1e-7, atol=1e-9):
+    mismatches = []
+    for name in ("churn", "vis"):
+        for filename in (f"X_train_{name}.npy", f"X_test_{name}.npy", f"y_train_{name}.npy", f"y_test_{name}.npy"):
+            path_a, path_b = os.path.join(dir_a, filename), os.path.join(dir_b, filename)
+            if not os.path.exists(path_a):
+                continue
+            a, b = np.load(path_a, mmap_mode="r"), np.load(path_b, mmap_mode="r")
+            if a.shape != b.shape or not np.allclose(a, b, rtol=rtol, atol=atol):
+                mismatches.append(filename)
+
+        encoder_a = joblib.load(os.path.join(dir_a, f"encoder_{name}.pkl"))
+        encoder_b = joblib.load(os.path.join(dir_b, f"encoder_{name}.pkl"))
+        if [list(c) for c in encoder_a.categories_] != [list(c) for c in encoder_b.categories_]:
+            mismatches.append(f"encoder_{name}.pkl")
+
+        scaler_a = joblib.load(os.path.join(dir_a, f"scaler_{name}.pkl"))
+        scaler_b = joblib.load(os.path.join(dir_b, f"scaler_{name}.pkl"))
+        if not all(
+            np.allclose(getattr(scaler_a, attr), getattr(scaler_b, attr), rtol=rtol, atol=atol)
+            for attr in ("mean_", "var_", "scale_", "n_samples_seen_")
+        ):
+            mismatches.append(f"scaler_{name}.pkl")
+    return mismatches
+
+
+# ✅ Files written by each pipeline
+def stage_artifacts(name):
+    filenames = [f"X_train_{name}.npy", f"X_test_{name}.npy"]
+    if PIPELINES[name]["target"]:
+        filenames += [f"y_train_{name}.npy", f"y_test_{name}.npy"]
+    return filenames + [f"scaler_{name}.pkl", f"encoder_{name}.pkl"]
+
+
+def stage_config(name):
+    return {
+        "pipeline": PIPELINES[name],
+        "fill_columns": FILL_COLUMNS,
+        "split": SPLIT,
+        "preprocess_version": PREPROCESS_VERSION,
+        "sklearn": sklearn.__version__,
+    }
+
+
+PREPROCESSORS = {"churn": preprocess_churn_data, "vis": preprocess_visualization_data}
+
+
+# ✅ Rebuild only the pipelines whose input data or configuration changed since the last run
+def run_preprocessing(source=None, streaming=False, chunk_size=PREPROCESS_CHUNK_SIZE, out_dir=MODEL_DIR, force=False):
+    # Fetched once: the fingerprint recorded in the manifest describes exactly the data the artifacts are built from
+    source = (source or get_data_source()).pin()
+    manifest = ArtifactManifest(out_dir)
+    fingerprint = source.fingerprint()
+    keys = {name: stage_key(fingerprint, stage_config(name)) for name in PIPELINES}
+    stale = [name for name in PIPELINES if force or not manifest.is_current(name, keys[name])]
+    if not stale:
+        print(f"✅ Preprocessed artifacts are up to date (data fingerprint {fingerprint})")
+        return stale
+
+    if streaming:
+        started = time.time()
+        rows = preprocess_streaming(source, chunk_size=chunk_size, out_dir=out_dir, names=stale)
+        seconds = time.time() - started
+        for name in stale:
+            manifest.record(name, keys[name], stage_artifacts(name), seconds,
+                            data_fingerprint=fingerprint, rows=rows, mode="streaming")
+    else:
+        base = build_base_table(fetch_data(source))
+        for name in stale:
+            started = time.time()
+            PREPROCESSORS[name](base, out_dir=out_dir)
+            manifest.record(name, keys[name], stage_artifacts(name), time.time() - started,
+                            data_fingerprint=fingerprint, rows=len(base), mode="in-memory")
+
+    print(f"✅ Rebuilt: {', '.join(stale)}")
+    return stale
+
+
 # Main preprocessing function
 def main():
-    try:
-        # Fetch data
-        df = fetch_data_from_google_sheets()
+    parser = argparse.ArgumentParser(description="Preprocess the churn and visualization datasets.")
+    parser.add_argument("--streaming", action="store_true", help="read the source in chunks (bounded memory)")
+    parser.add_argument("--chunk-size", type=int, default=PREPROCESS_CHUNK_SIZE)
+    parser.add_argument("--verify", action="store_true", help="also run the in-memory mode and compare the artifacts")
+    parser.add_argument("--force", action="store_true", help="rebuild every stage even if the manifest says it is current")
+    args = parser.parse_args()
 
-        # Preprocess churn data
-        preprocess_churn_data(df)
-
-        # Preprocess visualization data
-        preprocess_visualization_data(df)
+    try:
+        source = get_data_source().pin()
+        run_preprocessing(source, streaming=args.streaming, chunk_size=args.chunk_size, force=args.force)
+        if args.streaming and args.verify:
+            with tempfile.TemporaryDirectory() as reference_dir:
+                base = build_base_table(fetch_data(source))
+                preprocess_churn_data(base, out_dir=reference_dir)
+                preprocess_visualization_data(base, out_dir=reference_dir)
+                mismatches = compare_artifacts(reference_dir, MODEL_DIR)
+            if mismatches:
+                raise ValueError(f"Streaming artifacts differ from the in-memory mode: {', '.join(mismatches)}")
+            print("✅ Streaming artifacts match the in-memory mode")
 
         print("✅ Preprocessing completed successfully!")
     except Exception as e:
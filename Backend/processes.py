@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ProcessThread:
+    """A daemon background thread, started on first use in every process.
+
+    Threads do not survive fork(): a gunicorn worker inherits the objects the
+    master created (snapshot, batcher, bundle manager) but none of their
+    threads. `ensure()` therefore starts the thread whenever it is not running
+    in the calling process, and is cheap to call on every request.
+    """
+
+    def __init__(self, target, name):
+        self._target = target
+        self.name = name
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        """True when the thread is running in this process."""
+        thread = self._thread
+        return thread is not None and self._pid == os.getpid() and thread.is_alive()
+
+    def ensure(self, on_fork=None):
+        """Start the thread unless it runs here; `on_fork()` first resets state inherited from the parent process."""
+        if self.is_alive():
+            return
+        with self._lock:
+            if self.is_alive():
+                return
+            if on_fork is not None and self._pid is not None and self._pid != os.getpid():
+                on_fork()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._target, name=self.name, daemon=True)
+            self._thread.start()
+
+    def join(self, timeout=None):
+        if self.is_alive():
+            self._thread.join(timeout)
+
+
+# ✅ Process pool for TensorFlow work: TensorFlow's runtime is not fork-safe, so workers are started with
+#    "spawn" (a fresh interpreter each; `initializer`, `initargs` and the tasks must be picklable)
+def spawn_pool(workers, initializer=None, initargs=()):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=initializer, initargs=initargs)
@@ -0,0 +1,119 @@
+import threading
+import time
+
+
+class LazyResource:
+    """A heavy object (model, encoder, ...) loaded on first `get()` and then kept."""
+
+    def __init__(self, name, loader, optional=False):
+        self.name = name
+        self._loader = loader
+        self.optional = optional
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"❌ Failed to load {self.name}: {e}")
+                    raise
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self.error = None
+                self._loaded = True
+                print(f"✅ {self.name} loaded in {self.load_seconds}s")
+        return self._value
+
+    def reset(self):
+        """Drop the loaded value; the next `get()` loads it again (e.g. after a model swap)."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self.load_seconds = None
+
+    def status(self):
+        return {
+            "loaded": self._loaded,
+            "optional": self.optional,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+class ResourceRegistry:
+    """Named lazy resources plus an optional background warm-up."""
+
+    def __init__(self):
+        self._resources = {}
+        self._warm_up_thread = None
+        self.warm_up_started_at = None
+        self.warm_up_seconds = None
+        self.warm_up_error = None
+
+    def register(self, name, loader, optional=False):
+        """Optional resources are warmed up too, but failing to load them does not block readiness."""
+        resource = LazyResource(name, loader, optional=optional)
+        self._resources[name] = resource
+        return resource
+
+    @property
+    def warmed_up(self):
+        return self.warm_up_seconds is not None
+
+    def warm_up(self, after=None, background=True):
+        """Load every resource, then run `after()` (e.g. one warm-up inference)."""
+        if self._warm_up_thread is not None:
+            return self._warm_up_thread
+
+        def run():
+            self.warm_up_started_at = time.time()
+            start = time.perf_counter()
+            try:
+                for resource in self._resources.values():
+                    try:
+                        resource.get()
+                    except Exception:
+                        if not resource.optional:
+                            raise
+                if after is not None:
+                    after()
+                self.warm_up_seconds = round(time.perf_counter() - start, 3)
+                print(f"🔥 Warm-up finished in {self.warm_up_seconds}s")
+            except Exception as e:
+                self.warm_up_error = str(e)
+                print(f"❌ Warm-up failed: {e}")
+
+        if background:
+            self._warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+            self._warm_up_thread.start()
+        else:
+            self._warm_up_thread = threading.current_thread()
+            run()
+        return self._warm_up_thread
+
+    def ready(self):
+        required = [r for r in self._resources.values() if not r.optional]
+        return self.warmed_up or all(r.loaded for r in required)
+
+    def status(self):
+        return {
+            "components": {name: r.status() for name, r in self._resources.items()},
+            "warm_up": {
+                "started": self.warm_up_started_at is not None,
+                "seconds": self.warm_up_seconds,
+                "error": self.warm_up_error,
+            },
+        }
@@ -0,0 +1,173 @@
+import numpy as np
+
+from metrics import span
+
+# ✅ Model input columns, in the order used during training
+NUMERIC_FEATURES = ["tenure", "MonthlyCharges", "TotalCharges"]
+CATEGORICAL_FEATURES = ["Contract", "InternetService"]
+
+# ✅ Accept both the API field names and the dataset column names
+FIELD_ALIASES = {
+    "tenure": "tenure",
+    "monthlyCharges": "MonthlyCharges",
+    "MonthlyCharges": "MonthlyCharges",
+    "totalCharges": "TotalCharges",
+    "TotalCharges": "TotalCharges",
+    "contract": "Contract",
+    "Contract": "Contract",
+    "internetService": "InternetService",
+    "InternetService": "InternetService",
+}
+
+
+# ✅ Normalize one request payload into a customer dict (same defaults as /predict)
+def parse_customer(data):
+    fields = {FIELD_ALIASES[k]: v for k, v in data.items() if k in FIELD_ALIASES}
+
+    tenure = float(fields.get("tenure", 0))
+    monthly_charges = float(fields.get("MonthlyCharges", 0))
+    total_charges = fields.get("TotalCharges", "0")
+    contract = fields.get("Contract", "Month-to-month")
+    internet_service = fields.get("InternetService", "DSL")
+
+    # Convert TotalCharges to float safely
+    try:
+        total_charges = float(total_charges)
+    except (TypeError, ValueError):
+        total_charges = 0.0
+
+    return {
+        "tenure": tenure,
+        "monthlyCharges": monthly_charges,
+        "totalCharges": total_charges,
+        "contract": contract,
+        "internetService": internet_service,
+    }
+
+
+# ✅ Customer dicts (the parse_customer format) for rows of a CustomerTable; unparseable numbers become 0
+def table_customers(table, rows=None):
+    columns = [
+        ("tenure", table.labels("tenure", rows)),
+        ("monthlyCharges", table.labels("MonthlyCharges", rows)),
+        ("totalCharges", table.labels("TotalCharges", rows)),
+        ("contract", table.labels("Contract", rows)),
+        ("internetService", table.labels("InternetService", rows)),
+    ]
+    customers = []
+    for values in zip(*(column.tolist() for _, column in columns)):
+        customer = dict(zip((name for name, _ in columns), values))
+        for key in ("tenure", "monthlyCharges", "totalCharges"):
+            if customer[key] != customer[key]:  # NaN
+                customer[key] = 0.0
+        customers.append(customer)
+    return customers
+
+
+# ✅ Encode + scale any number of customers in one vectorized pass
+def prepare_features(customers, encoder, scaler):
+    import pandas as pd  # imported on first use to keep API start-up fast
+
+    with span("features.dataframe"):
+        input_data = pd.DataFrame(
+            [[c["tenure"], c["monthlyCharges"], c["totalCharges"], c["contract"], c["internetService"]] for c in customers],
+            columns=NUMERIC_FEATURES + CATEGORICAL_FEATURES,
+        )
+
+    # Encode categorical data
+    with span("features.encode"):
+        categorical_encoded = encoder.transform(input_data[CATEGORICAL_FEATURES])
+        categorical_df = pd.DataFrame(categorical_encoded, columns=encoder.get_feature_names_out())
+
+    # Combine numeric and categorical data in training column order
+    with span("features.combine"):
+        processed_data = pd.concat([input_data[NUMERIC_FEATURES], categorical_df], axis=1)
+        expected_features = NUMERIC_FEATURES + list(encoder.get_feature_names_out())
+        processed_data = processed_data[expected_features]
+
+    # Scale and reshape for the Conv1D model (3D format)
+    with span("features.scale"):
+        X_scaled = scaler.transform(processed_data)
+    return X_scaled.reshape(X_scaled.shape[0], X_scaled.shape[1], 1)
+
+
+def churn_label(churn_probability):
+    return "Yes" if churn_probability >= 0.5 else "No"
+
+
+# ✅ Personalized retention offers
+def personalized_offer(customer, churn_result):
+    tenure = customer["tenure"]
+    monthly_charges = customer["monthlyCharges"]
+    total_charges = customer["totalCharges"]
+    contract = customer["contract"]
+    internet_service = customer["internetService"]
+
+    offer = ""
+    if churn_result == "Yes":
+        if tenure < 3:
+            offer = "New customers get 3 months of premium service at the price of a basic plan. Free router upgrade included!"
+        elif tenure < 6:
+            offer = "We value you! Enjoy a 10% discount on your next 3 months' subscription."
+        elif monthly_charges > 120:
+            offer = "Spend less and get more! Switch to an annual plan and save $20/month."
+        elif contract == "Month-to-month":
+            offer = "Switch to a 12-month contract and get 20% off your monthly charges."
+        elif internet_service == "DSL":
+            offer = "Upgrade to fiber and enjoy faster speeds with a 15% discount."
+        elif total_charges > 500:
+            offer = "Loyal customers get a 10% discount as a token of appreciation. Tell us what you think and get additional discounts based on feedback."
+        elif total_charges > 1000:
+            offer = "As one of our top customers, enjoy a special upgrade to our premium plan."
+
+    else:
+        offer = "Thank you for staying with us! Enjoy a 5% discount on your next month’s subscription."
+        if tenure > 12:
+            offer += " As a loyal customer, we are giving you a VIP discount on your next bill."
+        if internet_service == "DSL":
+            offer += " Upgrade to fiber for faster speeds and more data."
+        if monthly_charges > 120:
+            offer += " Unlock exclusive offers on premium plans!"
+    return offer
+
+
+# ✅ Build the /predict response body for one scored customer
+def build_result(customer, churn_probability):
+    churn_result = churn_label(churn_probability)
+    return {
+        "churn_probability": float(churn_probability),
+        "churn": churn_result,
+        "personalized_offer": personalized_offer(customer, churn_result),
+        "comparison_data": customer,
+    }
+
+
+# ✅ Churn probabilities for a list of customers: one feature-preparation and one model call
+def predict_churn_probabilities(customers, transform, model, batch_size=1024):
+    if not customers:
+        return np.empty(0)
+    with span("features"):
+        X_scaled = transform(customers)
+    with span("model"):
+        return np.asarray(model.predict(X_scaled, batch_size=batch_size, verbose=0)).reshape(-1)
+
+
+# ✅ Churn probabilities for rows of a CustomerTable, scored in chunks of `chunk_size` rows
+def predict_table_probabilities(table, transform_table, model, rows=None, chunk_size=50000, batch_size=1024):
+    rows = np.arange(len(table)) if rows is None else np.asarray(rows)
+    probabilities = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        with span("features"):
+            X_scaled = transform_table(table, chunk)
+        with span("model"):
+            probabilities[start:start + len(chunk)] = np.asarray(
+                model.predict(X_scaled, batch_size=batch_size, verbose=0)
+            ).reshape(-1)
+    return probabilities
+
+
+# ✅ Score a list of customers into /predict response bodies
+def score_customers(customers, transform, model, batch_size=1024):
+    probabilities = predict_churn_probabilities(customers, transform, model, batch_size=batch_size)
+    return [build_result(c, p) for c, p in zip(customers, probabilities)]
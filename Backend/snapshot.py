@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+
+from metrics import count_rows, span
+from processes import ProcessThread
+from table import ColumnValues, CustomerTable
+
+# ✅ Content hash of the raw values, identical across workers for identical data
+def values_version(values):
+    if isinstance(values, ColumnValues):
+        if values.version:
+            return values.version  # recorded by the source when it wrote the columns
+        values = values.rows()
+    digest = hashlib.sha1()
+    for row in values:
+        digest.update("\x1f".join(row).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:16]
+
+
+class Snapshot:
+    """One copy of the dataset, held as a compact CustomerTable (see table.py)."""
+
+    def __init__(self, table, version, fetched_at):
+        self.table = table
+        self.version = version
+        self.fetched_at = fetched_at
+
+    @property
+    def headers(self):
+        return self.table.columns
+
+    @property
+    def row_count(self):
+        return len(self.table)
+
+
+class DatasetSnapshot:
+    """Keeps the latest snapshot in memory and refreshes it in the background.
+
+    Readers always get the current snapshot immediately; only the very first
+    load blocks. A refresh that fails keeps serving the previous snapshot and
+    is retried after `retry_seconds`. With `prefetch`, a background thread
+    refreshes whenever the snapshot expires, so readers never find it stale.
+    """
+
+    def __init__(self, fetch, ttl_seconds=300, retry_seconds=30, prefetch=False):
+        self._fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.prefetch = prefetch
+        self._prefetcher = ProcessThread(self._prefetch_loop, "snapshot-prefetch")
+        self._current = None
+        self._next_refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._listeners = []
+        self.last_error = None
+
+    def add_listener(self, listener):
+        """`listener(snapshot)` runs on the refresh thread after every successful refresh."""
+        self._listeners.append(listener)
+
+    def get(self):
+        if self.prefetch:
+            self._prefetcher.ensure()
+        snapshot = self._current
+        if snapshot is None:
+            return self.refresh(wait=True)
+        if time.time() >= self._next_refresh_at:
+            self.refresh()
+        return snapshot
+
+    def refresh(self, wait=False):
+        with self._lock:
+            thread = self._refresh_thread
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._run_refresh, name="snapshot-refresh", daemon=True)
+                self._refresh_thread = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return self._current
+
+    def status(self):
+        snapshot = self._current
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "rows": snapshot.row_count if snapshot else 0,
+            "bytes_per_row": snapshot.table.memory()["bytes_per_row"] if snapshot else None,
+            "age_seconds": round(time.time() - snapshot.fetched_at, 1) if snapshot else None,
+            "ttl_seconds": self.ttl_seconds,
+            "last_error": self.last_error,
+        }
+
+    def _prefetch_loop(self):
+        while True:
+            time.sleep(max(1.0, self._next_refresh_at - time.time()))
+            if time.time() >= self._next_refresh_at:
+                self.refresh(wait=True)
+
+    def _run_refresh(self):
+        try:
+            values = self._fetch()
+            if not values:
+                raise ValueError("upstream returned no data")
+
+            now = time.time()
+            version = values_version(values)
+            current = self._current
+            if current is not None and current.version == version:
+                # Same data: keep the encoded table, just mark it fresh
+                self._current = Snapshot(current.table, version, now)
+            else:
+                with span("snapshot.parse"):
+                    # Known categories keep their codes, so the aggregate engine can diff the tables
+                    table = CustomerTable.from_values(values, previous=current.table if current else None)
+                    self._current = Snapshot(table, version, now)
+                count_rows("snapshot.parse", len(values) - 1)
+            self._next_refresh_at = now + self.ttl_seconds
+            self.last_error = None
+            for listener in self._listeners:
+                try:
+                    listener(self._current)
+                except Exception as e:
+                    print(f"⚠️ Dataset listener failed: {e}")
+        except Exception as e:
+            self.last_error = str(e)
+            self._next_refresh_at = time.time() + self.retry_seconds
+            if self._current is not None:
+                print(f"⚠️ Dataset refresh failed, serving stale snapshot: {e}")
+            else:
+                print(f"❌ Dataset load failed: {e}")
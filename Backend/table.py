@@ -0,0 +1,275 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ✅ Columns parsed to float32 once per snapshot; the ID column is stored as fixed-width bytes,
+#    every other column is dictionary-encoded
+NUMERIC_COLUMNS = ("SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges")
+ID_COLUMN = "customerID"
+
+
+def parse_floats(cells):
+    """float32 array of the cells; cells that are not numbers (e.g. TotalCharges " ") become NaN."""
+    try:
+        return np.asarray(cells, dtype=np.float32)
+    except (TypeError, ValueError):
+        values = np.empty(len(cells), dtype=np.float32)
+        for i, cell in enumerate(cells):
+            try:
+                values[i] = float(cell)
+            except (TypeError, ValueError):
+                values[i] = np.nan
+        return values
+
+
+def encode_categories(cells, categories=()):
+    """Codes for `cells` plus the dictionary; `categories` (an earlier dictionary) keeps its codes."""
+    index = {category: code for code, category in enumerate(categories)}
+    if isinstance(cells, np.ndarray):
+        # Arrays (e.g. memory-mapped columns): one Python step per distinct value, not per cell
+        distinct, inverse = np.unique(cells, return_inverse=True)
+        mapping = np.array([index.setdefault(str(cell), len(index)) for cell in distinct.tolist()], dtype=np.int64)
+        codes = mapping[inverse.reshape(-1)] if len(cells) else np.empty(0, dtype=np.int64)
+    else:
+        codes = [index.setdefault(cell, len(index)) for cell in cells]
+    dtype = np.uint8 if len(index) <= 1 << 8 else np.uint16 if len(index) <= 1 << 16 else np.uint32
+    return np.asarray(codes, dtype=dtype), list(index)
+
+
+def widen(values):
+    """float32 -> float64 with the shortest decimal that round-trips (29.85, not 29.850000381469727)."""
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype(np.float64)
+    # Fast path: round to 7 significant digits, which round-trips for sheet-style numbers (2 decimals);
+    # the few values that need 8-9 digits go through str()
+    wide = values.astype(np.float64)
+    finite = np.isfinite(wide) & (wide != 0)
+    digits = np.zeros(len(wide) if wide.ndim else 1, dtype=np.int64).reshape(wide.shape)
+    digits[finite] = 6 - np.floor(np.log10(np.abs(wide[finite]))).astype(np.int64)
+    with np.errstate(over="ignore", invalid="ignore"):
+        up = np.where(digits >= 0, 10.0 ** np.clip(digits, 0, 22), 1.0)
+        down = np.where(digits < 0, 10.0 ** np.clip(-digits, 0, 22), 1.0)
+        rounded = np.where(finite, np.round(wide * up / down) * down / up, wide)
+    misses = finite & (rounded.astype(np.float32) != values)
+    if misses.any():
+        rounded[misses] = np.asarray(values[misses].astype(str), dtype=np.float64)
+    return rounded
+
+
+class ColumnValues:
+    """Sheet values held column by column (e.g. memory-mapped string arrays) instead of as rows.
+
+    Stands in for the usual list of rows wherever sheet values are passed
+    around: `len()` counts the header row too, and `version` is the
+    `values_version` of the equivalent rows when the source recorded it.
+    """
+
+    def __init__(self, columns, version=None):
+        self.columns = dict(columns)
+        self.version = version
+
+    @property
+    def headers(self):
+        return list(self.columns)
+
+    def __len__(self):
+        return 1 + (len(next(iter(self.columns.values()))) if self.columns else 0)
+
+    def rows(self):
+        """The equivalent list of rows, header first (materializes every cell)."""
+        return [self.headers] + [list(row) for row in zip(*(column.tolist() for column in self.columns.values()))]
+
+
+class CustomerTable:
+    """Column-oriented, dictionary-encoded copy of the customer sheet.
+
+    * categorical columns (`gender`, `Contract`, `InternetService`, `PaymentMethod`,
+      `Churn`, ...): one uint8 code per row (uint16 past 256 distinct values) plus
+      the list of distinct strings, shared by all rows
+    * numeric columns (`SeniorCitizen`, `tenure`, `MonthlyCharges`, `TotalCharges`):
+      float32, NaN where the cell is not a number
+    * `customerID`: fixed-width bytes, as long as the longest ID
+
+    For the telco sheet (16 categorical columns, 4 numeric, 10-character IDs) that is
+    16 x 1 + 4 x 4 + 10 = 42 bytes per row, versus about 1.4 KB for the same row
+    held as a list of 21 Python strings (`python table.py` measures both).
+    """
+
+    def __init__(self, columns, codes, categories, numeric, ids, rows):
+        self.columns = list(columns)
+        self._codes = codes
+        self._categories = categories
+        self._numeric = numeric
+        self._ids = ids
+        self.rows = rows
+
+    @classmethod
+    def from_values(cls, values, previous=None):
+        """Build from sheet values (header row first). Categories already in `previous` keep their codes,
+        so an appended or edited sheet can be diffed against the previous table column by column."""
+        if isinstance(values, ColumnValues):
+            return cls.from_columns(values.columns, previous)
+        headers, rows = list(values[0]), values[1:]
+        columns = {column: [row[i] if i < len(row) else "" for row in rows] for i, column in enumerate(headers)}
+        return cls.from_columns(columns, previous)
+
+    @classmethod
+    def from_columns(cls, columns, previous=None):
+        """Build from `{column: cells}`; cells are lists of strings or string arrays (e.g. memory-mapped, no rows built)."""
+        codes, categories, numeric, ids, rows = {}, {}, {}, None, 0
+        for column, cells in columns.items():
+            rows = len(cells)
+            if column in NUMERIC_COLUMNS:
+                numeric[column] = parse_floats(cells)
+            elif column == ID_COLUMN:
+                if isinstance(cells, np.ndarray):
+                    ids = np.char.encode(cells, "utf-8") if len(cells) else np.array([], "S1")
+                else:
+                    ids = np.array([cell.encode("utf-8") for cell in cells], dtype=bytes) if cells else np.array([], "S1")
+            else:
+                seed = previous._categories.get(column, ()) if previous is not None else ()
+                codes[column], categories[column] = encode_categories(cells, seed)
+        return cls(list(columns), codes, categories, numeric, ids, rows)
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def is_numeric(self, column):
+        return column in self._numeric
+
+    def is_categorical(self, column):
+        return column in self._codes
+
+    def numeric(self, column):
+        return self._numeric[column]
+
+    def codes(self, column):
+        return self._codes[column]
+
+    def categories(self, column):
+        return self._categories[column]
+
+    def labels(self, column, rows=None):
+        """Decoded values of one column (strings or floats) for `rows` (default: every row)."""
+        select = slice(None) if rows is None else rows
+        if column in self._codes:
+            return np.asarray(self._categories[column], dtype=object)[self._codes[column][select]]
+        if column in self._numeric:
+            return widen(self._numeric[column][select])
+        if column == ID_COLUMN and self._ids is not None:
+            return np.char.decode(self._ids[select], "utf-8")
+        raise KeyError(column)
+
+    def row_index(self):
+        """customerID -> row number."""
+        if self._ids is None:
+            return {}
+        return {customer_id.decode("utf-8"): i for i, customer_id in enumerate(self._ids.tolist())}
+
+    # ✅ Group numbers for a set of rows: the basis of every aggregation
+    def group_index(self, by, rows=None):
+        """(rows kept, group number per kept row, key tuple per group); rows with a NaN numeric key are dropped."""
+        rows = np.arange(self.rows) if rows is None else np.asarray(rows, dtype=np.intp)
+        if not by:
+            return rows, np.zeros(len(rows), dtype=np.intp), [()]
+
+        valid = np.ones(len(rows), dtype=bool)
+        key_codes, key_labels = [], []
+        for column in by:
+            if column in self._codes:
+                codes, labels = self._codes[column][rows], self._categories[column]
+            elif column in self._numeric:
+                values = self._numeric[column][rows]
+                valid &= ~np.isnan(values)
+                distinct, codes = np.unique(values, return_inverse=True)
+                labels = widen(distinct).tolist()
+            elif column == ID_COLUMN and self._ids is not None:
+                distinct, codes = np.unique(self._ids[rows], return_inverse=True)
+                labels = [customer_id.decode("utf-8") for customer_id in distinct.tolist()]
+            else:
+                raise KeyError(column)
+            key_codes.append(np.asarray(codes, dtype=np.int64).reshape(-1))
+            key_labels.append(labels)
+
+        shape = [max(1, len(labels)) for labels in key_labels]
+        combined = np.ravel_multi_index([codes[valid] for codes in key_codes], shape)
+        distinct, inverse = np.unique(combined, return_inverse=True)
+        keys = [
+            tuple(labels[code] for labels, code in zip(key_labels, codes))
+            for codes in zip(*(part.tolist() for part in np.unravel_index(distinct, shape)))
+        ]
+        return rows[valid], inverse.reshape(-1), keys
+
+    # ✅ Rows that differ from an earlier table over their common prefix (None: not comparable)
+    def changed_rows(self, previous):
+        if (previous.columns != self.columns or previous.rows > self.rows
+                or set(previous._numeric) != set(self._numeric)):
+            return None
+        n = previous.rows
+        changed = np.zeros(n, dtype=bool)
+        for column, codes in self._codes.items():
+            old_categories = previous._categories.get(column)
+            if old_categories is None or self._categories[column][:len(old_categories)] != old_categories:
+                return None  # dictionary was rebuilt: codes are not comparable
+            changed |= codes[:n] != previous._codes[column]
+        for column, values in self._numeric.items():
+            old, new = previous._numeric[column], values[:n]
+            changed |= (old != new) & ~(np.isnan(old) & np.isnan(new))
+        if self._ids is not None and previous._ids is not None:
+            changed |= self._ids[:n] != previous._ids
+        return np.flatnonzero(changed)
+
+    # ✅ Memory footprint
+    def memory(self):
+        columns = {column: int(codes.nbytes) for column, codes in self._codes.items()}
+        columns.update({column: int(values.nbytes) for column, values in self._numeric.items()})
+        if self._ids is not None:
+            columns[ID_COLUMN] = int(self._ids.nbytes)
+        dictionaries = sum(sys.getsizeof(c) for categories in self._categories.values() for c in categories)
+        total = sum(columns.values())
+        return {
+            "rows": self.rows,
+            "bytes": total + dictionaries,
+            "bytes_per_row": round(total / self.rows, 1) if self.rows else 0.0,
+            "dictionary_bytes": dictionaries,
+            "columns": columns,
+        }
+
+
+def _deep_size(values):
+    return sys.getsizeof(values) + sum(sys.getsizeof(row) + sum(sys.getsizeof(c) for c in row) for row in values)
+
+
+# ✅ Footprint and build time on a CSV: python table.py --csv ../telco-churn.csv
+def main():
+    import csv
+
+    parser = argparse.ArgumentParser(description="Measure the compact customer table against raw sheet values.")
+    parser.add_argument("--csv", default=os.environ.get("DATA_CSV_PATH", os.path.join(BASE_DIR, "..", "telco-churn.csv")))
+    args = parser.parse_args()
+
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        values = list(csv.reader(f))
+    started = time.perf_counter()
+    table = CustomerTable.from_values(values)
+    seconds = time.perf_counter() - started
+    memory = table.memory()
+    raw = _deep_size(values)
+    print(f"✅ {memory['rows']} rows encoded in {seconds * 1000:.1f} ms")
+    print(f"📦 Table: {memory['bytes_per_row']} bytes/row ({memory['bytes']} bytes incl. dictionaries)")
+    print(f"📦 Raw list-of-lists: {raw / max(1, len(values) - 1):.0f} bytes/row ({raw} bytes)")
+    for column, size in memory["columns"].items():
+        print(f"   {column}: {size / max(1, memory['rows']):.0f} B/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+from features import FeaturePipeline, parity_samples
+from scoring import CATEGORICAL_FEATURES, NUMERIC_FEATURES, parse_customer, prepare_features
+from table import CustomerTable
+
+# Sheet rows as the data source returns them: strings, TotalCharges blank for brand-new customers
+HEADERS = ["customerID", "tenure", "MonthlyCharges", "TotalCharges", "Contract", "InternetService"]
+SHEET_ROWS = [
+    ["0001-A", "1", "29.85", "29.85", "Month-to-month", "DSL"],
+    ["0002-B", "34", "56.95", "1889.5", "One year", "DSL"],
+    ["0003-C", "2", "53.85", "108.15", "Month-to-month", "Fiber optic"],
+    ["0004-D", "45", "42.3", "1840.75", "One year", "DSL"],
+    ["0005-E", "72", "118.75", "8684.8", "Two year", "Fiber optic"],
+    ["0006-F", "10", "20.05", "200.5", "Month-to-month", "No"],
+    ["0007-G", "0", "19.7", " ", "Two year", "No"],  # NaN TotalCharges
+    ["0008-H", "5", "70.7", "353.5", "Three year", "Satellite"],  # categories unseen at fit time
+]
+
+
+# ✅ Encoder and scaler fitted the way preprocess.py fits them, on a small fixture frame
+@pytest.fixture(scope="module")
+def fitted():
+    frame = pd.DataFrame(
+        [[1, 29.85, 29.85, "Month-to-month", "DSL"], [34, 56.95, 1889.5, "One year", "DSL"],
+         [2, 53.85, 108.15, "Month-to-month", "Fiber optic"], [72, 118.75, 8684.8, "Two year", "Fiber optic"],
+         [10, 20.05, 200.5, "Month-to-month", "No"]],
+        columns=NUMERIC_FEATURES + CATEGORICAL_FEATURES,
+    )
+    encoder = preprocessing.OneHotEncoder(handle_unknown="ignore", sparse_output=False)
+    encoded = pd.DataFrame(encoder.fit_transform(frame[CATEGORICAL_FEATURES]), columns=encoder.get_feature_names_out())
+    scaler = preprocessing.StandardScaler()
+    scaler.fit(pd.concat([frame[NUMERIC_FEATURES], encoded], axis=1))
+    return encoder, scaler, FeaturePipeline(encoder, scaler)
+
+
+def test_transform_matches_prepare_features(fitted):
+    encoder, scaler, pipeline = fitted
+    customers = parity_samples(encoder) + [parse_customer(dict(zip(HEADERS, row))) for row in SHEET_ROWS]
+
+    expected = prepare_features(customers, encoder, scaler)
+    actual = pipeline.transform(customers)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_transform_table_matches_prepare_features(fitted):
+    encoder, scaler, pipeline = fitted
+    table = CustomerTable.from_values([HEADERS] + SHEET_ROWS)
+    expected = prepare_features([parse_customer(dict(zip(HEADERS, row))) for row in SHEET_ROWS], encoder, scaler)
+
+    np.testing.assert_array_equal(pipeline.transform_table(table), expected)
+
+    rows = np.array([6, 7, 0])  # NaN TotalCharges, unseen categories, a known row
+    np.testing.assert_array_equal(pipeline.transform_table(table, rows), expected[rows])
+
+
+def test_unseen_categories_encode_as_all_zero_blocks(fitted):
+    encoder, scaler, pipeline = fitted
+    unseen = {"tenure": 5.0, "monthlyCharges": 70.7, "totalCharges": 353.5,
+              "contract": "Three year", "internetService": "Satellite"}
+    one_hot = encoder.transform(pd.DataFrame([["Three year", "Satellite"]], columns=CATEGORICAL_FEATURES))
+
+    assert not one_hot.any()
+    np.testing.assert_array_equal(pipeline.transform([unseen]), prepare_features([unseen], encoder, scaler))
@@ -1,27 +1,38 @@
+import argparse
+import json
 import os
+import shutil
+import time
 import numpy as np
 import tensorflow as tf
 from sklearn.model_selection import KFold
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from imblearn.over_sampling import SMOTE
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
+from processes import spawn_pool
 
-# ✅ Ensure model directory exists
-os.makedirs("model", exist_ok=True)
-
-# ✅ Load preprocessed data
-X_train_churn = np.load("model/X_train_churn.npy")
-y_train_churn = np.load("model/y_train_churn.npy").astype(int)
-X_train_vis = np.load("model/X_train_vis.npy")
+MODEL_DIR = "model"
+FOLDS_DIR = os.path.join(MODEL_DIR, "folds")
 
-# ✅ Balance Data Using SMOTE for Churn Prediction
-smote = SMOTE(sampling_strategy=0.5, random_state=42)
-X_train_churn, y_train_churn = smote.fit_resample(X_train_churn.reshape(X_train_churn.shape[0], -1), y_train_churn)
-X_train_churn = X_train_churn.reshape(-1, X_train_churn.shape[1], 1)  # Reshaping for Conv1D input
-X_train_vis = X_train_vis.reshape(-1, X_train_vis.shape[1], 1)  # Reshaping for Conv1D input
+# ✅ Training settings (overridable through the environment or the command line)
+TRAIN_FOLDS = int(os.environ.get("TRAIN_FOLDS", "10"))
+TRAIN_EPOCHS = int(os.environ.get("TRAIN_EPOCHS", "50"))
+TRAIN_WORKERS = int(os.environ.get("TRAIN_WORKERS", "1"))
+TRAIN_THREADS_PER_WORKER = int(os.environ.get("TRAIN_THREADS_PER_WORKER", "0"))  # 0 = cores / workers
+TRAIN_PRECISION = os.environ.get("TRAIN_PRECISION", "auto").lower()  # auto | mixed_float16 | float32
 
-# ✅ Enable Mixed Precision (Faster Training on GPU)
-tf.keras.mixed_precision.set_global_policy("mixed_float16")
+# ✅ Ensure model directory exists
+os.makedirs(MODEL_DIR, exist_ok=True)
+
+# ✅ Thread limits and precision policy; must run before TensorFlow executes anything in this process
+def configure_tensorflow(threads=0, precision=TRAIN_PRECISION):
+    if threads > 0:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+    if precision == "auto":
+        # float16 only pays off on a GPU; on CPU it is emulated and slower
+        precision = "mixed_float16" if tf.config.list_physical_devices("GPU") else "float32"
+    tf.keras.mixed_precision.set_global_policy(precision)
+    return precision
 
 # ✅ Define Residual Block
 def residual_block(x, filters=64):
@@ -74,57 +85,146 @@ def create_model(input_shape):
     outputs = tf.keras.layers.Dense(1, activation="sigmoid", dtype="float32")(x)
     return tf.keras.Model(inputs=inputs, outputs=outputs)
 
-# ✅ Training Callbacks
-early_stopping = EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)
-lr_scheduler = ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=5, verbose=1)
-checkpoint = ModelCheckpoint("model/best_churn_model.keras", save_best_only=True, monitor="val_loss")
-
-# ✅ Train Churn Prediction Model with K-Fold Cross-Validation
-kf = KFold(n_splits=10, shuffle=True, random_state=42)
-churn_metrics = []
-
-for fold, (train_idx, val_idx) in enumerate(kf.split(X_train_churn)):
+# ✅ Callbacks are created per fold so early stopping and "best" checkpoints never leak between folds
+def training_callbacks(checkpoint_path=None):
+    callbacks = [
+        EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True),
+        ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=5, verbose=1),
+    ]
+    if checkpoint_path:
+        callbacks.append(ModelCheckpoint(checkpoint_path, save_best_only=True, monitor="val_loss"))
+    return callbacks
+
+# ✅ Balance Data Using SMOTE for Churn Prediction; saved so fold workers can memory-map it
+def prepare_churn_training_data():
+    from imblearn.over_sampling import SMOTE
+
+    X_train_churn = np.load(os.path.join(MODEL_DIR, "X_train_churn.npy"))
+    y_train_churn = np.load(os.path.join(MODEL_DIR, "y_train_churn.npy")).astype(int)
+
+    smote = SMOTE(sampling_strategy=0.5, random_state=42)
+    X_resampled, y_resampled = smote.fit_resample(X_train_churn.reshape(X_train_churn.shape[0], -1), y_train_churn)
+    X_resampled = X_resampled.reshape(-1, X_resampled.shape[1], 1)  # Reshaping for Conv1D input
+
+    os.makedirs(FOLDS_DIR, exist_ok=True)
+    X_path, y_path = os.path.join(FOLDS_DIR, "X_resampled.npy"), os.path.join(FOLDS_DIR, "y_resampled.npy")
+    np.save(X_path, X_resampled)
+    np.save(y_path, y_resampled)
+    return X_path, y_path
+
+# ✅ Train and evaluate one fold; runs in-process or in a pool worker
+def train_fold(fold, train_idx, val_idx, X_path, y_path, epochs=TRAIN_EPOCHS, verbose=1):
+    started = time.time()
     print(f"\n🔄 Training Fold {fold + 1}...")
     tf.keras.backend.clear_session()
-    
-    X_train, X_val = X_train_churn[train_idx], X_train_churn[val_idx]
-    y_train, y_val = y_train_churn[train_idx], y_train_churn[val_idx]
-    
+    tf.keras.utils.set_random_seed(42 + fold)  # same weights and shuffling whichever worker runs the fold
+
+    X_all, y_all = np.load(X_path, mmap_mode="r"), np.load(y_path, mmap_mode="r")
+    X_train, X_val = X_all[train_idx], X_all[val_idx]
+    y_train, y_val = y_all[train_idx], y_all[val_idx]
+
     model = create_model(input_shape=(X_train.shape[1], 1))
     model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.0003), loss="binary_crossentropy", metrics=["accuracy"])
-    
+
     train_dataset = tf.data.Dataset.from_tensor_slices((X_train, y_train)).batch(128).shuffle(1000).prefetch(tf.data.AUTOTUNE)
     val_dataset = tf.data.Dataset.from_tensor_slices((X_val, y_val)).batch(128).prefetch(tf.data.AUTOTUNE)
-    
-    model.fit(train_dataset, validation_data=val_dataset, epochs=50, verbose=1, callbacks=[early_stopping, lr_scheduler, checkpoint])
-    
-    y_pred = (model.predict(X_val) > 0.5).astype("int32")
-    metrics = {
-        "accuracy": accuracy_score(y_val, y_pred),
-        "precision": precision_score(y_val, y_pred),
-        "recall": recall_score(y_val, y_pred),
-        "f1": f1_score(y_val, y_pred)
+
+    checkpoint_path = os.path.join(FOLDS_DIR, f"fold_{fold + 1:02d}.keras")
+    history = model.fit(train_dataset, validation_data=val_dataset, epochs=epochs, verbose=verbose,
+                        callbacks=training_callbacks(checkpoint_path))
+    final_path = os.path.join(FOLDS_DIR, f"fold_{fold + 1:02d}_final.keras")
+    model.save(final_path)
+
+    y_pred = (model.predict(X_val, verbose=0) > 0.5).astype("int32")
+    return {
+        "fold": fold + 1,
+        "val_loss": float(min(history.history["val_loss"])),
+        "epochs": len(history.history["val_loss"]),
+        "accuracy": float(accuracy_score(y_val, y_pred)),
+        "precision": float(precision_score(y_val, y_pred)),
+        "recall": float(recall_score(y_val, y_pred)),
+        "f1": float(f1_score(y_val, y_pred)),
+        "seconds": round(time.time() - started, 1),
+        "checkpoint": checkpoint_path,
+        "final_model": final_path,
     }
-    churn_metrics.append(metrics)
 
-# ✅ Save Final Churn Prediction Model
-model.save("model/final_model.keras")
+def _init_fold_worker(threads, precision):
+    configure_tensorflow(threads, precision)
+
+# ✅ Train Churn Prediction Model with K-Fold Cross-Validation (folds spread over `workers` processes)
+def train_churn_folds(X_path, y_path, folds=TRAIN_FOLDS, epochs=TRAIN_EPOCHS, workers=1, threads_per_worker=0,
+                      precision=TRAIN_PRECISION):
+    n_samples = np.load(y_path, mmap_mode="r").shape[0]
+    kf = KFold(n_splits=folds, shuffle=True, random_state=42)
+    splits = list(kf.split(np.empty((n_samples, 0))))
+
+    if workers <= 1:
+        return [train_fold(fold, train_idx, val_idx, X_path, y_path, epochs) for fold, (train_idx, val_idx) in enumerate(splits)]
+
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    print(f"🚀 Training {folds} folds on {workers} workers x {threads} threads")
+    with spawn_pool(workers, _init_fold_worker, (threads, precision)) as pool:
+        futures = [
+            pool.submit(train_fold, fold, train_idx, val_idx, X_path, y_path, epochs, 2)
+            for fold, (train_idx, val_idx) in enumerate(splits)
+        ]
+        results = [future.result() for future in futures]
+    return sorted(results, key=lambda result: result["fold"])
+
+# ✅ Keep the fold with the lowest validation loss as the served model
+def select_best_fold(results):
+    best = min(results, key=lambda result: (result["val_loss"], result["fold"]))
+    for source, target in ((best["checkpoint"], "best_churn_model.keras"), (best["final_model"], "final_model.keras")):
+        tmp_path = os.path.join(MODEL_DIR, target + ".tmp")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, os.path.join(MODEL_DIR, target))
+
+    with open(os.path.join(MODEL_DIR, "fold_metrics.json"), "w") as f:
+        json.dump({"best_fold": best["fold"], "folds": results}, f, indent=2)
+    return best
 
 # ✅ Train Visualization Model (Unsupervised Learning)
-tf.keras.backend.clear_session()
+def train_visualization_model(epochs=TRAIN_EPOCHS):
+    tf.keras.backend.clear_session()
+    X_train_vis = np.load(os.path.join(MODEL_DIR, "X_train_vis.npy"))
+    X_train_vis = X_train_vis.reshape(-1, X_train_vis.shape[1], 1)  # Reshaping for Conv1D input
+
+    model_vis = create_model(input_shape=(X_train_vis.shape[1], 1))
+    model_vis.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.0003), loss="mse", metrics=["mae"])
+
+    vis_dataset = tf.data.Dataset.from_tensor_slices((X_train_vis, X_train_vis)).batch(256).shuffle(1000).prefetch(tf.data.AUTOTUNE)
+    model_vis.fit(vis_dataset, epochs=epochs, verbose=1, callbacks=training_callbacks())
+
+    # ✅ Save Visualization Model
+    model_vis.save(os.path.join(MODEL_DIR, "visualization_model.keras"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the churn (K-fold) and visualization models.")
+    parser.add_argument("--folds", type=int, default=TRAIN_FOLDS)
+    parser.add_argument("--epochs", type=int, default=TRAIN_EPOCHS)
+    parser.add_argument("--workers", type=int, default=TRAIN_WORKERS, help="processes training folds in parallel")
+    parser.add_argument("--threads-per-worker", type=int, default=TRAIN_THREADS_PER_WORKER)
+    parser.add_argument("--precision", default=TRAIN_PRECISION, choices=["auto", "mixed_float16", "float32"])
+    args = parser.parse_args()
+
+    precision = configure_tensorflow(precision=args.precision)
+    print(f"✅ Precision policy: {precision}")
 
-model_vis = create_model(input_shape=(X_train_vis.shape[1], 1))
-model_vis.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.0003), loss="mse", metrics=["mae"])
+    X_path, y_path = prepare_churn_training_data()
+    churn_metrics = train_churn_folds(X_path, y_path, folds=args.folds, epochs=args.epochs, workers=args.workers,
+                                      threads_per_worker=args.threads_per_worker, precision=precision)
+    best = select_best_fold(churn_metrics)
+    print(f"✅ Best fold: {best['fold']} (val_loss {best['val_loss']:.4f})")
 
-vis_dataset = tf.data.Dataset.from_tensor_slices((X_train_vis, X_train_vis)).batch(256).shuffle(1000).prefetch(tf.data.AUTOTUNE)
-model_vis.fit(vis_dataset, epochs=50, verbose=1, callbacks=[early_stopping, lr_scheduler])
+    train_visualization_model(epochs=args.epochs)
 
-# ✅ Save Visualization Model
-model_vis.save("model/visualization_model.keras")
+    # ✅ Print Average Metrics
+    avg_churn_metrics = {key: np.mean([m[key] for m in churn_metrics]) for key in ("accuracy", "precision", "recall", "f1")}
+    print("\n🔍 Average Churn Model Metrics:")
+    print(f"✅ Accuracy: {avg_churn_metrics['accuracy']:.4f}, Precision: {avg_churn_metrics['precision']:.4f}, Recall: {avg_churn_metrics['recall']:.4f}, F1-score: {avg_churn_metrics['f1']:.4f}")
 
-# ✅ Print Average Metrics
-avg_churn_metrics = {key: np.mean([m[key] for m in churn_metrics]) for key in churn_metrics[0]}
-print("\n🔍 Average Churn Model Metrics:")
-print(f"✅ Accuracy: {avg_churn_metrics['accuracy']:.4f}, Precision: {avg_churn_metrics['precision']:.4f}, Recall: {avg_churn_metrics['recall']:.4f}, F1-score: {avg_churn_metrics['f1']:.4f}")
+    print("✅ Training for both Churn Prediction & Visualization models completed successfully!")
 
-print("✅ Training for both Churn Prediction & Visualization models completed successfully!")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import gc
+import os
+import sys
+
+# ✅ Production entry point: gunicorn -c gunicorn.conf.py "wsgi:create_app()"
+#    (app.py's __main__ block stays the single-process development server)
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", "0"))  # 0 = one worker per CPU core
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "4"))
+MODEL_THREADS = int(os.environ.get("MODEL_THREADS", "0"))  # per worker; 0 = CPU cores / workers
+PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "auto").lower()
+
+
+def worker_count():
+    return WEB_WORKERS if WEB_WORKERS > 0 else os.cpu_count() or 1
+
+
+# ✅ Size the numeric thread pools so workers x threads matches the cores instead of oversubscribing them
+def thread_limits(workers):
+    cores = os.cpu_count() or 1
+    intra = MODEL_THREADS if MODEL_THREADS > 0 else max(1, cores // max(1, workers))
+    return intra, min(2, intra)
+
+
+def limit_threads(intra, inter):
+    """Must run before NumPy/TensorFlow create their thread pools; explicit settings in the environment win."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, str(intra))
+    os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(intra))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", str(inter))
+    if "tensorflow" in sys.modules:
+        import tensorflow as tf
+
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(int(os.environ["TF_NUM_INTRAOP_THREADS"]))
+            tf.config.threading.set_inter_op_parallelism_threads(int(os.environ["TF_NUM_INTEROP_THREADS"]))
+        except RuntimeError:
+            pass  # TensorFlow is already initialized; the environment variables apply to new processes
+
+
+# ✅ TensorFlow's thread pools do not survive fork(), so the Keras model is loaded in each worker;
+#    the NumPy and student runtimes are loaded once and shared copy-on-write
+def should_preload_model(runtime):
+    if PRELOAD_MODEL == "auto":
+        return runtime != "keras"
+    return PRELOAD_MODEL == "true"
+
+
+def create_app(preload=True):
+    """Build the Flask app; with `preload` the dataset (and model, see above) are loaded before workers fork."""
+    limit_threads(*thread_limits(worker_count()))
+    import app as api
+
+    if preload:
+        api.dataset.refresh(wait=True)  # one upstream fetch instead of one per worker
+        if should_preload_model(api.MODEL_RUNTIME):
+            api.resources.warm_up(after=api.warm_up_inference, background=False)
+        gc.freeze()  # keep the garbage collector from touching (and so copying) the preloaded objects
+    return api.app
+
+
+def init_worker():
+    """Runs in each worker right after fork()."""
+    import app as api
+
+    api.data_source.reset_connection()  # never share the master's upstream connection
+    if api.STARTUP_MODE != "lazy":
+        # Returns immediately when the master already warmed everything up
+        api.resources.warm_up(after=api.warm_up_inference, background=api.STARTUP_MODE != "eager")
+
+
+def shutdown():
+    """Runs in each worker on exit: /predict calls already queued are still answered."""
+    import app as api
+
+    api.prediction_batcher.close()
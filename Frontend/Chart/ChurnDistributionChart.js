@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
+import { fetchChartData } from "./dashboardData";
 import { PieChart, Pie, Cell, Tooltip, Legend, ResponsiveContainer } from "recharts";
 
 const ChurnDistributionChart = () => {
@@ -8,8 +9,7 @@ const ChurnDistributionChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/churn-distribution");
-        const data = await response.json();
+        const data = await fetchChartData("churn_distribution");
         console.log("📊 Churn API Data:", data); // ✅ Debugging
         setChartData(data);
       } catch (error) {
@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
+import { fetchChartData } from "./dashboardData";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, CartesianGrid, Legend } from "recharts";
 
 const ChurnGenderMonthlyChargesChart = () => {
@@ -9,8 +10,7 @@ const ChurnGenderMonthlyChargesChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/churn-gender-monthly-charges");
-        const data = await response.json();
+        const data = await fetchChartData("churn_gender_monthly_charges");
         console.log("📊 API Response:", data);
 
         if (Array.isArray(data)) {
@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
+import { fetchChartData } from "./dashboardData";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, Legend } from "recharts";
 
 const ChurnTenureHistogram = () => {
@@ -8,19 +9,14 @@ const ChurnTenureHistogram = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/churn-tenure");
-        const data = await response.json();
+        // ✅ Histogram comes from the shared /dashboard bundle, computed on the server
+        const data = await fetchChartData("churn_tenure");
         console.log("📊 API Data:", data);
 
-        // Convert tenure_values into frequency counts
-        const tenureCounts = {};
-        data[0].tenure_values.forEach((tenure) => {
-          tenureCounts[tenure] = (tenureCounts[tenure] || 0) + 1;
-        });
-
-        // Format data for Recharts
-        const formattedData = Object.entries(tenureCounts).map(([tenure, count]) => ({
-          tenure: parseInt(tenure),
+        // Format churned-customer bins for Recharts
+        const churned = data.find((series) => series.churn === "Yes");
+        const formattedData = churned.counts.map((count, i) => ({
+          tenure: `${Math.round(churned.bin_edges[i])}-${Math.round(churned.bin_edges[i + 1])}`,
           count,
         }));
 
@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
+import { fetchChartData } from "./dashboardData";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer } from "recharts";
 
 const GenderMonthlyChargesChart = () => {
@@ -8,8 +9,7 @@ const GenderMonthlyChargesChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/gender-monthly-charges");
-        const data = await response.json();
+        const data = await fetchChartData("gender_monthly_charges");
         console.log("📊 API Data:", data); // ✅ Debugging
         setChartData(data);
       } catch (error) {
@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
+import { fetchChartData } from "./dashboardData";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, Legend } from "recharts";
 
 const GenderPaymentMethodChurnChart = () => {
@@ -8,8 +9,7 @@ const GenderPaymentMethodChurnChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/gender-payment-method-churn");
-        const data = await response.json();
+        const data = await fetchChartData("gender_payment_method_churn");
         console.log("📊 API Data:", data);
 
         // Transform data to split gender for better visualization
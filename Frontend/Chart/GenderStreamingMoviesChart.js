@@ -1,5 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
+import { fetchChartData } from "./dashboardData";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, Legend, ResponsiveContainer } from "recharts";
 
 const GenderStreamingMoviesChart = () => {
@@ -9,8 +10,7 @@ const GenderStreamingMoviesChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/gender-streaming-movies");
-        const data = await response.json();
+        const data = await fetchChartData("gender_streaming_movies");
         console.log("📊 API Data:", data);
 
         if (Array.isArray(data)) {
@@ -8,7 +8,7 @@ const TenureMonthlyChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/tenure-monthly-charges");
+        const response = await fetch("http://127.0.0.1:5000/tenure-monthly-charges?mode=sample&n=2000"); // ✅ Fixed-size stratified sample
         const data = await response.json();
         console.log("📊 Tenure vs Monthly API Data:", data); // ✅ Debugging
         setChartData(data);
@@ -0,0 +1,27 @@
+// ✅ One /dashboard request feeds every chart on the page (the server computes them in a single pass)
+const DASHBOARD_URL = "http://127.0.0.1:5000/dashboard";
+const CACHE_TTL_MS = 30000;
+
+let cached = null;
+let cachedAt = 0;
+
+export const fetchDashboard = () => {
+  if (!cached || Date.now() - cachedAt > CACHE_TTL_MS) {
+    cachedAt = Date.now();
+    cached = fetch(DASHBOARD_URL)
+      .then((response) => {
+        if (!response.ok) throw new Error(`Dashboard request failed: ${response.status}`);
+        return response.json();
+      })
+      .catch((error) => {
+        cached = null; // let the next chart retry
+        throw error;
+      });
+  }
+  return cached;
+};
+
+export const fetchChartData = async (key) => {
+  const dashboard = await fetchDashboard();
+  return dashboard[key];
+};